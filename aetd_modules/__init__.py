@@ -1,3 +1,4 @@
+from .compositor import Compositor
 from .containers import (
     AnnotationsContainer,
     DirectionBox,
@@ -6,7 +7,9 @@ from .containers import (
     Passable,
     Path,
     PathsBox,
+    RoadObject,
     RoadObjectsBox,
+    RoadSegment,
     RoadSegmentsBox,
     Sign,
     SpeedBox,
@@ -15,6 +18,8 @@ from .containers import (
 )
 from .direction import DirectionExtractor
 from .draw import Draw
+from .frame_context import FrameContext
+from .memory_profiler import MemoryProfiler
 from .paths import PathExtractor, PathPlanner
 from .pipeline import Pipeline
 from .preprocessor import Preprocessor
@@ -28,10 +33,12 @@ __all__: list[str] = [
     "SpeedDataExtractor",
     "RoadObjectDetectionExtractor",
     "RoadObjectClassificationRefiner",
+    "RoadObject",
     "Vehicle",
     "Sign",
     "TrafficLight",
     "RoadSegmentsExtractor",
+    "RoadSegment",
     "Driveable",
     "Passable",
     "Impassable",
@@ -46,5 +53,8 @@ __all__: list[str] = [
     "PathsBox",
     "AnnotationsContainer",
     "Draw",
+    "Compositor",
     "Pipeline",
+    "FrameContext",
+    "MemoryProfiler",
 ]
@@ -0,0 +1,302 @@
+#
+# The Compositor draws the same image as Draw.draw, but keeps every annotation type in its own cached layer.
+# A layer is only rendered again when its annotation changed, the blending is limited to the region the
+# layer covers and the result is written into a reusable buffer.
+#
+
+from typing import Any
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+from numpy.typing import NDArray
+
+from configs import ConfigSnapshot
+
+from .containers import (
+    SEGMENT_KINDS,
+    AnnotationsContainer,
+    Driveable,
+    Impassable,
+    Passable,
+    PathsBox,
+    RoadObjectsBox,
+    RoadSegmentsBox,
+)
+from .draw import Draw
+
+# the labels of the segment layer, 0 is empty
+SEGMENT_LABELS: dict[type, int] = {Driveable: 1, Passable: 2, Impassable: 3}
+# the color of each label (BGR), the same colors as Draw.draw_road_segments
+SEGMENT_COLORS: NDArray[np.uint8] = np.array([[0, 0, 0], [0, 255, 255], [0, 255, 0], [0, 0, 255]], dtype=np.uint8)
+SEGMENT_ALPHA: float = 0.3
+
+
+class Layer:
+    """
+    One rendered annotation type.
+
+    Args:
+        key (tuple[Any, ...]): Identifies the annotation the layer was rendered from.
+        source (Any): The annotation itself, kept so the id in the key can't be reused.
+    """
+
+    def __init__(self, key: tuple[Any, ...], source: Any) -> None:
+        self.key: tuple[Any, ...] = key
+        self.source: Any = source
+
+
+class TextLayer(Layer):
+    """
+    The direction and the speed. The text is anti-aliased against the pixels below,
+    so it is stored as the values to draw and drawn again on every frame.
+    """
+
+    def __init__(self, key: tuple[Any, ...], direction: int | None, speed: int | None) -> None:
+        super().__init__(key=key, source=None)
+        self.direction: int | None = direction
+        self.speed: int | None = speed
+
+
+class ObjectsLayer(Layer):
+    """
+    The boxes and labels of the road objects, with the crop offset already applied.
+    """
+
+    def __init__(self, key: tuple[Any, ...], source: Any) -> None:
+        super().__init__(key=key, source=source)
+        # (pt1, pt2, text, org) of every object
+        self.boxes: list[tuple[tuple[int, int], tuple[int, int], str, tuple[int, int]]] = []
+
+
+class SegmentsLayer(Layer):
+    """
+    The road segments, rasterized into label masks and cut to the region they cover.
+    """
+
+    def __init__(self, key: tuple[Any, ...], source: Any) -> None:
+        super().__init__(key=key, source=source)
+        # (y1, y2, x1, x2) of the covered region, None if nothing is drawn
+        self.roi: tuple[int, int, int, int] | None = None
+        self.fill_mask: NDArray[np.uint8] | None = None
+        self.fill_color: NDArray[np.uint8] | None = None
+        self.line_mask: NDArray[np.uint8] | None = None
+        self.line_color: NDArray[np.uint8] | None = None
+        # scratch buffers for the two overlays of the region
+        self.fill_overlay: NDArray[np.uint8] | None = None
+        self.line_overlay: NDArray[np.uint8] | None = None
+
+
+class PathsLayer(Layer):
+    """
+    The points of the paths, with the crop offset already applied.
+    """
+
+    def __init__(self, key: tuple[Any, ...], source: Any) -> None:
+        super().__init__(key=key, source=source)
+        self.pts: list[NDArray[np.int32]] = []
+
+
+class Compositor:
+    """
+    Draws the annotations like Draw.draw, pixel for pixel, with less work per frame:
+
+        - every annotation type has a layer, that is only rendered again if the annotation
+          changed (the boxes by value, because the classification changes them in place,
+          the segments and paths by identity)
+        - the segments are blended only inside the region they cover, outside of it the
+          blend of Draw.draw leaves the pixels unchanged
+        - the frame is copied into a buffer that is reused for the next frame
+
+    The annotated image is the buffer of the compositor, it is overwritten by the next
+    call of draw. Copy it if it has to be kept.
+    """
+
+    def __init__(self) -> None:
+        self.buffer: NDArray[np.uint8] | None = None
+
+        self.text: TextLayer | None = None
+        self.objects: ObjectsLayer | None = None
+        self.segments: SegmentsLayer | None = None
+        self.paths: PathsLayer | None = None
+
+        # how often a layer was rendered, to see if the cache works
+        self.renders: dict[str, int] = {"text": 0, "objects": 0, "segments": 0, "paths": 0}
+
+    def draw(self, annotations: AnnotationsContainer) -> AnnotationsContainer:
+        """
+        Draw the annotations on the original image.
+
+        Args:
+            annotations (AnnotationsContainer): The annotations to draw.
+
+        Returns:
+            AnnotationsContainer: The annotations with annotated_img set to the buffer of the compositor.
+        """
+
+        img: MatLike = annotations.original_img
+        if self.buffer is None or self.buffer.shape != img.shape:
+            self.buffer = np.empty_like(img)
+        np.copyto(self.buffer, img)
+
+        shape: tuple[int, int] = (img.shape[0], img.shape[1])
+
+        # the same order as Draw.draw, the anti-aliased text and the blending depend on what is below
+        if annotations.direction is not None or annotations.speed is not None:
+            self.draw_text(layer=self.text_layer(annotations=annotations, shape=shape))
+        if annotations.road_objects is not None:
+            self.draw_objects(layer=self.objects_layer(objects=annotations.road_objects, config=annotations.config))
+        if annotations.road_segments is not None:
+            self.draw_segments(
+                layer=self.segments_layer(segments=annotations.road_segments, shape=shape, config=annotations.config)
+            )
+        if annotations.paths is not None:
+            self.draw_paths(layer=self.paths_layer(paths=annotations.paths, config=annotations.config))
+
+        annotations.annotated_img = self.buffer
+        return annotations
+
+    # ---------------------------------- TEXT ----------------------------------
+
+    def text_layer(self, annotations: AnnotationsContainer, shape: tuple[int, int]) -> TextLayer:
+        key: tuple[Any, ...] = (shape, annotations.direction, annotations.speed)
+        if self.text is None or self.text.key != key:
+            self.text = TextLayer(key=key, direction=annotations.direction, speed=annotations.speed)
+            self.renders["text"] += 1
+        return self.text
+
+    def draw_text(self, layer: TextLayer) -> None:
+        assert self.buffer is not None
+        if layer.direction is not None:
+            Draw.draw_direction(img=self.buffer, advice=layer.direction)
+        if layer.speed is not None:
+            Draw.draw_speed(img=self.buffer, speed=layer.speed)
+
+    # --------------------------------- OBJECTS --------------------------------
+
+    def objects_layer(self, objects: RoadObjectsBox, config: ConfigSnapshot) -> ObjectsLayer:
+        crop_top: int = config.ROADOBJECT_EXTRACTION_CROP_TOP
+        key: tuple[Any, ...] = (crop_top, objects.xyxy.tobytes(), objects.cls.tobytes())
+        if self.objects is not None and self.objects.key == key:
+            return self.objects
+
+        layer = ObjectsLayer(key=key, source=objects)
+        xyxy: NDArray[np.int32] = objects.xyxy + np.array([0, crop_top, 0, crop_top], dtype=np.int32)
+        for (x1, y1, x2, y2), cls in zip(xyxy.tolist(), objects.cls.tolist()):
+            # avoid going above image
+            org: tuple[int, int] = (x1, y1 - 10 if y1 - 10 > 10 else y1 + 20)
+            layer.boxes.append(((x1, y1), (x2, y2), str(object=cls), org))
+
+        self.objects = layer
+        self.renders["objects"] += 1
+        return layer
+
+    def draw_objects(self, layer: ObjectsLayer) -> None:
+        assert self.buffer is not None
+        for pt1, pt2, text, org in layer.boxes:
+            cv2.rectangle(img=self.buffer, pt1=pt1, pt2=pt2, color=(0, 255, 0), thickness=2)
+            cv2.putText(
+                img=self.buffer,
+                text=text,
+                org=org,
+                fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+                fontScale=0.6,
+                color=(0, 255, 0),
+                thickness=2,
+                lineType=cv2.LINE_AA,
+            )
+
+    # --------------------------------- SEGMENTS -------------------------------
+
+    def segments_layer(
+        self, segments: RoadSegmentsBox, shape: tuple[int, int], config: ConfigSnapshot
+    ) -> SegmentsLayer:
+        crop_top: int = config.ROADSEGMENT_EXTRACTION_CROP_TOP
+        key: tuple[Any, ...] = (shape, crop_top, id(segments), len(segments))
+        if self.segments is not None and self.segments.key == key and self.segments.source is segments:
+            return self.segments
+
+        layer = SegmentsLayer(key=key, source=segments)
+
+        # the polygons and lines are rasterized like in Draw.draw_road_segments, but as labels
+        fill_labels: NDArray[np.uint8] = np.zeros(shape, dtype=np.uint8)
+        line_labels: NDArray[np.uint8] = np.zeros(shape, dtype=np.uint8)
+
+        # the contours and paths of all segments are shifted at once, the segments are views into them
+        points: NDArray[np.int32] = segments.points + np.array([0, crop_top], dtype=np.int32)
+        path_points: NDArray[np.int32] = segments.path_points + np.array([0, crop_top], dtype=np.int32)
+        labels: list[int] = [SEGMENT_LABELS[SEGMENT_KINDS[kind]] for kind in segments.kind.tolist()]
+
+        def contour(index: int) -> NDArray[np.int32]:
+            return points[segments.offsets[index] : segments.offsets[index + 1]]
+
+        # the driveable first
+        for index in np.flatnonzero(segments.kind == Driveable.KIND).tolist():
+            cv2.fillPoly(img=fill_labels, pts=[contour(index=index)], color=labels[index])
+
+        for index in np.flatnonzero(segments.kind != Driveable.KIND).tolist():
+            approx_pts: NDArray[np.int32] = path_points[segments.path_offsets[index] : segments.path_offsets[index + 1]]
+            cv2.fillPoly(img=fill_labels, pts=[contour(index=index)], color=labels[index])
+            cv2.polylines(img=line_labels, pts=[approx_pts], isClosed=False, color=labels[index], thickness=5)
+
+        # the region that is covered by any of the two
+        x, y, w, h = cv2.boundingRect(np.maximum(fill_labels, line_labels))
+        if w > 0 and h > 0:
+            layer.roi = (y, y + h, x, x + w)
+            fill: NDArray[np.uint8] = fill_labels[y : y + h, x : x + w]
+            line: NDArray[np.uint8] = line_labels[y : y + h, x : x + w]
+
+            layer.fill_mask = (fill > 0).astype(np.uint8)
+            layer.fill_color = SEGMENT_COLORS[fill]
+            layer.line_mask = (line > 0).astype(np.uint8)
+            layer.line_color = SEGMENT_COLORS[line]
+            layer.fill_overlay = np.empty((h, w, 3), dtype=np.uint8)
+            layer.line_overlay = np.empty((h, w, 3), dtype=np.uint8)
+
+        self.segments = layer
+        self.renders["segments"] += 1
+        return layer
+
+    def draw_segments(self, layer: SegmentsLayer) -> None:
+        assert self.buffer is not None
+        if layer.roi is None:
+            return
+        assert layer.fill_overlay is not None and layer.line_overlay is not None
+
+        y1, y2, x1, x2 = layer.roi
+        region: NDArray[np.uint8] = self.buffer[y1:y2, x1:x2]
+
+        # the two overlays of Draw.draw_road_segments, only for the region
+        np.copyto(layer.fill_overlay, region)
+        cv2.copyTo(layer.fill_color, layer.fill_mask, layer.fill_overlay)
+        np.copyto(layer.line_overlay, region)
+        cv2.copyTo(layer.line_color, layer.line_mask, layer.line_overlay)
+
+        # the lines replace the image, the polygons are blended on top of them
+        cv2.addWeighted(
+            layer.fill_overlay, SEGMENT_ALPHA, layer.line_overlay, 1 - SEGMENT_ALPHA, 0, dst=layer.fill_overlay
+        )
+        np.copyto(region, layer.fill_overlay)
+
+    # ---------------------------------- PATHS ---------------------------------
+
+    def paths_layer(self, paths: PathsBox, config: ConfigSnapshot) -> PathsLayer:
+        crop_top: int = config.ROADSEGMENT_EXTRACTION_CROP_TOP
+        key: tuple[Any, ...] = (crop_top, id(paths), len(paths))
+        if self.paths is not None and self.paths.key == key and self.paths.source is paths:
+            return self.paths
+
+        layer = PathsLayer(key=key, source=paths)
+        for path in paths:
+            approx_pts: NDArray[np.int32] = path.approx_pts.copy()
+            approx_pts[:, 1] += crop_top
+            layer.pts.append(approx_pts)
+
+        self.paths = layer
+        self.renders["paths"] += 1
+        return layer
+
+    def draw_paths(self, layer: PathsLayer) -> None:
+        assert self.buffer is not None
+        for pts in layer.pts:
+            cv2.polylines(img=self.buffer, pts=[pts], isClosed=False, color=(139, 0, 0), thickness=5)
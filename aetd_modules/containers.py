@@ -2,10 +2,15 @@
 # This file holds the data containers storing various values from the image processing pipeline
 #
 
+from collections.abc import Iterator
+from typing import Any
+
 import numpy as np
 from cv2.typing import MatLike
 from numpy.typing import NDArray
 
+from configs import ConfigSnapshot, current
+
 
 class AnnotationsContainer:
     def __init__(self, img: MatLike, img_name: str) -> None:
@@ -23,12 +28,14 @@ class AnnotationsContainer:
             road_objects (RoadObjectsBox | None): The road objects.
             road_segments (RoadSegmentsBox | None): The road segments.
             paths (PathsBox | None): The paths.
+            timings (dict[str, float]): The runtime of each pipeline stage in seconds.
+            config (ConfigSnapshot): The config the annotations were made with.
         """
 
         self.original_img: MatLike = img
         self.original_img_name: str = img_name
-        # on initialization the original and annotated images are the same
-        self.annotated_img: MatLike = img.copy()
+        # created on the first draw, until then the annotated image is a copy of the original
+        self._annotated_img: MatLike | None = None
 
         self.speed: SpeedBox | None = None
         self.direction: DirectionBox | None = None
@@ -36,6 +43,25 @@ class AnnotationsContainer:
         self.road_segments: RoadSegmentsBox | None = None
         self.paths: PathsBox | None = None
 
+        self.timings: dict[str, float] = {}
+        self.config: ConfigSnapshot = current()
+
+    @property
+    def annotated_img(self) -> MatLike:
+        if self._annotated_img is None:
+            self._annotated_img = self.original_img.copy()
+        return self._annotated_img
+
+    @annotated_img.setter
+    def annotated_img(self, img: MatLike) -> None:
+        self._annotated_img = img
+
+    def is_annotated(self) -> bool:
+        """
+        Return True if the annotated image was created, False otherwise.
+        """
+        return self._annotated_img is not None
+
     def __str__(self) -> str:
         """
         Returns a string representation of the AnnotationsContainer.
@@ -60,6 +86,10 @@ class SpeedBox(int):
         - __new__: Creates a new SpeedBox instance given the speed.
     """
 
+    # the valid range
+    MIN: int = 0
+    MAX: int = 100
+
     def __new__(cls, speed: int) -> "SpeedBox":
         """
         Creates a new SpeedBox instance.
@@ -68,7 +98,7 @@ class SpeedBox(int):
             speed (int | None): The speed value to be wrapped.
         """
 
-        if 0 <= speed <= 100:
+        if cls.MIN <= speed <= cls.MAX:
             return super().__new__(cls, speed)
         else:
             raise ValueError(f"Invalid speed value: {speed}")
@@ -134,147 +164,492 @@ class PathsBox(list[Path]):
         self.append(path)
 
 
-class Vehicle:
+class RoadObject:
     """
-    This class holds the information for detected vehicles.
+    A view of one road object in a RoadObjectsBox. It holds no values of its own, it
+    reads and writes the row of its box, so changing cls changes the box.
+    An object created on its own gets a box with only itself in it.
 
     Args:
-        coords (tuple[int, int, int, int]): The coordinates of the vehicle.
-        cls (int): The class ID of the vehicle.
+        coords (tuple[int, int, int, int]): The coordinates of the object [x1, y1, x2, y2].
+        cls (int): The class ID of the object.
     """
 
+    __slots__ = ("box", "index")
+
+    # the class ID of the kind of object in the detection model
+    KIND: int = -1
+
     def __init__(self, coords: tuple[int, int, int, int], cls: int) -> None:
-        """
-        This class holds the information for detected vehicles.
+        self.box: RoadObjectsBox = RoadObjectsBox(
+            xyxy=np.array([coords], dtype=np.int32),
+            kind=np.array([self.KIND], dtype=np.int32),
+            cls=np.array([cls], dtype=np.int32),
+        )
+        self.index: int = 0
 
-        Args:
-            coords (tuple[int, int, int, int]): The coordinates of the vehicle.
-            cls (int): The class ID of the vehicle.
+    @classmethod
+    def view(cls, box: "RoadObjectsBox", index: int) -> "RoadObject":
         """
+        Return the view of the row with the index in the box.
+        """
+
+        obj: RoadObject = cls.__new__(cls)
+        obj.box = box
+        obj.index = index
+        return obj
+
+    @property
+    def coords(self) -> tuple[int, int, int, int]:
+        x1, y1, x2, y2 = self.box.xyxy[self.index].tolist()
+        return (x1, y1, x2, y2)
+
+    @property
+    def cls(self) -> int:
+        return int(self.box.cls[self.index])
 
-        self.coords: tuple[int, int, int, int] = coords
-        self.cls: int = cls
+    @cls.setter
+    def cls(self, cls: int) -> None:
+        self.box.cls[self.index] = cls
 
+    @property
+    def conf(self) -> float:
+        return float(self.box.conf[self.index])
 
-class Sign:
+    @property
+    def track_id(self) -> int:
+        return int(self.box.track_id[self.index])
+
+    @track_id.setter
+    def track_id(self, track_id: int) -> None:
+        self.box.track_id[self.index] = track_id
+
+
+class Sign(RoadObject):
     """
     This class holds the information for detected signs.
+    """
 
-    Args:
-        coords (tuple[int, int, int, int]): The coordinates of the sign.
-        cls (int): The class ID of the sign.
+    __slots__ = ()
+    KIND: int = 0
+
+
+class TrafficLight(RoadObject):
+    """
+    This class holds the information for detected traffic lights.
     """
 
-    def __init__(self, coords: tuple[int, int, int, int], cls: int) -> None:
-        """
-        This class holds the information for detected signs.
+    __slots__ = ()
+    KIND: int = 1
 
-        Args:
-            coords (tuple[int, int, int, int]): The coordinates of the sign.
-            cls (int): The class ID of the sign.
-        """
 
-        self.coords: tuple[int, int, int, int] = coords
-        self.cls: int = cls
+class Vehicle(RoadObject):
+    """
+    This class holds the information for detected vehicles.
+    """
+
+    __slots__ = ()
+    KIND: int = 2
+
 
+# the view class of every kind, by its class ID
+OBJECT_KINDS: tuple[type[Sign], type[TrafficLight], type[Vehicle]] = (Sign, TrafficLight, Vehicle)
 
-class TrafficLight:
+
+class RoadObjectsBox:
     """
-    This class holds the information for detected traffic lights.
+    This class holds the road objects of a frame as columns, one row per object.
+    Iterating or indexing it gives a view (Sign, TrafficLight or Vehicle) of a row.
 
     Args:
-        coords (tuple[int, int, int, int]): The coordinates of the traffic light.
-        cls (int): The class ID of the traffic light.
+        xyxy (NDArray[np.int32] | None): The coordinates [x1, y1, x2, y2] of the objects, shape (n, 4).
+        kind (NDArray[np.int32] | None): The class ID of the detection (0: Sign, 1: Traffic-Light, 2: Vehicle).
+        cls (NDArray[np.int32] | None): The class ID of the objects, refined by the classification.
+            The kind if None.
+        conf (NDArray[np.float32] | None): The confidence of the detections, 1 if None.
+        track_id (NDArray[np.int32] | None): The ID of the track of the objects, -1 if None.
+
+    Methods:
+        - add: Adds a road object to the box.
+        - select: Returns the objects selected by a mask or indices.
+        - of_kind: Returns the objects of the given kinds.
+        - with_class: Returns the objects with the given class IDs.
+        - in_region: Returns the objects with their center in the region.
+        - min_area: Returns the objects with at least the given area.
     """
 
-    def __init__(self, coords: tuple[int, int, int, int], cls: int) -> None:
+    __slots__ = ("xyxy", "kind", "cls", "conf", "track_id")
+
+    def __init__(
+        self,
+        xyxy: NDArray[np.int32] | None = None,
+        kind: NDArray[np.int32] | None = None,
+        cls: NDArray[np.int32] | None = None,
+        conf: NDArray[np.float32] | None = None,
+        track_id: NDArray[np.int32] | None = None,
+    ) -> None:
+        self.xyxy: NDArray[np.int32] = (
+            np.zeros((0, 4), dtype=np.int32) if xyxy is None else np.ascontiguousarray(xyxy, dtype=np.int32)
+        )
+        n: int = len(self.xyxy)
+
+        self.kind: NDArray[np.int32] = (
+            np.zeros(n, dtype=np.int32) if kind is None else np.ascontiguousarray(kind, dtype=np.int32)
+        )
+        if np.any((self.kind < 0) | (self.kind >= len(OBJECT_KINDS))):
+            raise ValueError(f"Unknown class ID: {self.kind[(self.kind < 0) | (self.kind >= len(OBJECT_KINDS))][0]}")
+
+        self.cls: NDArray[np.int32] = self.kind.copy() if cls is None else np.ascontiguousarray(cls, dtype=np.int32)
+        self.conf: NDArray[np.float32] = (
+            np.ones(n, dtype=np.float32) if conf is None else np.ascontiguousarray(conf, dtype=np.float32)
+        )
+        self.track_id: NDArray[np.int32] = (
+            np.full(n, -1, dtype=np.int32) if track_id is None else np.ascontiguousarray(track_id, dtype=np.int32)
+        )
+
+    def __len__(self) -> int:
+        return len(self.xyxy)
+
+    def __getitem__(self, index: int) -> Sign | TrafficLight | Vehicle:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("road object index out of range")
+        return OBJECT_KINDS[self.kind[index]].view(box=self, index=index)  # type: ignore[return-value]
+
+    def __iter__(self) -> Iterator[Sign | TrafficLight | Vehicle]:
+        for index, kind in enumerate(self.kind.tolist()):
+            yield OBJECT_KINDS[kind].view(box=self, index=index)  # type: ignore[misc]
+
+    def __str__(self) -> str:
+        return f"RoadObjectsBox({len(self)} objects)"
+
+    def add(self, road_object: RoadObject) -> None:
         """
-        This class holds the information for detected traffic lights.
+        Add a road object to the box. Every call copies the columns, build the box
+        from the arrays instead if there are many objects.
 
         Args:
-            coords (tuple[int, int, int, int]): The coordinates of the traffic light.
-            cls (int): The class ID of the traffic light.
+            road_object (RoadObject): The road object to be added.
         """
 
-        self.coords: tuple[int, int, int, int] = coords
-        self.cls: int = cls
+        i: int = road_object.index
+        other: RoadObjectsBox = road_object.box
+        self.xyxy = np.concatenate((self.xyxy, other.xyxy[i : i + 1]))
+        self.kind = np.append(self.kind, other.kind[i])
+        self.cls = np.append(self.cls, other.cls[i])
+        self.conf = np.append(self.conf, other.conf[i])
+        self.track_id = np.append(self.track_id, other.track_id[i])
 
+    def select(self, selection: NDArray[np.bool_] | NDArray[np.intp]) -> "RoadObjectsBox":
+        """
+        Return a new box with the objects selected by a boolean mask or by indices.
+        """
 
-class RoadObjectsBox(list[Vehicle | Sign | TrafficLight]):
-    """
-    This class holds a list of road objects.
+        return RoadObjectsBox(
+            xyxy=self.xyxy[selection],
+            kind=self.kind[selection],
+            cls=self.cls[selection],
+            conf=self.conf[selection],
+            track_id=self.track_id[selection],
+        )
 
-    Methods:
-        - add: Adds a road object to the list.
-    """
+    def of_kind(self, *kinds: type[RoadObject]) -> "RoadObjectsBox":
+        """
+        Return the objects of the given kinds, e.g. box.of_kind(Sign, TrafficLight).
+        """
+
+        return self.select(np.isin(self.kind, [kind.KIND for kind in kinds]))
 
-    def add(self, road_object: Vehicle | Sign | TrafficLight) -> None:
+    def with_class(self, *classes: int) -> "RoadObjectsBox":
+        """
+        Return the objects with the given (refined) class IDs.
         """
-        Add a road object to the list.
 
-        Args:
-            road_object (Vehicle | Sign | TrafficLight): The road object to be added.
+        return self.select(np.isin(self.cls, classes))
+
+    def in_region(self, x1: int, y1: int, x2: int, y2: int) -> "RoadObjectsBox":
+        """
+        Return the objects with the center of their box in the region [x1, x2) x [y1, y2).
+        """
+
+        cx: NDArray[np.int32] = (self.xyxy[:, 0] + self.xyxy[:, 2]) // 2
+        cy: NDArray[np.int32] = (self.xyxy[:, 1] + self.xyxy[:, 3]) // 2
+        return self.select((cx >= x1) & (cx < x2) & (cy >= y1) & (cy < y2))
+
+    def areas(self) -> NDArray[np.int32]:
+        """
+        Return the area of the box of every object.
+        """
+
+        return (self.xyxy[:, 2] - self.xyxy[:, 0]) * (self.xyxy[:, 3] - self.xyxy[:, 1])
+
+    def min_area(self, area: int) -> "RoadObjectsBox":
+        """
+        Return the objects with a box of at least the given area.
         """
 
-        self.append(road_object)
+        return self.select(self.areas() >= area)
 
 
-class Driveable:
+class RoadSegment:
     """
-    This class holds the information for a driveable area.
+    A view of one road segment in a RoadSegmentsBox. It holds no values of its own,
+    the contour is a view of the box and the path is created from the box on access.
+    A segment created on its own gets a box with only itself in it.
 
     Args:
-        pts (NDArray[np.int32]): The points of the polygon.
+        pts (NDArray[np.int32]): The points of the polygon, shape (k, 1, 2).
         path (Path): The path associated with the polygon.
     """
 
+    __slots__ = ("box", "index")
+
+    # the class ID of the kind of segment in the segmentation model
+    KIND: int = -1
+
     def __init__(self, pts: NDArray[np.int32], path: Path) -> None:
-        self.pts: NDArray[np.int32] = pts
-        self.path: Path = path
+        self.box: RoadSegmentsBox = RoadSegmentsBox.from_segments(kinds=[self.KIND], contours=[pts], paths=[path])
+        self.index: int = 0
 
+    @classmethod
+    def view(cls, box: "RoadSegmentsBox", index: int) -> "RoadSegment":
+        """
+        Return the view of the row with the index in the box.
+        """
 
-class Impassable:
-    """
-    This class holds the information for a impassable lane.
+        segment: RoadSegment = cls.__new__(cls)
+        segment.box = box
+        segment.index = index
+        return segment
 
-    Args:
-        pts (NDArray[np.int32]): The points of the polygon.
-        path (Path): The path associated with the polygon.
+    @property
+    def pts(self) -> NDArray[np.int32]:
+        return self.box.contour(index=self.index)
+
+    @property
+    def path(self) -> Path:
+        return self.box.path(index=self.index)
+
+
+class Driveable(RoadSegment):
+    """
+    This class holds the information for a driveable area.
     """
 
-    def __init__(self, pts: NDArray[np.int32], path: Path) -> None:
-        self.pts: NDArray[np.int32] = pts
-        self.path: Path = path
+    __slots__ = ()
+    KIND: int = 0
 
 
-class Passable:
+class Passable(RoadSegment):
     """
     This class holds the information for a passable lane.
+    """
 
-    Args:
-        pts (NDArray[np.int32]): The points of the polygon.
-        path (Path): The path associated with the polygon.
+    __slots__ = ()
+    KIND: int = 1
+
+
+class Impassable(RoadSegment):
+    """
+    This class holds the information for a impassable lane.
     """
 
-    def __init__(self, pts: NDArray[np.int32], path: Path) -> None:
-        self.pts: NDArray[np.int32] = pts
-        self.path: Path = path
+    __slots__ = ()
+    KIND: int = 2
 
 
-class RoadSegmentsBox(list[Driveable | Passable | Impassable]):
+# the view class of every kind, by its class ID
+SEGMENT_KINDS: tuple[type[Driveable], type[Passable], type[Impassable]] = (Driveable, Passable, Impassable)
+
+
+def ragged(arrays: list[NDArray[Any]], width: int, dtype: type) -> tuple[NDArray[Any], NDArray[np.int64]]:
+    """
+    Concatenate the arrays of rows into one array, with the offsets of every array in it.
     """
-    This class holds a list of road segments.
+
+    offsets: NDArray[np.int64] = np.zeros(len(arrays) + 1, dtype=np.int64)
+    if not arrays:
+        return np.zeros((0, width), dtype=dtype), offsets
+    offsets[1:] = np.cumsum([len(array) for array in arrays])
+    return np.concatenate([array.reshape(-1, width) for array in arrays]).astype(dtype, copy=False), offsets
+
+
+class RoadSegmentsBox:
+    """
+    This class holds the road segments of a frame as columns, one row per segment.
+    The contours and the points of the paths have a different length for every
+    segment, they are stored as one array of points with the offsets of every segment.
+    Iterating or indexing it gives a view (Driveable, Passable or Impassable) of a row.
+
+    Args:
+        kind (NDArray[np.int32] | None): The class ID of the segments (0: Driveable, 1: Passable, 2: Impassable).
+        points (NDArray[np.int32] | None): The points of all contours, shape (N, 2).
+        offsets (NDArray[np.int64] | None): Segment i has the points [offsets[i], offsets[i + 1]), shape (n + 1,).
+        coeffs (NDArray[np.float64] | None): The coefficients x = f(y) of the paths, highest first, shape (n, 3).
+        path_points (NDArray[np.int32] | None): The approximated points of all paths, shape (M, 2).
+        path_offsets (NDArray[np.int64] | None): The offsets of the paths in path_points, shape (n + 1,).
+        scope (NDArray[np.float64] | None): The lowest and highest x of every path, shape (n, 2).
+        value_range (NDArray[np.int32] | None): The lowest and highest y of every path, shape (n, 2).
+
+    Attributes:
+        x_sum (NDArray[np.int64]): The sum of the x of the points of every path.
+        path_lengths (NDArray[np.int64]): The number of points of every path.
 
     Methods:
-        - add: Adds a road segment to the list.
+        - add: Adds a road segment to the box.
+        - contour: Returns the contour of a segment.
+        - path: Returns the path of a segment.
+        - distances: Returns the mean distance of every path to a vertical line.
+        - select: Returns the segments selected by a mask or indices.
     """
 
-    def add(self, road_segment: Driveable | Passable | Impassable) -> None:
+    __slots__ = (
+        "kind",
+        "points",
+        "offsets",
+        "coeffs",
+        "path_points",
+        "path_offsets",
+        "scope",
+        "value_range",
+        "x_sum",
+        "path_lengths",
+    )
+
+    def __init__(
+        self,
+        kind: NDArray[np.int32] | None = None,
+        points: NDArray[np.int32] | None = None,
+        offsets: NDArray[np.int64] | None = None,
+        coeffs: NDArray[np.float64] | None = None,
+        path_points: NDArray[np.int32] | None = None,
+        path_offsets: NDArray[np.int64] | None = None,
+        scope: NDArray[np.float64] | None = None,
+        value_range: NDArray[np.int32] | None = None,
+    ) -> None:
+        self.kind: NDArray[np.int32] = np.zeros(0, dtype=np.int32) if kind is None else kind
+        n: int = len(self.kind)
+        self.points: NDArray[np.int32] = np.zeros((0, 2), dtype=np.int32) if points is None else points
+        self.offsets: NDArray[np.int64] = np.zeros(n + 1, dtype=np.int64) if offsets is None else offsets
+        self.coeffs: NDArray[np.float64] = np.zeros((n, 3), dtype=np.float64) if coeffs is None else coeffs
+        self.path_points: NDArray[np.int32] = np.zeros((0, 2), dtype=np.int32) if path_points is None else path_points
+        self.path_offsets: NDArray[np.int64] = np.zeros(n + 1, dtype=np.int64) if path_offsets is None else path_offsets
+        self.scope: NDArray[np.float64] = np.zeros((n, 2), dtype=np.float64) if scope is None else scope
+        self.value_range: NDArray[np.int32] = np.zeros((n, 2), dtype=np.int32) if value_range is None else value_range
+
+        # the summary of every path, computed once for all users of the box
+        x_cumsum: NDArray[np.int64] = np.concatenate(([0], np.cumsum(self.path_points[:, 0], dtype=np.int64)))
+        self.x_sum: NDArray[np.int64] = x_cumsum[self.path_offsets[1:]] - x_cumsum[self.path_offsets[:-1]]
+        self.path_lengths: NDArray[np.int64] = np.diff(self.path_offsets)
+
+    @classmethod
+    def from_segments(cls, kinds: list[int], contours: list[NDArray[np.int32]], paths: list[Path]) -> "RoadSegmentsBox":
+        """
+        Create the box from the kind, the contour and the path of every segment.
         """
-        Add a road segment to the list.
+
+        for kind in kinds:
+            if not 0 <= kind < len(SEGMENT_KINDS):
+                raise ValueError(f"Unknown class ID: {kind}")
+
+        points, offsets = ragged(arrays=contours, width=2, dtype=np.int32)
+        path_points, path_offsets = ragged(arrays=[path.approx_pts for path in paths], width=2, dtype=np.int32)
+
+        # always three coefficients, a poly1d drops the leading zeros
+        coeffs: NDArray[np.float64] = np.zeros((len(paths), 3), dtype=np.float64)
+        for i, path in enumerate(paths):
+            if len(path.f.coeffs) > 3:
+                raise ValueError(f"The path has a degree above 2: {path.f}")
+            coeffs[i, 3 - len(path.f.coeffs) :] = path.f.coeffs
+
+        return cls(
+            kind=np.array(kinds, dtype=np.int32),
+            points=points,
+            offsets=offsets,
+            coeffs=coeffs,
+            path_points=path_points,
+            path_offsets=path_offsets,
+            scope=np.array([path.scope_definition for path in paths], dtype=np.float64).reshape(-1, 2),
+            value_range=np.array([path.value_range for path in paths], dtype=np.int32).reshape(-1, 2),
+        )
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def __getitem__(self, index: int) -> Driveable | Passable | Impassable:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("road segment index out of range")
+        return SEGMENT_KINDS[self.kind[index]].view(box=self, index=index)  # type: ignore[return-value]
+
+    def __iter__(self) -> Iterator[Driveable | Passable | Impassable]:
+        for index, kind in enumerate(self.kind.tolist()):
+            yield SEGMENT_KINDS[kind].view(box=self, index=index)  # type: ignore[misc]
+
+    def __str__(self) -> str:
+        return f"RoadSegmentsBox({len(self)} segments)"
+
+    def add(self, road_segment: RoadSegment) -> None:
+        """
+        Add a road segment to the box. Every call copies the columns, build the box
+        with from_segments instead if there are many segments.
 
         Args:
-            road_segment (Driveable | Passable | Impassable): The road segment to be added.
+            road_segment (RoadSegment): The road segment to be added.
+        """
+
+        merged: RoadSegmentsBox = RoadSegmentsBox.from_segments(
+            kinds=self.kind.tolist() + [road_segment.KIND],
+            contours=[segment.pts for segment in self] + [road_segment.pts],
+            paths=[segment.path for segment in self] + [road_segment.path],
+        )
+        for name in RoadSegmentsBox.__slots__:
+            setattr(self, name, getattr(merged, name))
+
+    def contour(self, index: int) -> NDArray[np.int32]:
+        """
+        Return the contour of the segment in the shape of cv2.findContours (k, 1, 2), a view of the box.
         """
 
-        self.append(road_segment)
+        return self.points[self.offsets[index] : self.offsets[index + 1]].reshape(-1, 1, 2)
+
+    def path_pts(self, index: int) -> NDArray[np.int32]:
+        """
+        Return the approximated points of the path of the segment (k, 2), a view of the box.
+        """
+
+        return self.path_points[self.path_offsets[index] : self.path_offsets[index + 1]]
+
+    def path(self, index: int) -> Path:
+        """
+        Return the path of the segment.
+        """
+
+        return Path(
+            f=np.poly1d(self.coeffs[index]),
+            approx_pts=self.path_pts(index=index),
+            scope_definition=(self.scope[index, 0], self.scope[index, 1]),
+            value_range=(self.value_range[index, 0], self.value_range[index, 1]),
+        )
+
+    def distances(self, x: int) -> NDArray[np.float64]:
+        """
+        Return the mean distance of the points of every path to the vertical line at x,
+        negative on the left of it.
+        """
+
+        return (self.x_sum - self.path_lengths * x) / self.path_lengths
+
+    def select(self, selection: NDArray[np.bool_] | NDArray[np.intp]) -> "RoadSegmentsBox":
+        """
+        Return a new box with the segments selected by a boolean mask or by indices.
+        """
+
+        indices: list[int] = np.arange(len(self))[selection].tolist()
+        return RoadSegmentsBox.from_segments(
+            kinds=self.kind[indices].tolist(),
+            contours=[self.contour(index=i) for i in indices],
+            paths=[self.path(index=i) for i in indices],
+        )
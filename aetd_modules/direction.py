@@ -10,9 +10,10 @@ import numpy as np
 from cv2.typing import MatLike
 from numpy import intp
 
-from configs import globals
+from configs import ConfigSnapshot
 
 from .containers import DirectionBox
+from .frame_context import FrameContext, downscale
 
 
 class DirectionExtractor:
@@ -23,6 +24,7 @@ class DirectionExtractor:
 
         Methods:
             - process: The main processing pipeline for extracting direction data.
+            - analyze: Measure the bias and the on-lane ratio at the analysis scale.
             - crop: Crop the image to the region of interest.
             - getRedComponents: Enhance the red components of the image.
             - gray: Convert the image to grayscale.
@@ -37,67 +39,79 @@ class DirectionExtractor:
         pass
 
     @staticmethod
-    def process(raw_img: MatLike) -> DirectionBox | None:
+    def process(raw_img: MatLike, frame: FrameContext | None = None) -> DirectionBox | None:
         """
         The processing pipeline for extracting navigation data from the image.
 
         Args:
             raw_img (MatLike): The input image from which to extract navigation data.
+            frame (FrameContext | None): The context of the frame, created from raw_img if None.
 
         Returns:
             DirectionBox | None: The extracted direction data or None.
         """
 
-        # always create a copy of the original image for safety
-        img: MatLike = raw_img.copy()
-        img = DirectionExtractor.crop(img=img, height=img.shape[0], width=img.shape[1])
+        weight, on_lane = DirectionExtractor.analyze(frame=frame or FrameContext(img=raw_img))
+        direction: int | None = DirectionExtractor.determineDirection(weight=weight, on_lane=on_lane)
+
+        if direction is not None:
+            return DirectionBox(direction=direction)
+        else:
+            return None
+
+    @staticmethod
+    def analyze(frame: FrameContext) -> tuple[int, float]:
+        """
+        Measure the bias and the on-lane ratio of the road advisor. The crop is analyzed
+        at the analysis scale of the config, both values are relative to the size of the
+        crop, so they need no scaling back.
+
+        Args:
+            frame (FrameContext): The frame to analyze.
+
+        Returns:
+            tuple[int, float]: The bias and the on-lane ratio.
+        """
+
+        config: ConfigSnapshot = frame.config
+
+        # a read-only view, every step below creates a new image
+        img: MatLike = downscale(img=DirectionExtractor.crop(frame=frame), scale=config.direction_scale)
 
         # take the width and height from the image after the cropping
         height: int = img.shape[0]
         width: int = img.shape[1]
 
-        img = DirectionExtractor.getRedComponents(img=img)
+        img = DirectionExtractor.getRedComponents(img=img, config=config)
         img = DirectionExtractor.gray(img=img)
         img = DirectionExtractor.binary(img=img)
-        img = DirectionExtractor.findContours(img=img)
+        img = DirectionExtractor.findContours(img=img, config=config)
         weight: int = DirectionExtractor.calculateBias(img=img, width=width, height=height)
-        on_lane: float = DirectionExtractor.calculateOnLane(img=img, width=width, height=height)
-        direction: int | None = DirectionExtractor.determineDirection(weight=weight, on_lane=on_lane)
-
-        if direction is not None:
-            return DirectionBox(direction=direction)
-        else:
-            return None
+        on_lane: float = DirectionExtractor.calculateOnLane(img=img, height=height, config=config)
+        return weight, on_lane
 
     @staticmethod
-    def crop(img: MatLike, width: int, height: int) -> MatLike:
+    def crop(frame: FrameContext) -> MatLike:
         """
         Crop the image to the region of interest defined in the config.
 
         Args:
-            img (MatLike): The input image to crop.
-            width (int): The width of the image.
-            height (int): The height of the image.
+            frame (FrameContext): The frame to crop.
 
         Returns:
-            MatLike: The cropped image.
+            MatLike: The cropped image, a read-only view of the frame.
         """
 
-        top: int = globals.DIRECTION_EXTRACTION_CROP_TOP
-        bottom: int = height - globals.DIRECTION_EXTRACTION_CROP_BOTTOM
-        left: int = globals.DIRECTION_EXTRACTION_CROP_LEFT
-        right: int = width - globals.DIRECTION_EXTRACTION_CROP_RIGHT
-
-        img = img[top:bottom, left:right]
-        return img
+        return frame.roi(name="direction")
 
     @staticmethod
-    def getRedComponents(img: MatLike) -> MatLike:
+    def getRedComponents(img: MatLike, config: ConfigSnapshot) -> MatLike:
         """
         Enhance the red components (pixels that are mostly red) of the image.
 
         Args:
             img (MatLike): The input image to process.
+            config (ConfigSnapshot): The config with the red threshold.
 
         Returns:
             MatLike: The processed image with enhanced red components.
@@ -108,7 +122,7 @@ class DirectionExtractor:
         r: MatLike
         b, g, r = cv2.split(m=img)
 
-        red_dominant = (r > globals.DIRECTION_EXTRACTION_RED_THRESHOLD) & (r > g) & (r > b)
+        red_dominant = (r > config.DIRECTION_EXTRACTION_RED_THRESHOLD) & (r > g) & (r > b)
         img = np.zeros_like(a=img)
         img[red_dominant] = [0, 0, 255]
 
@@ -145,12 +159,13 @@ class DirectionExtractor:
         return img
 
     @staticmethod
-    def findContours(img: MatLike) -> MatLike:
+    def findContours(img: MatLike, config: ConfigSnapshot) -> MatLike:
         """
         Find contours of the red parts in the image.
 
         Args:
             img (MatLike): The input image to process.
+            config (ConfigSnapshot): The config with the minimum contour area at the analysis scale.
 
         Returns:
             MatLike: The processed image with contours drawn.
@@ -162,7 +177,7 @@ class DirectionExtractor:
         img = np.zeros_like(a=img)
         for cnt in contours:
             area: float = cv2.contourArea(contour=cnt)
-            if area >= globals.DIRECTION_EXTRACTION_CONTOUR_MIN_AREA:
+            if area >= config.direction_min_area:
                 img = cv2.drawContours(
                     image=img,
                     contours=[cnt],
@@ -196,24 +211,21 @@ class DirectionExtractor:
         return int((bias / max_bias) * 100)
 
     @staticmethod
-    def calculateOnLane(img: MatLike, width: int, height: int) -> float:
+    def calculateOnLane(img: MatLike, height: int, config: ConfigSnapshot) -> float:
         """
         Calculate the on-lane ratio based on the detected red parts where
         1 means fully on lane and 0 means fully off lane.
 
         Args:
             img (Img): The input image to process.
-            width (int): The width of the image.
             height (int): The height of the image.
+            config (ConfigSnapshot): The config with the crop of the center pillar at the analysis scale.
 
         Returns:
             float: The calculated on-lane ratio.
         """
 
-        pillar: MatLike = img[
-            : height // 2,
-            globals.DIRECTION_EXTRACTION_CENTER_PILLAR_CROP : width - globals.DIRECTION_EXTRACTION_CENTER_PILLAR_CROP,
-        ]
+        pillar: MatLike = img[: height // 2, config.direction_pillar]
         xs = np.where(pillar == 255)[1]
         return (len(xs) / pillar.size) if len(xs) > 0 else 0
 
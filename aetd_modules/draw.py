@@ -1,9 +1,9 @@
 import cv2
 from cv2.typing import MatLike, NumPyArrayNumeric
 
-from configs import globals
+from configs import ConfigSnapshot
 
-from .containers import AnnotationsContainer, Driveable, Impassable, Passable, Path, Sign, TrafficLight, Vehicle
+from .containers import AnnotationsContainer, Driveable, Impassable, Passable, Path, RoadObjectsBox, RoadSegmentsBox
 
 
 class Draw:
@@ -22,11 +22,11 @@ class Draw:
         if annotations.speed is not None:
             img = Draw.draw_speed(img=img, speed=annotations.speed)
         if annotations.road_objects is not None:
-            img = Draw.draw_road_objects(img=img, objects=annotations.road_objects)
+            img = Draw.draw_road_objects(img=img, objects=annotations.road_objects, config=annotations.config)
         if annotations.road_segments is not None:
-            img = Draw.draw_road_segments(img=img, segments=annotations.road_segments)
+            img = Draw.draw_road_segments(img=img, segments=annotations.road_segments, config=annotations.config)
         if annotations.paths is not None:
-            img = Draw.draw_paths(img=img, paths=annotations.paths)
+            img = Draw.draw_paths(img=img, paths=annotations.paths, config=annotations.config)
 
         annotations.annotated_img = img
         return annotations
@@ -111,13 +111,14 @@ class Draw:
         return img
 
     @staticmethod
-    def draw_road_objects(img: MatLike, objects: list[Vehicle | Sign | TrafficLight]) -> MatLike:
+    def draw_road_objects(img: MatLike, objects: RoadObjectsBox, config: ConfigSnapshot) -> MatLike:
         """
         Draw the road objects as bounding boxes on the image.
 
         Args:
             img (MatLike): The image to draw on.
-            objects (list[Vehicle | Sign | TrafficLight]): The road objects to draw.
+            objects (RoadObjectsBox): The road objects to draw.
+            config (ConfigSnapshot): The config the road objects were detected with.
 
         Returns:
             MatLike: The image with the road objects drawn on it.
@@ -128,8 +129,8 @@ class Draw:
             x1, y1, x2, y2 = obj.coords
 
             # take the offset of 160px into account
-            y1 += globals.ROADOBJECT_EXTRACTION_CROP_TOP
-            y2 += globals.ROADOBJECT_EXTRACTION_CROP_TOP
+            y1 += config.ROADOBJECT_EXTRACTION_CROP_TOP
+            y2 += config.ROADOBJECT_EXTRACTION_CROP_TOP
 
             cv2.rectangle(img=img, pt1=(x1, y1), pt2=(x2, y2), color=(0, 255, 0), thickness=2)
 
@@ -155,13 +156,14 @@ class Draw:
         return img
 
     @staticmethod
-    def draw_road_segments(img: MatLike, segments: list[Driveable | Passable | Impassable]) -> MatLike:
+    def draw_road_segments(img: MatLike, segments: RoadSegmentsBox, config: ConfigSnapshot) -> MatLike:
         """
         Draw the road segments on the image.
 
         Args:
             img (MatLike): The image to draw on.
-            segments (list[Driveable | Passable | Impassable]): The road segments to draw.
+            segments (RoadSegmentsBox): The road segments to draw.
+            config (ConfigSnapshot): The config the road segments were detected with.
 
         Returns:
             MatLike: The image with the road segments drawn on it.
@@ -182,17 +184,17 @@ class Draw:
             if isinstance(segment, Driveable):
                 # take the cropping into account
                 pts: NumPyArrayNumeric = segment.pts.copy().squeeze(1)
-                pts[:, 1] += globals.ROADSEGMENT_EXTRACTION_CROP_TOP
+                pts[:, 1] += config.ROADSEGMENT_EXTRACTION_CROP_TOP
 
                 cv2.fillPoly(img=pts_overlay, pts=[pts], color=colormap[type(segment)])
 
         for segment in segments:
             if not isinstance(segment, Driveable):
                 pts: NumPyArrayNumeric = segment.pts.copy().squeeze(1)
-                pts[:, 1] += globals.ROADSEGMENT_EXTRACTION_CROP_TOP
+                pts[:, 1] += config.ROADSEGMENT_EXTRACTION_CROP_TOP
 
                 approx_pts: NumPyArrayNumeric = segment.path.approx_pts.copy()
-                approx_pts[:, 1] += globals.ROADSEGMENT_EXTRACTION_CROP_TOP
+                approx_pts[:, 1] += config.ROADSEGMENT_EXTRACTION_CROP_TOP
 
                 cv2.fillPoly(img=pts_overlay, pts=[pts], color=colormap[type(segment)])
                 cv2.polylines(
@@ -206,13 +208,14 @@ class Draw:
         return img
 
     @staticmethod
-    def draw_paths(img: MatLike, paths: list[Path]) -> MatLike:
+    def draw_paths(img: MatLike, paths: list[Path], config: ConfigSnapshot) -> MatLike:
         """
         Draw the paths on the image.
 
         Args:
             img (MatLike): The image to draw on.
             paths (list[Path]): The paths to draw.
+            config (ConfigSnapshot): The config the paths were planned with.
 
         Returns:
             MatLike: The image with the paths drawn on it.
@@ -220,7 +223,7 @@ class Draw:
 
         for path in paths:
             approx_pts: NumPyArrayNumeric = path.approx_pts.copy()
-            approx_pts[:, 1] += globals.ROADSEGMENT_EXTRACTION_CROP_TOP
+            approx_pts[:, 1] += config.ROADSEGMENT_EXTRACTION_CROP_TOP
             cv2.polylines(img=img, pts=[approx_pts], isClosed=False, color=(139, 0, 0), thickness=5)
 
         return img
@@ -0,0 +1,102 @@
+#
+# The FrameContext is one frame on its way through the pipeline. The stages get read-only views of the regions
+# they work on, instead of copies of the whole frame. A stage that only needs coarse geometry can analyze its
+# region at a smaller scale, the helpers below map the coordinates between the two.
+#
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+from numpy.typing import NDArray
+
+from configs import ConfigSnapshot, current
+
+
+def read_only(img: MatLike) -> NDArray[np.uint8]:
+    """
+    Return a read-only view of the image, without copying it.
+    """
+
+    view: NDArray[np.uint8] = np.asarray(img).view()
+    view.flags.writeable = False
+    return view
+
+
+def scaled_shape(height: int, width: int, scale: float) -> tuple[int, int]:
+    """
+    Return the (height, width) of an image of the given size at the analysis scale.
+    """
+
+    return max(1, round(height * scale)), max(1, round(width * scale))
+
+
+def downscale(img: MatLike, scale: float) -> MatLike:
+    """
+    Return the image at the analysis scale, the image itself at scale 1.
+    """
+
+    if scale == 1:
+        return img
+    height, width = scaled_shape(height=img.shape[0], width=img.shape[1], scale=scale)
+    return cv2.resize(src=img, dsize=(width, height), interpolation=cv2.INTER_AREA)
+
+
+def to_analysis(pts: NDArray[np.float32] | NDArray[np.int32], scale: float) -> NDArray[np.int32]:
+    """
+    Map pixel coordinates of the frame to integer coordinates of the analysis scale,
+    pixel centers to pixel centers. At scale 1 they are only truncated.
+    """
+
+    if scale == 1:
+        return pts.astype(np.int32)
+    return np.rint((pts + 0.5) * scale - 0.5).astype(np.int32)
+
+
+def to_frame(pts: NDArray[np.int32], scale: float) -> NDArray[np.int32]:
+    """
+    Map pixel coordinates of the analysis scale back to the frame, pixel centers to pixel centers.
+    """
+
+    if scale == 1:
+        return pts
+    return np.rint((pts + 0.5) / scale - 0.5).astype(np.int32)
+
+
+class FrameContext:
+    """
+    A frame and the config it is processed with. The frame is read-only, every stage
+    gets a view of its region of interest. A stage that has to write to its region
+    copies the region, never the whole frame.
+
+    Args:
+        img (MatLike): The frame.
+        config (ConfigSnapshot | None): The config of the frame, the newest if None.
+
+    Regions:
+        - direction: The road advisor.
+        - speed: The speedometer.
+        - objects: The rows the road objects are detected in.
+        - segments: The rows the road segments are detected in.
+    """
+
+    def __init__(self, img: MatLike, config: ConfigSnapshot | None = None) -> None:
+        self.img: NDArray[np.uint8] = read_only(img=img)
+        self.config: ConfigSnapshot = config or current()
+
+    def roi(self, name: str) -> NDArray[np.uint8]:
+        """
+        Return the read-only view of the region with the given name.
+        """
+
+        if name == "direction":
+            rows, cols = self.config.direction_crop
+            return self.img[rows, cols]
+        elif name == "speed":
+            rows, cols = self.config.speed_crop
+            return self.img[rows, cols]
+        elif name == "objects":
+            return self.img[self.config.objects_crop]
+        elif name == "segments":
+            return self.img[self.config.segments_crop]
+        else:
+            raise ValueError(f"Unknown region: {name}")
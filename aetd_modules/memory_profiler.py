@@ -0,0 +1,201 @@
+#
+# The MemoryProfiler attributes the memory of the frame loop to the stages and to the lines of the stages. It is
+# opt-in: it serializes the stages and traces their lines, the frame loop gets a lot slower while it is active.
+#
+
+import os
+import sys
+import threading
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Callable
+from types import FrameType
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# only the lines of the project are traced, the allocations of the libraries count for the calling line
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Site = tuple[str, int]
+
+
+def peak_rss() -> int:
+    """
+    Return the peak resident memory of the process in bytes, 0 if unknown.
+    """
+
+    if resource is None:
+        return 0
+    # kilobytes on Linux, bytes on macOS
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageMemory:
+    """
+    The memory of one stage in one frame, in bytes.
+
+    Args:
+        allocated (int): The memory the lines of the stage allocated, summed over the lines.
+        peak (int): The highest memory above the start of the stage.
+        retained (int): The memory that was still allocated at the end of the stage.
+    """
+
+    __slots__ = ("allocated", "peak", "retained")
+
+    def __init__(self, allocated: int = 0, peak: int = 0, retained: int = 0) -> None:
+        self.allocated: int = allocated
+        self.peak: int = peak
+        self.retained: int = retained
+
+
+class MemoryProfiler:
+    """
+    Measures the memory per stage and per frame with tracemalloc, NumPy and OpenCV
+    arrays included. A stage runs alone while it is measured, the peak of the
+    stage is its own. The lines of the stage are traced: the growth of the traced
+    memory between two lines counts as allocated by the first one, so memory that
+    is freed before the stage ends (a full-frame mask) still shows up.
+
+    Args:
+        nframes (int): The depth of the tracebacks tracemalloc stores.
+
+    Methods:
+        - start: Starts tracemalloc.
+        - stop: Stops tracemalloc.
+        - measure: Runs a stage and measures its memory.
+        - end_frame: Closes the measurements of a frame.
+        - stages: The per frame memory of every stage.
+        - top_sites: The lines that allocated the most memory.
+    """
+
+    def __init__(self, nframes: int = 1) -> None:
+        self.nframes: int = nframes
+
+        # the stages run one after another
+        self.lock = threading.Lock()
+
+        # the measurements of the current frame, by stage
+        self.frame: dict[str, StageMemory] = {}
+        # the measurements of all frames
+        self.frames: list[dict[str, StageMemory]] = []
+        self.traced: list[int] = []
+        self.rss: list[int] = []
+
+        # bytes by (stage, site), over all frames
+        self.sites: defaultdict[tuple[str, Site], int] = defaultdict(int)
+
+        # the state of the line tracer, only used while the lock is held
+        self.stage: str = ""
+        self.last_memory: int = 0
+        self.last_site: Site | None = None
+        self.allocated: int = 0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+
+    def trace(self, frame: FrameType, event: str, arg: Any) -> Callable[..., Any] | None:
+        """
+        The trace function of the stage, only the frames of the project are traced.
+        """
+
+        if not frame.f_code.co_filename.startswith(ROOT):
+            return None
+        if event == "line" or event == "return":
+            self.account()
+            self.last_site = (frame.f_code.co_filename, frame.f_lineno)
+        return self.trace
+
+    def account(self) -> None:
+        """
+        Count the growth of the traced memory since the last line for that line.
+        """
+
+        memory: int = tracemalloc.get_traced_memory()[0]
+        if memory > self.last_memory and self.last_site is not None:
+            self.sites[(self.stage, self.last_site)] += memory - self.last_memory
+            self.allocated += memory - self.last_memory
+        self.last_memory = memory
+
+    def measure(self, stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Call fn as the stage and measure its memory. A stage measured more than once
+        in a frame is summed.
+        """
+
+        with self.lock:
+            self.stage = stage
+            self.allocated = 0
+            self.last_site = None
+            tracemalloc.reset_peak()
+            start: int = tracemalloc.get_traced_memory()[0]
+            self.last_memory = start
+
+            sys.settrace(self.trace)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                sys.settrace(None)
+                self.account()
+                current, peak = tracemalloc.get_traced_memory()
+
+                memory: StageMemory = self.frame.setdefault(stage, StageMemory())
+                memory.allocated += self.allocated
+                memory.peak = max(memory.peak, peak - start)
+                memory.retained += current - start
+
+    def end_frame(self) -> None:
+        """
+        Close the measurements of the frame, the next measured stage belongs to the next frame.
+        """
+
+        with self.lock:
+            self.frames.append(self.frame)
+            self.frame = {}
+            self.traced.append(tracemalloc.get_traced_memory()[0])
+            self.rss.append(peak_rss())
+
+    def stages(self) -> dict[str, NDArray[np.int64]]:
+        """
+        Return the (allocated, peak, retained) bytes of every stage per frame, shape (frames, 3).
+        A frame without the stage counts as zero.
+        """
+
+        names: list[str] = list(dict.fromkeys(name for frame in self.frames for name in frame))
+        return {
+            name: np.array(
+                [
+                    (memory.allocated, memory.peak, memory.retained)
+                    if (memory := frame.get(name)) is not None
+                    else (0, 0, 0)
+                    for frame in self.frames
+                ],
+                dtype=np.int64,
+            ).reshape(-1, 3)
+            for name in names
+        }
+
+    def top_sites(self, limit: int = 10) -> list[tuple[str, str, int]]:
+        """
+        Return the lines that allocated the most memory over all frames.
+
+        Returns:
+            list[tuple[str, str, int]]: The stage, the line (file:line) and the bytes.
+        """
+
+        ranked = sorted(self.sites.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            (stage, f"{os.path.relpath(filename, ROOT)}:{lineno}", allocated)
+            for (stage, (filename, lineno)), allocated in ranked
+        ]
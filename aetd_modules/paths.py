@@ -8,20 +8,20 @@ import math
 import numpy as np
 from numpy.typing import NDArray
 
-from configs import globals
+from configs import ConfigSnapshot, current
 
-from .containers import Impassable, Passable, Path, PathsBox, RoadSegmentsBox
+from .containers import Driveable, Impassable, Path, PathsBox, RoadSegmentsBox
 
 
 class PathPlanner:
     def __init__(self) -> None:
         """
         The PathPlanner class is responsible for planning paths given segmented lanes.
+        It works on the columns of the RoadSegmentsBox, the filtering, the sorting and
+        the midlines between the lanes are array operations.
 
         Methods:
             - process: The processing pipeline for planning paths.
-            - dst: Compute the overall distance of the lane to the center of the image.
-            - get_distances: Calculate the distances of all impassable lanes to the center of the image.
             - strip_unreachable: Strip unreachable lanes if there are not between the closest left and right impassable lanes.
             - calculate_paths: Calculate paths between lanes and add them to the path box.
             - mirror_around_x: Mirror a polynomial function around a vertical line at x.
@@ -29,112 +29,88 @@ class PathPlanner:
         """
         pass
 
-    def process(self, road_segment_box: RoadSegmentsBox, width: int, height: int) -> PathsBox | None:
+    def process(
+        self, road_segment_box: RoadSegmentsBox, width: int, height: int, config: ConfigSnapshot | None = None
+    ) -> PathsBox | None:
         """
         The processing pipeline for planning paths.
+
+        Args:
+            road_segment_box (RoadSegmentsBox): The road segments of the frame.
+            width (int): The width of the image.
+            height (int): The height of the image.
+            config (ConfigSnapshot | None): The config of the frame, the newest if None.
         """
 
+        self.config: ConfigSnapshot = config or current()
         self.img_width: int = width
         self.img_height: int = height
 
         # create a new PathBox
         self.path_box: PathsBox = PathsBox()
 
-        self.lanes: list[Impassable | Passable] = []
-
         # extract only the lanes
-        for segment in road_segment_box:
-            if isinstance(segment, Impassable) or isinstance(segment, Passable):
-                self.lanes.append(segment)
+        lanes: NDArray[np.intp] = np.flatnonzero(road_segment_box.kind != Driveable.KIND)
 
         # check if there is at least two lane
         # otherwise return None for now
         # TODO: implement the "OneLane" Logic
-        if len(self.lanes) < 2:
+        if len(lanes) < 2:
             return None
 
+        # the mean distance of every lane to the center of the image, from the summary of the box
+        distances: NDArray[np.float64] = road_segment_box.distances(x=self.img_width // 2)[lanes]
+        impassable: NDArray[np.bool_] = road_segment_box.kind[lanes] == Impassable.KIND
+
         # strip unreachable lanes
-        self.strip_unreachable(distances=self.get_distances())
-        # sorte the lanes by there distance to the center
-        self.lanes = sorted(self.lanes, key=lambda lane: self.dst(lane=lane))
+        reachable: NDArray[np.bool_] = self.strip_unreachable(distances=distances, impassable=impassable)
+        lanes = lanes[reachable]
+        distances = distances[reachable]
+        # sorte the lanes by there distance to the center, stable like sorted
+        lanes = lanes[np.argsort(distances, kind="stable")]
         # calculate paths between lanes
-        self.calculate_paths()
+        self.calculate_paths(coeffs=road_segment_box.coeffs[lanes])
 
         return self.path_box
 
-    def dst(self, lane: Impassable | Passable) -> float:
+    def strip_unreachable(self, distances: NDArray[np.float64], impassable: NDArray[np.bool_]) -> NDArray[np.bool_]:
         """
-        Compute the overall distance of the lane to the center of the image.
+        Strip unreachable lanes if there are not between the closest
+        left and right impassable lanes.
 
         Args:
-            lane (Impassable | Passable): The lane to compute the distance for.
+            distances (NDArray[np.float64]): The distances of the lanes to the center.
+            impassable (NDArray[np.bool_]): True for the impassable lanes.
 
         Returns:
-            float: The distance of the lane to the center of the image.
+            NDArray[np.bool_]: True for the lanes to keep.
         """
 
-        x: NDArray[np.int32] = lane.path.approx_pts[:, 0]
-        # compute mean absolute distance to center
-        return float(np.mean(x - self.img_width // 2))
+        left: NDArray[np.float64] = distances[impassable & (distances <= 0)]
+        right: NDArray[np.float64] = distances[impassable & (distances > 0)]
 
-    def get_distances(self) -> list[float]:
-        """
-        Calculate the distances of all impassable lanes to the center of the image.
+        # if there is no left or right impassable lane, there is no bound on that side
+        left_impassable_lane: float = float(left.min()) if left.size > 0 else -math.inf
+        right_impassable_lane: float = float(right.max()) if right.size > 0 else math.inf
 
-        Returns:
-            list[float]: The distances of all lanes to the center of the image.
-        """
-
-        distances: list[float] = []
-        # for all the impassable lanes
-        for lane in self.lanes:
-            if isinstance(lane, Impassable):
-                # compute mean absolute distance to center for each lane
-                distances.append(self.dst(lane=lane))
-
-        return distances
+        return (left_impassable_lane <= distances) & (distances <= right_impassable_lane)
 
-    def strip_unreachable(self, distances: list[float]) -> None:
+    def calculate_paths(self, coeffs: NDArray[np.float64]) -> None:
         """
-        Strip unreachable lanes if there are not between the closest
-        left and right impassable lanes.
+        Calculate paths between neighbouring lanes and add them to the path box.
 
         Args:
-            distances (list[float]): The distances of the lanes to the center.
-
-        Returns:
-            None
+            coeffs (NDArray[np.float64]): The coefficients of the sorted lanes, shape (n, 3).
         """
 
-        try:
-            left_impassable_lane: float | None = min([dst for dst in distances if dst <= 0])
-        except ValueError:
-            # if there is no left or right impassable lane
-            left_impassable_lane = -math.inf
-
-        try:
-            right_impassable_lane: float | None = max([dst for dst in distances if dst > 0])
-        except ValueError:
-            # if there is no left or right impassable lane
-            right_impassable_lane = math.inf
-
-        # filter the lanes
-        self.lanes = [
-            lane for lane in self.lanes if left_impassable_lane <= self.dst(lane=lane) <= right_impassable_lane
-        ]
+        if len(coeffs) < 2:
+            return
 
-    def calculate_paths(self) -> None:
-        """
-        Calculate paths between lanes and add them to the path box.
-        """
-
-        for i in range(len(self.lanes) - 1):
-            # calculate the center function
-            f: np.poly1d = (self.lanes[i].path.f + self.lanes[i + 1].path.f) / 2
-            # create a new path and add it to the path box
-            path: Path | None = PathExtractor().calculate_path_from_function(
-                f=f, width=self.img_width, height=self.img_height
-            )
+        # the center functions of all neighbouring lanes at once
+        centers: NDArray[np.float64] = (coeffs[:-1] + coeffs[1:]) / 2
+        for path in PathExtractor.calculate_paths_from_coeffs(
+            coeffs=centers, width=self.img_width, height=self.img_height, config=self.config
+        ):
             if path:
                 self.path_box.add(path=path)
 
@@ -165,7 +141,9 @@ class PathExtractor:
     """
 
     @staticmethod
-    def calculate_path_from_function(f: np.poly1d, width: int, height: int) -> Path | None:
+    def calculate_path_from_function(
+        f: np.poly1d, width: int, height: int, config: ConfigSnapshot | None = None
+    ) -> Path | None:
         """
         Calculate a path from a polynomial function.
 
@@ -173,12 +151,13 @@ class PathExtractor:
             f (np.poly1d): The polynomial function to use for path calculation.
             width (int): The width of the image.
             height (int): The height of the image.
+            config (ConfigSnapshot | None): The config of the frame, the newest if None.
 
         Returns:
             Path: The calculated path.
         """
 
-        min_height: int = height // globals.HEIGHT_REDUCTION_FACTOR
+        min_height: int = height // (config or current()).HEIGHT_REDUCTION_FACTOR
 
         # generate approximated points for y in [0, height]
         approx_y: NDArray[np.int32] = np.linspace(
@@ -217,7 +196,58 @@ class PathExtractor:
             return None
 
     @staticmethod
-    def calculate_path_from_pts(pts: NDArray[np.int32], width: int, height: int) -> Path | None:
+    def calculate_paths_from_coeffs(
+        coeffs: NDArray[np.float64], width: int, height: int, config: ConfigSnapshot | None = None
+    ) -> list[Path | None]:
+        """
+        Calculate the paths of several polynomial functions at once, the same as
+        calculate_path_from_function for every row.
+
+        Args:
+            coeffs (NDArray[np.float64]): The coefficients of the functions, highest first, shape (n, 3).
+            width (int): The width of the image.
+            height (int): The height of the image.
+            config (ConfigSnapshot | None): The config of the frame, the newest if None.
+
+        Returns:
+            list[Path | None]: The calculated paths.
+        """
+
+        min_height: int = height // (config or current()).HEIGHT_REDUCTION_FACTOR
+        approx_y: NDArray[np.int32] = np.linspace(start=min_height, stop=height, num=height + 1, dtype=np.int32)
+
+        # evaluate all functions on all rows like np.polyval (Horner), shape (n, height + 1)
+        approx_x: NDArray[np.float64] = np.zeros((len(coeffs), len(approx_y)), dtype=np.float64)
+        for i in range(coeffs.shape[1]):
+            approx_x = approx_x * approx_y + coeffs[:, i : i + 1]
+
+        # the rows are always within [min_height, height], only the columns have to be checked
+        masks: NDArray[np.bool_] = (approx_x >= 0) & (approx_x <= width)
+
+        paths: list[Path | None] = []
+        for row, mask, x in zip(coeffs, masks, approx_x):
+            if not mask.any():
+                # the function has no valid points in the image and therefore there is no valid path
+                paths.append(None)
+                continue
+
+            xs: NDArray[np.float64] = x[mask]
+            ys: NDArray[np.int32] = approx_y[mask]
+            paths.append(
+                Path(
+                    np.poly1d(row),
+                    approx_pts=np.stack(arrays=[xs, ys], axis=1).astype(np.int32),
+                    scope_definition=(np.min(a=xs), np.max(a=xs)),
+                    value_range=(np.min(a=ys), np.max(a=ys)),
+                )
+            )
+
+        return paths
+
+    @staticmethod
+    def calculate_path_from_pts(
+        pts: NDArray[np.int32], width: int, height: int, config: ConfigSnapshot | None = None
+    ) -> Path | None:
         """
         Calculate a path from a set of points.
 
@@ -225,6 +255,7 @@ class PathExtractor:
             pts (np.ndarray): The points to use for path calculation.
             width (int): The width of the image.
             height (int): The height of the image.
+            config (ConfigSnapshot | None): The config of the frame, the newest if None.
 
         Returns:
             Path: The calculated path.
@@ -236,4 +267,6 @@ class PathExtractor:
         # compute polynomial approximation x = f(y)
         coeffs: NDArray[np.float64] = np.polyfit(x=y, y=x, deg=2)
 
-        return PathExtractor.calculate_path_from_function(f=np.poly1d(c_or_r=coeffs), width=width, height=height)
+        return PathExtractor.calculate_path_from_function(
+            f=np.poly1d(c_or_r=coeffs), width=width, height=height, config=config
+        )
@@ -1,11 +1,17 @@
+import time
+from collections.abc import Callable
 from concurrent.futures import Future, ThreadPoolExecutor, as_completed
-from typing import cast
+from typing import Any, cast
 
 from cv2.typing import MatLike
 from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
 
+from configs import ConfigSnapshot, ConfigWatcher, current
+
 from .containers import AnnotationsContainer, DirectionBox, PathsBox, RoadObjectsBox, RoadSegmentsBox, SpeedBox
 from .direction import DirectionExtractor
+from .frame_context import FrameContext
+from .memory_profiler import MemoryProfiler
 from .paths import PathPlanner
 from .road_object_classification import RoadObjectClassificationRefiner
 from .road_objects_detection import RoadObjectDetectionExtractor
@@ -15,26 +21,59 @@ from .speed import SpeedDataExtractor
 Box = DirectionBox | SpeedBox | RoadObjectsBox | RoadSegmentsBox | PathsBox | None
 
 
+def timed(timings: dict[str, float], stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Call fn and store its runtime (seconds) under the name of the stage.
+    """
+
+    start: float = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+
 class Pipeline:
     def __init__(
         self,
         only_cls_results: str | bool = False,
         only_seg_results: str | bool = False,
         only_det_results: str | bool = False,
+        config_watcher: ConfigWatcher | None = None,
+        memory_profiler: MemoryProfiler | None = None,
     ) -> None:
         """
         The Pipeline class orchestrates the various data extraction and processing modules.
+        Every frame is processed with one ConfigSnapshot. A changed config is taken over
+        between two frames, without loading the models again.
+
+        Args:
+            config_watcher (ConfigWatcher | None): Watches the .conf file, without one the newest snapshot is used.
+            memory_profiler (MemoryProfiler | None): Measures the memory of every stage, the stages run one after another.
 
         Methods:
             - process: Processes the input image through all extraction modules.
+            - stage: Runs a stage, timed and, with a memory profiler, measured.
         """
 
+        self.config_watcher: ConfigWatcher | None = config_watcher
+        self.memory_profiler: MemoryProfiler | None = memory_profiler
+
         self.speed_data_extractor = SpeedDataExtractor()
         self.road_object_detection_extractor = RoadObjectDetectionExtractor(only_detec_results=only_det_results)
         self.road_classification_refiner = RoadObjectClassificationRefiner(only_cls_results=only_cls_results)
         self.road_segments_extractor = RoadSegmentsExtractor(only_results=only_seg_results)
         self.path_planner = PathPlanner()
 
+    def stage(self, timings: dict[str, float], stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a stage and store its runtime, with a memory profiler its memory is measured as well.
+        """
+
+        if self.memory_profiler is None:
+            return timed(timings, stage, fn, *args, **kwargs)
+        return self.memory_profiler.measure(stage, timed, timings, stage, fn, *args, **kwargs)
+
     def process(
         self,
         img: MatLike,
@@ -53,18 +92,38 @@ class Pipeline:
             AnnotationsContainer: The container holding all extracted annotations.
         """
 
+        # the config of this frame, all modules use the same version
+        config: ConfigSnapshot = self.config_watcher.poll() if self.config_watcher is not None else current()
+
+        # the stages get read-only views of the frame, none of them copies it as a whole
+        frame = FrameContext(img=img, config=config)
+        img = frame.img
+
         # create a new container
         annotations_container = AnnotationsContainer(img=img, img_name=img_name)
+        annotations_container.config = config
+        timings: dict[str, float] = annotations_container.timings
+        start: float = time.perf_counter()
 
         results: dict[str, Box] = {}
         # run all processings in parallel
         with ThreadPoolExecutor() as executor:
-            # no copies of the img needed, because the modules make them
+            # no copies of the img needed, the modules only read it
             futures: dict[Future[Box], str] = {
-                executor.submit(DirectionExtractor.process, img): "direction",
-                executor.submit(self.speed_data_extractor.process, img): "speed",
-                executor.submit(self.road_object_detection_extractor.process, img, detect_result): "objects",
-                executor.submit(self.road_segments_extractor.process, img, seg_result): "segments",
+                executor.submit(self.stage, timings, "direction", DirectionExtractor.process, img, frame): "direction",
+                executor.submit(self.stage, timings, "speed", self.speed_data_extractor.process, img, frame): "speed",
+                executor.submit(
+                    self.stage,
+                    timings,
+                    "objects",
+                    self.road_object_detection_extractor.process,
+                    img,
+                    detect_result,
+                    frame,
+                ): "objects",
+                executor.submit(
+                    self.stage, timings, "segments", self.road_segments_extractor.process, img, seg_result, frame
+                ): "segments",
             }
 
             # run the path planer when the segments are ready, even the rest
@@ -75,15 +134,22 @@ class Pipeline:
                 if key == "segments":
                     annotations_container.road_segments = cast(RoadSegmentsBox | None, results["segments"])
                     if annotations_container.road_segments is not None:
-                        annotations_container.paths = self.path_planner.process(
+                        annotations_container.paths = self.stage(
+                            timings,
+                            "paths",
+                            self.path_planner.process,
                             road_segment_box=annotations_container.road_segments,
                             width=img.shape[1],
                             height=img.shape[0],
+                            config=config,
                         )
                 if key == "objects":
                     annotations_container.road_objects = cast(RoadObjectsBox | None, results["objects"])
                     if annotations_container.road_objects is not None:
-                        annotations_container.road_objects = self.road_classification_refiner.process(
+                        annotations_container.road_objects = self.stage(
+                            timings,
+                            "classification",
+                            self.road_classification_refiner.process,
                             img=img,
                             road_object_box=annotations_container.road_objects,
                             cls_result=cls_result,
@@ -91,5 +157,6 @@ class Pipeline:
 
         annotations_container.direction = cast(DirectionBox | None, results["direction"])
         annotations_container.speed = cast(SpeedBox | None, results["speed"])
+        timings["total"] = time.perf_counter() - start
 
         return annotations_container
@@ -9,7 +9,7 @@ import numpy as np
 from cv2.typing import MatLike
 from numpy.typing import NDArray
 
-from configs import globals
+from configs import ConfigSnapshot, current
 
 
 class Preprocessor:
@@ -28,28 +28,30 @@ class Preprocessor:
         pass
 
     @staticmethod
-    def process(img: MatLike) -> MatLike:
+    def process(img: MatLike, config: ConfigSnapshot | None = None) -> MatLike:
         """
         The processing pipeline for the image.
 
         Args:
             img (MatLike): The input image to process.
+            config (ConfigSnapshot | None): The config of the frame, the newest if None.
 
         Returns:
             MatLike: The processed image.
         """
 
-        # always create a copy of the original image for safety
-        img = img.copy()
+        config = config or current()
 
-        Preprocessor.condCLAHE(img=img)
-        Preprocessor.gamma(img=img)
-        Preprocessor.sharpen(img=img)
+        # no copy needed, every step creates a new image and leaves the input as it is
+
+        Preprocessor.condCLAHE(img=img, config=config)
+        Preprocessor.gamma(img=img, config=config)
+        Preprocessor.sharpen(img=img, config=config)
 
         return img
 
     @staticmethod
-    def condCLAHE(img: MatLike) -> MatLike:
+    def condCLAHE(img: MatLike, config: ConfigSnapshot) -> MatLike:
         """
         Apply CLAHE to the image.
         """
@@ -60,29 +62,23 @@ class Preprocessor:
         avg_brightness: np.floating = np.mean(a=luminance)
 
         # only apply CLAHE if the average brightness is below the threshold
-        if avg_brightness < globals.PREPROCESSING_CLAHE_THRESHOLD:
-            clahe: cv2.CLAHE = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        if avg_brightness < config.PREPROCESSING_CLAHE_THRESHOLD:
+            clahe: cv2.CLAHE = config.clahe()
             img_yuv[:, :, 0] = clahe.apply(src=img_yuv[:, :, 0])
             return cv2.cvtColor(src=img_yuv, code=cv2.COLOR_YUV2BGR)
         else:
             return img
 
     @staticmethod
-    def gamma(img: MatLike) -> MatLike:
+    def gamma(img: MatLike, config: ConfigSnapshot) -> MatLike:
         """
-        Apply gamma correction to the image.
+        Apply gamma correction to the image, with the lookup table of the config.
         """
 
-        lut: NDArray[np.uint8] = np.zeros(256, dtype=np.uint8)
-        for i in range(256):
-            normalized: float = i / 255.0
-            gamma: float = 1.0 + (globals.PREPROCESSING_GAMMA_MAX - 1.0) * (1 - normalized)
-            corrected: float = pow(base=normalized, exp=1.0 / gamma)
-            lut[i] = np.clip(a=corrected * 255, a_min=0, a_max=255)
-        return cv2.LUT(src=img, lut=lut)
+        return cv2.LUT(src=img, lut=config.gamma_lut)
 
     @staticmethod
-    def sharpen(img: MatLike) -> MatLike:
+    def sharpen(img: MatLike, config: ConfigSnapshot) -> MatLike:
         """
         Apply sharpening to the image.
         """
@@ -90,8 +86,8 @@ class Preprocessor:
         blurred: MatLike = cv2.GaussianBlur(src=img, ksize=(0, 0), sigmaX=2)
         return cv2.addWeighted(
             src1=img,
-            alpha=1 + globals.PREPROCESSING_SHARPEN_AMOUNT,
+            alpha=1 + config.PREPROCESSING_SHARPEN_AMOUNT,
             src2=blurred,
-            beta=-globals.PREPROCESSING_SHARPEN_AMOUNT,
+            beta=-config.PREPROCESSING_SHARPEN_AMOUNT,
             gamma=0,
         )
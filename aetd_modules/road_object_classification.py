@@ -7,6 +7,7 @@ from typing import cast
 
 import numpy as np
 from cv2.typing import MatLike
+from numpy.typing import NDArray
 from ultralytics.engine.results import Probs, Results  # pyright: ignore[reportMissingTypeStubs]
 
 from configs import globals
@@ -33,6 +34,10 @@ class RoadObjectClassificationRefiner:
             self.classification_model = ClassificationModel(
                 pretrained_model_path=globals.CLASSIFICATION_MODEL_PATH,
                 device=globals.CLASSIFICATION_MODEL_DEVICES,
+                backend=globals.CLASSIFICATION_MODEL_BACKEND,
+                intra_op_threads=globals.ONNX_INTRA_OP_THREADS,
+                imgsz=globals.CLASSIFICATION_MODEL_IMGSZ,
+                direct_input=globals.MODEL_DIRECT_INPUT,
             )
 
     def model_loaded(self) -> bool:
@@ -69,16 +74,12 @@ class RoadObjectClassificationRefiner:
 
         # else refine the classification
         elif self.classification_model is not None and cls_result is None:
-            for obj in road_object_box:
+            for i, (x1, y1, x2, y2) in enumerate(road_object_box.xyxy.tolist()):
                 # 0: Sign
                 # 1: Traffic-Light
                 # 2: Vehicle
 
-                if obj.cls != 2:
-                    x1: int = obj.coords[0]
-                    y1: int = obj.coords[1]
-                    x2: int = obj.coords[2]
-                    y2: int = obj.coords[3]
+                if road_object_box.cls[i] != 2:
                     cropped_img: MatLike = img[y1:y2, x1:x2]
 
                     result: Results = self.classification_model.predict(img=cropped_img)
@@ -97,11 +98,13 @@ class RoadObjectClassificationRefiner:
 
         """
 
-        for obj in road_objects_box:
-            if result.boxes is not None:
-                # convert tensor to list of tuples
-                det_coords = np.round(result.boxes.xyxy.cpu().numpy()).astype(int).tolist()  # type: ignore
+        if result.boxes is None or result.probs is None or len(road_objects_box) == 0:
+            return
 
-                if list(obj.coords) in det_coords:
-                    if result.probs is not None:
-                        obj.cls = cast(Probs, result.probs).top1
+        det_coords: NDArray[np.int32] = np.round(result.boxes.xyxy.cpu().numpy()).astype(np.int32)  # type: ignore
+
+        # every object whose box is one of the result gets the class of the result
+        matched: NDArray[np.bool_] = (
+            (road_objects_box.xyxy[:, None, :] == det_coords[None, :, :]).all(axis=2).any(axis=1)
+        )
+        road_objects_box.cls[matched] = cast(Probs, result.probs).top1
@@ -4,13 +4,16 @@
 #
 
 import cv2
+import numpy as np
 from cv2.typing import MatLike
+from numpy.typing import NDArray
 from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
 
 from configs import globals
 from models import DetectionModel
 
-from .containers import RoadObjectsBox, Sign, TrafficLight, Vehicle
+from .containers import RoadObjectsBox
+from .frame_context import FrameContext
 from .preprocessor import Preprocessor
 
 
@@ -32,6 +35,10 @@ class RoadObjectDetectionExtractor:
             self.detection_model = DetectionModel(
                 pretrained_model_path=globals.DETECTION_MODEL_PATH,
                 device=globals.DETECTION_MODEL_DEVICES,
+                backend=globals.DETECTION_MODEL_BACKEND,
+                intra_op_threads=globals.ONNX_INTRA_OP_THREADS,
+                imgsz=globals.DETECTION_MODEL_IMGSZ,
+                direct_input=globals.MODEL_DIRECT_INPUT,
             )
 
     def model_loaded(self) -> bool:
@@ -42,7 +49,9 @@ class RoadObjectDetectionExtractor:
             return True
         return False
 
-    def process(self, img: MatLike, detect_result: Results | None = None) -> RoadObjectsBox:
+    def process(
+        self, img: MatLike, detect_result: Results | None = None, frame: FrameContext | None = None
+    ) -> RoadObjectsBox:
         """
         The processing pipeline for road object extraction.
 
@@ -50,6 +59,7 @@ class RoadObjectDetectionExtractor:
             img (MatLike): The input image.
             detect_result (Results | None): The detection results.
             cls_result (Results | None): The classification results.
+            frame (FrameContext | None): The context of the frame, created from img if None.
 
         Returns:
             RoadObjectsBox: The extracted road objects. Can be empty.
@@ -60,13 +70,13 @@ class RoadObjectDetectionExtractor:
             road_objects_box: RoadObjectsBox = self.processBoxes(result=detect_result)
 
         elif self.detection_model is not None and detect_result is None:
-            working_img: MatLike = img.copy()
+            frame = frame or FrameContext(img=img)
 
-            # crop the image to remove the road advisor
-            working_img = working_img[globals.ROADOBJECT_EXTRACTION_CROP_TOP :, :, :]
+            # crop the image to remove the road advisor, a read-only view of the frame
+            working_img: MatLike = frame.roi(name="objects")
 
             # preprocess the image
-            working_img = Preprocessor.process(img=working_img)
+            working_img = Preprocessor.process(img=working_img, config=frame.config)
             working_img = cv2.cvtColor(src=working_img, code=cv2.COLOR_BGR2RGB)
 
             result: Results = self.detection_model.predict(img=working_img)
@@ -89,29 +99,16 @@ class RoadObjectDetectionExtractor:
             RoadObjectsBox: The created road objects.
         """
 
-        road_objects_box: RoadObjectsBox = RoadObjectsBox()
-
-        # Numpy in generell imposes a dynamic typing system so pyright is complaining a lot
-        # Enforce a list of tuples with the coordinated in it [x1, y1, x2, y2]
-        # where each value must be an integer, because coordinates are expected to be integers
-        xyxy: list[tuple[int, int, int, int]] = [
-            (int(x1), int(y1), int(x2), int(y2))  # type: ignore
-            for x1, y1, x2, y2 in result.boxes.xyxy.tolist()  # type: ignore
-        ]
-        class_ids = result.boxes.cls.int().tolist()  # type: ignore
-
-        for coords, cls in zip(xyxy, class_ids):  # type: ignore
-            # 0: Sign
-            # 1: Traffic-Light
-            # 2: Vehicle
-
-            if cls == 0:
-                road_objects_box.add(road_object=Sign(coords=coords, cls=cls))
-            elif cls == 1:
-                road_objects_box.add(road_object=TrafficLight(coords=coords, cls=cls))
-            elif cls == 2:
-                road_objects_box.add(road_object=Vehicle(coords=coords, cls=cls))
-            else:
-                raise ValueError(f"Unknown class ID: {cls}")
-
-        return road_objects_box
+        # the columns come straight from the tensors, no Python object per detection
+        # 0: Sign
+        # 1: Traffic-Light
+        # 2: Vehicle
+        boxes = result.boxes  # type: ignore
+        kind: NDArray[np.int32] = boxes.cls.cpu().numpy().astype(np.int32)  # type: ignore
+        return RoadObjectsBox(
+            # coordinates are expected to be integers, truncated like int()
+            xyxy=boxes.xyxy.cpu().numpy().astype(np.int32).reshape(-1, 4),  # type: ignore
+            kind=kind,
+            conf=boxes.conf.cpu().numpy(),  # type: ignore
+            track_id=None if boxes.id is None else boxes.id.cpu().numpy().astype(np.int32),  # type: ignore
+        )
@@ -11,10 +11,11 @@ from cv2.typing import MatLike
 from numpy.typing import NDArray
 from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
 
-from configs import globals
+from configs import ConfigSnapshot, globals
 from models import SegmentationModel
 
-from .containers import Driveable, Impassable, Passable, Path, RoadSegmentsBox
+from .containers import Path, RoadSegmentsBox
+from .frame_context import FrameContext, scaled_shape, to_analysis, to_frame
 from .paths import PathExtractor
 from .preprocessor import Preprocessor
 
@@ -37,6 +38,10 @@ class RoadSegmentsExtractor:
             self.segmentation_model = SegmentationModel(
                 pretrained_model_path=globals.SEGMENTATION_MODEL_PATH,
                 device=globals.SEGMENTATION_MODEL_DEVICES,
+                backend=globals.SEGMENTATION_MODEL_BACKEND,
+                intra_op_threads=globals.ONNX_INTRA_OP_THREADS,
+                imgsz=globals.SEGMENTATION_MODEL_IMGSZ,
+                direct_input=globals.MODEL_DIRECT_INPUT,
             )
 
     def model_loaded(self) -> bool:
@@ -47,11 +52,20 @@ class RoadSegmentsExtractor:
             return True
         return False
 
-    def process(self, img: MatLike, result: Results | None = None) -> RoadSegmentsBox | None:
+    def process(
+        self, img: MatLike, result: Results | None = None, frame: FrameContext | None = None
+    ) -> RoadSegmentsBox | None:
         """
         The processing pipeline for road segment extraction.
+
+        Args:
+            img (MatLike): The input image.
+            result (Results | None): The segmentation results.
+            frame (FrameContext | None): The context of the frame, created from img if None.
         """
 
+        frame = frame or FrameContext(img=img)
+        self.config: ConfigSnapshot = frame.config
         self.road_segments_box = RoadSegmentsBox()
 
         self.width: int = img.shape[1]
@@ -64,14 +78,11 @@ class RoadSegmentsExtractor:
 
         # if there is a segmentation model but no result, we need to run the model
         elif self.segmentation_model is not None and result is None:
-            # always create a copy of the original image for safety
-            self.img: MatLike = img.copy()
-
-            # crop the image to remove the road advisor
-            self.img = img[globals.ROADSEGMENT_EXTRACTION_CROP_TOP :, :, :]
+            # crop the image to remove the road advisor, a read-only view of the frame
+            self.img: MatLike = frame.roi(name="segments")
 
             # preprocess the image
-            self.img = Preprocessor.process(img=self.img)
+            self.img = Preprocessor.process(img=self.img, config=self.config)
             self.img = cv2.cvtColor(src=self.img, code=cv2.COLOR_BGR2RGB)
 
             result = self.segmentation_model.predict(img=self.img)
@@ -91,9 +102,17 @@ class RoadSegmentsExtractor:
         polygons = result.masks.xy  # type: ignore
         class_ids = result.boxes.cls.int().tolist()  # type: ignore
 
+        # the segments are collected and stored in the box at once
+        kinds: list[int] = []
+        contours: list[NDArray[np.int32]] = []
+        paths: list[Path] = []
+
+        # the masks are cleaned at the analysis scale, the contours are scaled back to the frame
+        scale: float = self.config.segments_scale
+        self.mask_shape: tuple[int, int] = scaled_shape(height=self.img.shape[0], width=self.img.shape[1], scale=scale)
         for poly, cls in zip(polygons, class_ids):  # type: ignore
             # reshape the ouput to an opencv format
-            pts: NDArray[np.int32] = poly.astype(np.int32).reshape((-1, 1, 2))
+            pts: NDArray[np.int32] = to_analysis(pts=poly, scale=scale).reshape((-1, 1, 2))
 
             # get the cleaned driveable area
             cnt: NDArray[np.int32] | None = self.findContours(mask=self.morph(mask=self.mask(pts=pts)))
@@ -101,8 +120,9 @@ class RoadSegmentsExtractor:
             # create a approximation
             if cnt is None:
                 continue
+            cnt = to_frame(pts=cnt, scale=scale)
             path: Path | None = PathExtractor.calculate_path_from_pts(
-                pts=cnt.squeeze(1), width=self.width, height=self.height
+                pts=cnt.squeeze(1), width=self.width, height=self.height, config=self.config
             )
 
             # 0: Driveable
@@ -110,28 +130,27 @@ class RoadSegmentsExtractor:
             # 2: Impassable
 
             if path is not None:
-                if cls == 0:
-                    self.road_segments_box.add(road_segment=Driveable(pts=cnt, path=path))
-                elif cls == 1:
-                    self.road_segments_box.add(road_segment=Passable(pts=cnt, path=path))
-                elif cls == 2:
-                    self.road_segments_box.add(road_segment=Impassable(pts=cnt, path=path))
-                else:
+                if cls not in (0, 1, 2):
                     raise ValueError(f"Unknown class ID: {cls}")
+                kinds.append(cls)
+                contours.append(cnt)
+                paths.append(path)
+
+        self.road_segments_box = RoadSegmentsBox.from_segments(kinds=kinds, contours=contours, paths=paths)
 
     def mask(self, pts: NDArray[np.int32]) -> MatLike:
         """
-        Create a mask for the given polygon points.
+        Create a mask for the given polygon points, at the analysis scale.
 
         Args:
-            pts (NDArray[np.int32]): The polygon points.
+            pts (NDArray[np.int32]): The polygon points at the analysis scale.
 
         Returns:
             MatLike: The mask for the polygon.
         """
 
         # create blank mask for current polygon
-        mask: MatLike = cast(MatLike, np.zeros(self.img.shape[:2], dtype=np.uint8))
+        mask: MatLike = cast(MatLike, np.zeros(self.mask_shape, dtype=np.uint8))
         # fill it with the segment
         cv2.fillPoly(img=mask, pts=[pts], color=255)
 
@@ -148,7 +167,7 @@ class RoadSegmentsExtractor:
             MatLike: The cleaned mask.
         """
 
-        kernel: MatLike = cv2.getStructuringElement(shape=cv2.MORPH_ELLIPSE, ksize=(3, 3))
+        kernel: MatLike = self.config.morph_kernel
 
         # first opening to remove noise
         opened_mask: MatLike = cv2.morphologyEx(src=mask, op=cv2.MORPH_OPEN, kernel=kernel)
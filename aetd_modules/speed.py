@@ -3,116 +3,208 @@
 # by evaluating the speedometer.
 #
 
+import queue
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import cast
 
 import cv2
 import easyocr  # pyright: ignore[reportMissingTypeStubs]
 from cv2.typing import MatLike
 
-from configs import globals
+from configs import ConfigSnapshot, globals
 
 from .containers import SpeedBox
+from .frame_context import FrameContext
+
+
+class ReaderPool:
+    """
+    A pool of easyocr readers. A reader is not thread-safe, every thread borrows its
+    own one. The first reader is created right away, the others when more threads
+    read at the same time, at most size readers.
+
+    Args:
+        size (int): The maximum number of readers.
+        gpu (bool): Run the readers on the GPU.
+    """
+
+    def __init__(self, size: int, gpu: bool) -> None:
+        if size < 1:
+            raise ValueError(f"The reader pool needs at least one reader, got {size}")
+
+        self.size: int = size
+        self.gpu: bool = gpu
+        self.lock = threading.Lock()
+        self.idle: queue.Queue[easyocr.Reader] = queue.Queue()
+        self.created: int = 1
+
+        self.idle.put(self.create())
+
+    def create(self) -> easyocr.Reader:
+        return easyocr.Reader(lang_list=["en"], gpu=self.gpu, verbose=False)
+
+    @contextmanager
+    def reader(self) -> Iterator[easyocr.Reader]:
+        """
+        Borrow a reader, wait for one if all readers are in use.
+        """
+
+        try:
+            reader: easyocr.Reader = self.idle.get_nowait()
+        except queue.Empty:
+            # the count is taken before the reader is loaded, the pool never grows beyond its size
+            with self.lock:
+                grow: bool = self.created < self.size
+                if grow:
+                    self.created += 1
+            reader = self.create() if grow else self.idle.get()
+        try:
+            yield reader
+        finally:
+            self.idle.put(reader)
 
 
 class SpeedDataExtractor:
-    def __init__(self) -> None:
+    def __init__(self, readers: int = 0) -> None:
         """
         The SpeedDataExtractor class is responsible for extracting speed data from images
-        by evaluating the speedometer.
+        by evaluating the speedometer. It keeps no state of a frame, several threads can
+        process frames at the same time, each with a reader of the pool.
+
+        Args:
+            readers (int): The number of easyocr readers, 0 uses the config.
 
         Methods:
             - __init__: Initialize the SpeedDataExtractor.
             - process: Process the input image to extract speed data.
+            - process_batch: Process many images with one OCR call.
+            - prepare: Crop and binarize the speedometer for the OCR.
             - crop: Crop the image to the region of interest.
             - gray: Convert the image to grayscale.
             - sharpen: (Un)Sharpen the image.
             - binary: Apply binary thresholding to the image.
             - read_speed: Read the speed from the processed image using OCR.
+            - parse_speed: Convert the OCR result to a speed.
         """
 
-        self.speed: int | None = None
-        self.reader: easyocr.Reader = easyocr.Reader(
-            lang_list=["en"],
+        self.pool = ReaderPool(
+            size=readers or globals.SPEED_EXTRACTION_EASYOCR_READERS,
             gpu=globals.SPEED_EXTRACTION_EASYOCR_DEVICES,
-            verbose=False,
         )
 
-    def process(self, img: MatLike) -> SpeedBox | None:
+    def process(self, img: MatLike, frame: FrameContext | None = None) -> SpeedBox | None:
         """
         Processing pipeline for the input image to extract speed data.
 
         Args:
             img (Img): The input image.
+            frame (FrameContext | None): The context of the frame, created from img if None.
 
         Returns:
             SpeedBox: The extracted speed data.
         """
 
-        # always create a copy of the original image for safety
-        self.img: MatLike = img.copy()
+        return self.read_speed(img=SpeedDataExtractor.prepare(frame=frame or FrameContext(img=img)))
 
-        self.crop()
-        self.gray()
-        self.sharpen()
-        self.binary()
-        self.read_speed()
+    def process_batch(self, imgs: list[MatLike], frames: list[FrameContext] | None = None) -> list[SpeedBox | None]:
+        """
+        Extract the speed of many images with one readtext_batched call, for the offline
+        extraction of a whole video. The crops of a config all have the same size.
 
-        if self.speed is not None:
-            return SpeedBox(speed=self.speed)
-        return None
+        Args:
+            imgs (list[MatLike]): The input images.
+            frames (list[FrameContext] | None): The contexts of the frames, created from imgs if None.
+
+        Returns:
+            list[SpeedBox | None]: The extracted speed data of every image.
+        """
 
-    def crop(self) -> None:
+        frames = frames or [FrameContext(img=img) for img in imgs]
+        if not frames:
+            return []
+
+        crops: list[MatLike] = [SpeedDataExtractor.prepare(frame=frame) for frame in frames]
+        with self.pool.reader() as reader:
+            results = cast(list[list[str]], reader.readtext_batched(image_list=crops, detail=0))  # pyright: ignore[reportUnknownMemberType]
+
+        return [SpeedDataExtractor.parse_speed(result=result) for result in results]
+
+    @staticmethod
+    def prepare(frame: FrameContext) -> MatLike:
         """
-        Crop the image to the region of interest.
+        Crop the speedometer of the frame and prepare it for the OCR.
         """
 
-        top: int = globals.SPEED_EXTRACTION_CROP_TOP
-        bottom: int = self.img.shape[0] - globals.SPEED_EXTRACTION_CROP_BOTTOM
-        left: int = globals.SPEED_EXTRACTION_CROP_LEFT
-        right: int = self.img.shape[1] - globals.SPEED_EXTRACTION_CROP_RIGHT
+        img: MatLike = SpeedDataExtractor.crop(frame=frame)
+        img = SpeedDataExtractor.gray(img=img)
+        SpeedDataExtractor.sharpen(img=img, config=frame.config)
+        img = SpeedDataExtractor.binary(img=img)
+        return cv2.cvtColor(src=img, code=cv2.COLOR_BGR2RGB)
 
-        self.img = self.img[top:bottom, left:right]
+    @staticmethod
+    def crop(frame: FrameContext) -> MatLike:
+        """
+        Crop the image to the region of interest, a read-only view of the frame. Every
+        step after it creates a new image.
+        """
+
+        return frame.roi(name="speed")
 
-    def gray(self) -> None:
+    @staticmethod
+    def gray(img: MatLike) -> MatLike:
         """
         Convert the image to grayscale.
         """
 
-        self.img = cv2.cvtColor(src=self.img, code=cv2.COLOR_BGR2GRAY)
+        return cv2.cvtColor(src=img, code=cv2.COLOR_BGR2GRAY)
 
-    def sharpen(self) -> None:
+    @staticmethod
+    def sharpen(img: MatLike, config: ConfigSnapshot) -> MatLike:
         """
         (Un)Sharpen the image.
         """
 
-        blurred: MatLike = cv2.GaussianBlur(src=self.img, ksize=(0, 0), sigmaX=2)
-        cv2.addWeighted(
-            src1=self.img,
-            alpha=1 + globals.SPEED_EXTRACTION_SHARPEN_AMOUNT,
+        blurred: MatLike = cv2.GaussianBlur(src=img, ksize=(0, 0), sigmaX=2)
+        return cv2.addWeighted(
+            src1=img,
+            alpha=1 + config.SPEED_EXTRACTION_SHARPEN_AMOUNT,
             src2=blurred,
-            beta=-globals.SPEED_EXTRACTION_SHARPEN_AMOUNT,
+            beta=-config.SPEED_EXTRACTION_SHARPEN_AMOUNT,
             gamma=0,
         )
 
-    def binary(self) -> None:
+    @staticmethod
+    def binary(img: MatLike) -> MatLike:
         """
         Apply binary thresholding to the image.
         """
 
-        self.img = cv2.threshold(src=self.img, thresh=200, maxval=255, type=cv2.THRESH_BINARY)[1]
+        return cv2.threshold(src=img, thresh=200, maxval=255, type=cv2.THRESH_BINARY)[1]
 
-    def read_speed(self) -> None:
+    def read_speed(self, img: MatLike) -> SpeedBox | None:
         """
         Read the speed from the processed image using OCR.
         """
 
-        self.img = cv2.cvtColor(src=self.img, code=cv2.COLOR_BGR2RGB)
-        self.result: list[str] = cast(list[str], self.reader.readtext(image=self.img, detail=0))  # pyright: ignore[reportUnknownMemberType]
+        with self.pool.reader() as reader:
+            result: list[str] = cast(list[str], reader.readtext(image=img, detail=0))  # pyright: ignore[reportUnknownMemberType]
+        return SpeedDataExtractor.parse_speed(result=result)
+
+    @staticmethod
+    def parse_speed(result: list[str]) -> SpeedBox | None:
+        """
+        Convert the OCR result to a speed, None unless there is exactly one number in the
+        range of a SpeedBox. A misread speed is dropped, it must not fail the frame.
+        """
+
         # make sure that there is only one result
-        if len(self.result) == 1:
+        if len(result) == 1:
             try:
-                self.speed = int(self.result[0])
+                speed: int = int(result[0])
             except ValueError:
-                self.speed = None
-        else:
-            self.speed = None
+                return None
+            if SpeedBox.MIN <= speed <= SpeedBox.MAX:
+                return SpeedBox(speed=speed)
+        return None
@@ -1,4 +1,5 @@
 from .config import Config
 from .globals import *  # noqa: F403
+from .snapshot import ConfigSnapshot, ConfigWatcher, current
 
-__all__: list[str] = ["Config", "globals"]
+__all__: list[str] = ["Config", "ConfigSnapshot", "ConfigWatcher", "current", "globals"]
@@ -3,11 +3,15 @@ from __future__ import annotations
 import builtins
 from configparser import ConfigParser
 
+from .snapshot import ConfigSnapshot, publish
+
 
 class Config:
     """
     Loads a .conf file and generates a typed globals.py file
-    that can be imported elsewhere.
+    that can be imported elsewhere. The globals.py file is only
+    written if the values changed. The values are published as
+    the newest ConfigSnapshot.
     """
 
     def __init__(self, conf_file: str) -> None:
@@ -22,12 +26,15 @@ class Config:
             for key, value in parser[section].items():
                 data[key.upper()] = self._convert_value(value)
 
-        # write it to a .py file
-        with open("configs/globals.py", "w", encoding="utf-8") as f:
-            f.write('"""Autogenerated config globals."""\n\n')
-            for key, value in data.items():
-                type_hint = self._get_type_hint(value)
-                f.write(f"{key}: {type_hint} = {repr(value)}\n")
+        # build and check the snapshot first, an invalid config changes nothing
+        self.snapshot: ConfigSnapshot = publish(values=data, source=conf_file)
+
+        # write it to a .py file, but only if it changed, a rewrite invalidates the bytecode of it
+        lines: list[str] = ['"""Autogenerated config globals."""\n\n']
+        for key, value in data.items():
+            type_hint = self._get_type_hint(value)
+            lines.append(f"{key}: {type_hint} = {repr(value)}\n")
+        self._write_if_changed(path="configs/globals.py", content="".join(lines))
 
         # inject into global namespace so they’re usable immediately
         self._inject_globals(data)
@@ -47,6 +54,18 @@ class Config:
             return False
         return value
 
+    @staticmethod
+    def _write_if_changed(path: str, content: str) -> None:
+        """Write the content to the file, unless it already holds it."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                if f.read() == content:
+                    return
+        except OSError:
+            pass
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
     @staticmethod
     def _get_type_hint(value: str | int | float | bool) -> str:
         """Return the type hint string for the given value."""
@@ -4,6 +4,8 @@ APP_TITLE: str = 'Debug Viewer for AETD'
 BASE_DIR: str = 'debug/data/tests/Samples'
 DEFAULT_IMG: str = 'debug/data/tests/Samples/ETS2_60-FPS_2025-08-09_19-51-39_trimmed_Frame-1.jpg'
 DEFAULT_VIDEO: str = 'debug/data/tests/ETS2_60-FPS_2025-08-09_19-51-39_trimmed.mp4'
+FRAME_CACHE_MB: int = 1024
+PREFETCH_FRAMES: int = 30
 DIRECTION_EXTRACTION_CROP_TOP: int = 28
 DIRECTION_EXTRACTION_CROP_BOTTOM: int = 900
 DIRECTION_EXTRACTION_CROP_LEFT: int = 810
@@ -11,25 +13,73 @@ DIRECTION_EXTRACTION_CROP_RIGHT: int = 810
 DIRECTION_EXTRACTION_RED_THRESHOLD: int = 150
 DIRECTION_EXTRACTION_CONTOUR_MIN_AREA: int = 50
 DIRECTION_EXTRACTION_CENTER_PILLAR_CROP: int = 140
+DIRECTION_EXTRACTION_ANALYSIS_SCALE: float = 1.0
 SPEED_EXTRACTION_CROP_TOP: int = 5
 SPEED_EXTRACTION_CROP_BOTTOM: int = 1057
 SPEED_EXTRACTION_CROP_LEFT: int = 770
 SPEED_EXTRACTION_CROP_RIGHT: int = 1125
 SPEED_EXTRACTION_EASYOCR_DEVICES: bool = False
+SPEED_EXTRACTION_EASYOCR_READERS: int = 1
 SPEED_EXTRACTION_SHARPEN_AMOUNT: float = 1.5
 ROADOBJECT_EXTRACTION_CROP_TOP: int = 160
 DETECTION_MODEL_PATH: str = 'models/pretrained/yolo-detect-m_best_epochs-100_size-460-960_05-08-2025.pt'
 DETECTION_MODEL_DEVICES: str = 'cpu'
 CLASSIFICATION_MODEL_PATH: str = 'models/pretrained/yolo-cls-s_best_epochs-30_size-32-32_06-08-2025.pt'
 CLASSIFICATION_MODEL_DEVICES: str = 'cpu'
+DETECTION_MODEL_BACKEND: str = 'torch'
+CLASSIFICATION_MODEL_BACKEND: str = 'torch'
+DETECTION_MODEL_IMGSZ: int = 0
+CLASSIFICATION_MODEL_IMGSZ: int = 0
 ROADSEGMENT_EXTRACTION_CROP_TOP: int = 160
+ROADSEGMENT_EXTRACTION_ANALYSIS_SCALE: float = 1.0
 SEGMENTATION_MODEL_PATH: str = 'models/pretrained/yolo-seg-m_full-road_best_epochs-300_size-460-960_07-08-2025.pt'
 SEGMENTATION_MODEL_DEVICES: str = 'cpu'
+SEGMENTATION_MODEL_BACKEND: str = 'torch'
+SEGMENTATION_MODEL_IMGSZ: int = 0
 ROADSEGMENT_EXTRACTION_MIN_CONF: float = 0.6
 ROADSEGMENT_EXTRACTION_MIN_AREA_LANE: int = 400
 ROADSEGMENT_EXTRACTION_MIN_LENGTH_LANE: int = 300
 ROADSEGMENT_EXTRACTION_MIN_AREA_DRIVEABLE: int = 1000
 ROADSEGMENT_EXTRACTION_MIN_LENGTH_DRIVEABLE: int = 1000
+MODEL_DIRECT_INPUT: bool = False
+ONNX_INTRA_OP_THREADS: int = 0
+CAPTURE_BACKEND: str = 'screen'
+CAPTURE_MONITOR: int = 1
+CAPTURE_LEFT: int = 0
+CAPTURE_TOP: int = 0
+CAPTURE_WIDTH: int = 0
+CAPTURE_HEIGHT: int = 0
+CAPTURE_FPS: int = 60
+CAPTURE_VIDEO_PATH: str = 'debug/data/tests/ETS2_60-FPS_2025-08-09_19-51-39_trimmed.mp4'
+CAPTURE_VIDEO_LOOP: bool = False
+CAPTURE_BUFFER_SLOTS: int = 4
+CONTROL_RATE_HZ: int = 100
+CONTROL_SINK: str = 'virtual'
+CONTROL_LOOKAHEAD: float = 0.8
+CONTROL_STEERING_GAIN: float = 1.5
+CONTROL_TARGET_SPEED: int = 80
+CONTROL_THROTTLE_GAIN: float = 2.0
+LATENCY_COMPENSATION: str = 'shift'
+LATENCY_PIXELS_PER_METER: float = 6.0
+LATENCY_MAX_COMPENSATION: float = 0.3
+LATENCY_WINDOW: int = 200
+PROTECTION_HOLD_LANE_MS: int = 150
+PROTECTION_EASE_THROTTLE_MS: int = 300
+PROTECTION_STOP_STEERING_MS: int = 600
+PROTECTION_OBJECTS_MS: int = 300
+RECORDER_ENABLED: bool = False
+RECORDER_OUTPUT_DIR: str = 'recordings'
+RECORDER_QUEUE_SIZE: int = 32
+RECORDER_DROP_POLICY: str = 'drop_oldest'
+RECORDER_SCALE: float = 1.0
+RECORDER_FRAME_STRIDE: int = 1
+RECORDER_FPS: int = 60
+RECORDER_CODEC: str = 'mp4v'
+RECORDER_RAW: bool = True
+RECORDER_ANNOTATED: bool = True
+ANNOTATION_LOG_ENABLED: bool = False
+ANNOTATION_LOG_DIR: str = 'recordings/annotation_log'
+ANNOTATION_LOG_CHUNK_FRAMES: int = 64
 PREPROCESSING_SHARPEN_AMOUNT: float = 1.5
 PREPROCESSING_GAMMA_MAX: float = 1.5
 PREPROCESSING_CLAHE_THRESHOLD: int = 50
@@ -0,0 +1,237 @@
+#
+# The ConfigSnapshot holds one version of the config. It is never changed after creation, a changed .conf file
+# gives a new snapshot, so a frame is always processed with the values of one version. The values derived from
+# the config (crops, kernels, lookup tables) are computed once per snapshot. The ConfigWatcher loads a new
+# snapshot when the .conf file changes.
+#
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+from . import globals as generated
+
+Value = str | int | float | bool
+
+# the newest snapshot, read without a lock, it is only ever replaced as a whole
+_current: ConfigSnapshot | None = None
+_lock = threading.Lock()
+
+
+def crop_slices(top: int, bottom: int, left: int, right: int) -> tuple[slice, slice]:
+    """
+    Return the (rows, cols) slices that cut the given margins off an image of any size.
+    """
+
+    return slice(top, -bottom if bottom > 0 else None), slice(left, -right if right > 0 else None)
+
+
+def analysis_scale(scale: float) -> float:
+    """
+    Check the scale the post-processing of a stage runs at, 1 is the full resolution.
+    """
+
+    if not 0 < scale <= 1:
+        raise ValueError(f"The analysis scale has to be in (0, 1], got {scale}")
+    return float(scale)
+
+
+class ConfigSnapshot:
+    """
+    One immutable version of the config. The values are read as attributes, like the
+    globals (snapshot.SPEED_EXTRACTION_CROP_TOP).
+
+    Args:
+        values (Mapping[str, Value]): The config values.
+        version (int): Increases with every loaded version of the config.
+        source (str): The .conf file the values come from, empty if they come from the generated globals.py.
+
+    Attributes:
+        direction_crop (tuple[slice, slice]): The region of the road advisor.
+        direction_scale (float): The scale the direction crop is analyzed at.
+        direction_pillar (slice): The columns of the center pillar in the direction crop, at the analysis scale.
+        direction_min_area (float): The minimum area of a direction contour, at the analysis scale.
+        speed_crop (tuple[slice, slice]): The region of the speedometer.
+        objects_crop (slice): The rows the road objects are detected in.
+        segments_crop (slice): The rows the road segments are detected in.
+        segments_scale (float): The scale the masks of the road segments are cleaned at.
+        morph_kernel (NDArray[np.uint8]): The kernel to clean the segment masks with.
+        gamma_lut (NDArray[np.uint8]): The lookup table of the gamma correction.
+    """
+
+    __slots__ = (
+        "values",
+        "version",
+        "source",
+        "direction_crop",
+        "direction_scale",
+        "direction_pillar",
+        "direction_min_area",
+        "speed_crop",
+        "objects_crop",
+        "segments_crop",
+        "segments_scale",
+        "morph_kernel",
+        "gamma_lut",
+        "local",
+    )
+
+    def __init__(self, values: Mapping[str, Value], version: int = 0, source: str = "") -> None:
+        self.values: Mapping[str, Value] = MappingProxyType(dict(values))
+        self.version: int = version
+        self.source: str = source
+
+        self.direction_crop: tuple[slice, slice] = crop_slices(
+            top=self.DIRECTION_EXTRACTION_CROP_TOP,
+            bottom=self.DIRECTION_EXTRACTION_CROP_BOTTOM,
+            left=self.DIRECTION_EXTRACTION_CROP_LEFT,
+            right=self.DIRECTION_EXTRACTION_CROP_RIGHT,
+        )
+        self.direction_scale: float = analysis_scale(scale=self.DIRECTION_EXTRACTION_ANALYSIS_SCALE)
+        pillar_crop: int = round(self.DIRECTION_EXTRACTION_CENTER_PILLAR_CROP * self.direction_scale)
+        self.direction_pillar: slice = crop_slices(top=0, bottom=0, left=pillar_crop, right=pillar_crop)[1]
+        self.direction_min_area: float = self.DIRECTION_EXTRACTION_CONTOUR_MIN_AREA * self.direction_scale**2
+        self.speed_crop: tuple[slice, slice] = crop_slices(
+            top=self.SPEED_EXTRACTION_CROP_TOP,
+            bottom=self.SPEED_EXTRACTION_CROP_BOTTOM,
+            left=self.SPEED_EXTRACTION_CROP_LEFT,
+            right=self.SPEED_EXTRACTION_CROP_RIGHT,
+        )
+        self.objects_crop: slice = slice(self.ROADOBJECT_EXTRACTION_CROP_TOP, None)
+        self.segments_crop: slice = slice(self.ROADSEGMENT_EXTRACTION_CROP_TOP, None)
+        self.segments_scale: float = analysis_scale(scale=self.ROADSEGMENT_EXTRACTION_ANALYSIS_SCALE)
+
+        self.morph_kernel: NDArray[np.uint8] = cv2.getStructuringElement(shape=cv2.MORPH_ELLIPSE, ksize=(3, 3))
+        self.morph_kernel.flags.writeable = False
+
+        # the darker a pixel, the stronger the correction
+        normalized: NDArray[np.float64] = np.arange(256) / 255.0
+        gamma: NDArray[np.float64] = 1.0 + (self.PREPROCESSING_GAMMA_MAX - 1.0) * (1 - normalized)
+        self.gamma_lut: NDArray[np.uint8] = np.clip(np.power(normalized, 1.0 / gamma) * 255, 0, 255).astype(np.uint8)
+        self.gamma_lut.flags.writeable = False
+
+        # a CLAHE instance can't be shared between threads, every thread gets its own
+        self.local = threading.local()
+
+    def __getattr__(self, name: str) -> Any:
+        # only called for names that are not a set slot, i.e. the config values
+        if name in ConfigSnapshot.__slots__:
+            raise AttributeError(name)
+        try:
+            return self.values[name]
+        except KeyError:
+            raise AttributeError(f"The config has no value {name}") from None
+
+    def clahe(self) -> cv2.CLAHE:
+        """
+        Return the CLAHE of the preprocessing for the calling thread.
+        """
+
+        clahe: cv2.CLAHE | None = getattr(self.local, "clahe", None)
+        if clahe is None:
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            self.local.clahe = clahe
+        return clahe
+
+    def __str__(self) -> str:
+        return f"ConfigSnapshot(version={self.version}, source={self.source or 'globals.py'})"
+
+
+def current() -> ConfigSnapshot:
+    """
+    Return the newest snapshot. Without a loaded config, the values of the generated
+    globals.py are used.
+    """
+
+    global _current
+    if _current is None:
+        with _lock:
+            if _current is None:
+                _current = ConfigSnapshot(
+                    values={key: value for key, value in vars(generated).items() if key.isupper()}
+                )
+    return _current
+
+
+def publish(values: Mapping[str, Value], source: str) -> ConfigSnapshot:
+    """
+    Make the values the newest snapshot, with the next version.
+
+    Returns:
+        ConfigSnapshot: The new snapshot.
+    """
+
+    global _current
+    with _lock:
+        version: int = 0 if _current is None else _current.version + 1
+        _current = ConfigSnapshot(values=values, version=version, source=source)
+        return _current
+
+
+class ConfigWatcher:
+    """
+    Watches a .conf file and loads it again when it changes. There is no thread, the
+    user polls it at a point where a new config can be taken over, the Pipeline does
+    this between two frames.
+
+    Args:
+        conf_file (str): The .conf file to watch.
+        interval (float): The minimum time in seconds between two checks of the file.
+    """
+
+    def __init__(self, conf_file: str, interval: float = 1.0) -> None:
+        self.conf_file: str = conf_file
+        self.interval: float = interval
+        self.checked: float = time.monotonic()
+        self.mtime: float = self.stat()
+
+        snapshot: ConfigSnapshot = current()
+        if snapshot.source != conf_file:
+            snapshot = self.load() or snapshot
+        self.snapshot: ConfigSnapshot = snapshot
+
+    def stat(self) -> float:
+        try:
+            return os.stat(self.conf_file).st_mtime
+        except OSError:
+            return 0.0
+
+    def load(self) -> ConfigSnapshot | None:
+        # imported here, the Config publishes the snapshots of this module
+        from .config import Config
+
+        try:
+            return Config(conf_file=self.conf_file).snapshot
+        except Exception as e:
+            print(f"Warning: could not load the config {self.conf_file}, keeping version {current().version}: {e}")
+            return None
+
+    def poll(self) -> ConfigSnapshot:
+        """
+        Return the newest snapshot of the file, loaded again if the file changed.
+        """
+
+        now: float = time.monotonic()
+        if now - self.checked < self.interval:
+            return self.snapshot
+        self.checked = now
+
+        mtime: float = self.stat()
+        if mtime == self.mtime:
+            return self.snapshot
+        self.mtime = mtime
+
+        snapshot: ConfigSnapshot | None = self.load()
+        if snapshot is not None and snapshot.values != self.snapshot.values:
+            print(f"Config {self.conf_file} changed, now using version {snapshot.version}.")
+            self.snapshot = snapshot
+        return self.snapshot
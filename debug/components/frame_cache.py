@@ -0,0 +1,229 @@
+#
+# The FrameCache keeps the processed frames of the video viewer, so stepping back and forth doesn't run the
+# modules again. The FramePrefetcher fills it ahead of the playhead on its own thread.
+#
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from cv2.typing import MatLike
+
+from aetd_modules import AnnotationsContainer
+from models import IndexedVideoReader, KeyframeIndex
+
+if TYPE_CHECKING:
+    from debug.components.tab_bars import ModuleTabBar
+
+
+class FrameCache:
+    """
+    LRU of the processed frames of a video by frame index, bounded by the memory of the
+    images it holds. Safe to use from any thread.
+
+    Args:
+        max_bytes (int): The memory the cached images may use.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes: int = max_bytes
+        self.entries: OrderedDict[int, tuple[AnnotationsContainer, int]] = OrderedDict()
+        self.bytes: int = 0
+        self.lock = threading.Lock()
+
+        # changes with every clear, so results of the old modules are not stored anymore
+        self.generation: int = 0
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def size(annotations: AnnotationsContainer) -> int:
+        size: int = annotations.original_img.nbytes
+        if annotations.is_annotated() and annotations.annotated_img is not annotations.original_img:
+            size += annotations.annotated_img.nbytes
+        return size
+
+    def get(self, frame: int) -> AnnotationsContainer | None:
+        """
+        Return the processed frame, counts as a hit or a miss.
+        """
+
+        with self.lock:
+            entry: tuple[AnnotationsContainer, int] | None = self.entries.get(frame)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(frame)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, frame: int) -> bool:
+        with self.lock:
+            return frame in self.entries
+
+    def put(self, frame: int, annotations: AnnotationsContainer, generation: int | None = None) -> None:
+        """
+        Store a processed frame, the least recently used frames make room for it.
+
+        Args:
+            frame (int): The index of the frame.
+            annotations (AnnotationsContainer): The processed frame.
+            generation (int | None): The generation the frame was processed in, if the cache
+                was cleared since, the frame is not stored.
+        """
+
+        size: int = self.size(annotations=annotations)
+        with self.lock:
+            if (generation is not None and generation != self.generation) or size > self.max_bytes:
+                return
+
+            if frame in self.entries:
+                self.bytes -= self.entries.pop(frame)[1]
+            while self.entries and self.bytes + size > self.max_bytes:
+                self.bytes -= self.entries.popitem(last=False)[1][1]
+
+            self.entries[frame] = (annotations, size)
+            self.bytes += size
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.generation += 1
+
+    def hit_rate(self) -> float:
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class FramePrefetcher:
+    """
+    Processes the frames ahead of the playhead, in the direction it moves, and puts them
+    into the cache. It uses its own reader, the playback is not disturbed.
+
+    Args:
+        video_path (str): The video.
+        index (KeyframeIndex): The keyframe index of the video.
+        module_tab_bar (ModuleTabBar): The modules the frames are processed with.
+        cache (FrameCache): Where the processed frames go.
+        ahead (int): The number of frames to keep ready ahead of the playhead.
+        frame_count (int): The number of frames of the video.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        index: KeyframeIndex,
+        module_tab_bar: ModuleTabBar,
+        cache: FrameCache,
+        ahead: int,
+        frame_count: int,
+    ) -> None:
+        self.video_path: str = video_path
+        self.index: KeyframeIndex = index
+        self.module_tab_bar: ModuleTabBar = module_tab_bar
+        self.cache: FrameCache = cache
+        self.ahead: int = ahead
+        self.frame_count: int = frame_count
+
+        self.playhead: int = 0
+        self.direction: int = 1
+        # the memory of one processed frame, known after the first one
+        self.frame_bytes: int = 0
+
+        self.condition = threading.Condition()
+        self.running: bool = False
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="frame-prefetcher", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def move(self, frame: int, direction: int = 0) -> None:
+        """
+        Tell the prefetcher where the playhead is.
+
+        Args:
+            frame (int): The shown frame.
+            direction (int): 1 forward, -1 backward, 0 keeps the direction.
+        """
+
+        with self.condition:
+            self.playhead = frame
+            if direction != 0:
+                self.direction = direction
+            self.condition.notify()
+
+    def wake(self) -> None:
+        """
+        Look for missing frames again, after the cache was cleared.
+        """
+
+        with self.condition:
+            self.condition.notify()
+
+    def missing(self) -> int | None:
+        """
+        Return the missing frame closest to the playhead in the play direction.
+        """
+
+        # don't look further ahead than the cache can hold, it would evict its own frames
+        ahead: int = self.ahead
+        if self.frame_bytes > 0:
+            ahead = min(ahead, self.cache.max_bytes // self.frame_bytes - 1)
+
+        for step in range(1, ahead + 1):
+            frame: int = self.playhead + self.direction * step
+            if frame < 0 or (self.frame_count > 0 and frame >= self.frame_count):
+                return None
+            if frame not in self.cache:
+                return frame
+        return None
+
+    def run(self) -> None:
+        reader = IndexedVideoReader(video_path=self.video_path, index=self.index)
+        try:
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: not self.running or self.missing() is not None)
+                    if not self.running:
+                        return
+                    frame: int | None = self.missing()
+                    generation: int = self.cache.generation
+                if frame is None:
+                    continue
+
+                # frames ahead are reached by decoding on, without jumping to a keyframe
+                read: tuple[int, MatLike] | None = reader.read(frame=frame)
+                if read is None:
+                    # the video ends before this frame, the frame count was wrong
+                    with self.condition:
+                        self.frame_count = frame
+                    continue
+
+                # the precalculated results are stored under the key of the frame
+                frame, img = read
+                annotations: AnnotationsContainer = self.module_tab_bar.process(
+                    annotations_container=AnnotationsContainer(img=img, img_name=IndexedVideoReader.key(frame=frame))
+                )
+                self.frame_bytes = FrameCache.size(annotations=annotations)
+                self.cache.put(frame=frame, annotations=annotations, generation=generation)
+        except Exception as e:
+            print(f"Error: the frame prefetcher stopped: {e}")
+        finally:
+            reader.release()
@@ -31,6 +31,13 @@ from models import PreCalculatedLoader
 # ----------------------------- BASE TAB --------------------------------------
 #
 class ModulTab(QWidget):
+    # the attribute of the AnnotationsContainer the tab fills
+    field: str = ""
+    # the tabs whose output the tab works on
+    depends_on: tuple[type["ModulTab"], ...] = ()
+    # the tab changes its input in place, so it gets a copy
+    mutates_input: bool = False
+
     def __init__(self, parent: QWidget | None = None, table_data: list[tuple[str, str]] | None = None) -> None:
         super().__init__(parent)
         self.img: MatLike | None = None
@@ -80,6 +87,8 @@ class ModulTab(QWidget):
 
 
 class DirectionsTab(ModulTab):
+    field = "direction"
+
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.modul: DirectionExtractor = DirectionExtractor()
@@ -93,6 +102,8 @@ class DirectionsTab(ModulTab):
 
 
 class SpeedTab(ModulTab):
+    field = "speed"
+
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.modul: SpeedDataExtractor = SpeedDataExtractor()
@@ -106,6 +117,8 @@ class SpeedTab(ModulTab):
 
 
 class RoadObjectDetectionTab(ModulTab):
+    field = "road_objects"
+
     def __init__(self, parent: QWidget | None = None) -> None:
         # load the module with results only if path is set
         self.modul: RoadObjectDetectionExtractor = RoadObjectDetectionExtractor(only_detec_results=globals.DET_RESULTS)
@@ -146,6 +159,11 @@ class RoadObjectDetectionTab(ModulTab):
 
 
 class RoadObjectClassificationTab(ModulTab):
+    field = "road_objects"
+    depends_on = (RoadObjectDetectionTab,)
+    # the classification refines the classes of the detected objects in place
+    mutates_input = True
+
     def __init__(self, parent: QWidget | None = None) -> None:
         self.modul: RoadObjectClassificationRefiner = RoadObjectClassificationRefiner(
             only_cls_results=globals.CLS_RESULTS
@@ -193,6 +211,8 @@ class RoadObjectClassificationTab(ModulTab):
 
 
 class SegmentorTab(ModulTab):
+    field = "road_segments"
+
     def __init__(self, parent: QWidget | None = None) -> None:
         # load the module with results only if path is set
         self.modul = RoadSegmentsExtractor(only_results=globals.SEG_RESULTS)
@@ -234,19 +254,23 @@ class SegmentorTab(ModulTab):
 
 # the path planner needs previously calculated segments to work
 class PathTab(ModulTab):
+    field = "paths"
+    depends_on = (SegmentorTab,)
+
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.modul: PathPlanner = PathPlanner()
 
     def process(self, annotations_container: AnnotationsContainer, to_none: bool = False) -> AnnotationsContainer:
         if to_none:
-            annotations_container.road_segments = None
+            annotations_container.paths = None
         else:
             if annotations_container.road_segments is not None:
                 annotations_container.paths = self.modul.process(
                     road_segment_box=annotations_container.road_segments,
                     width=annotations_container.original_img.shape[1],
                     height=annotations_container.original_img.shape[0],
+                    config=annotations_container.config,
                 )
 
         return annotations_container
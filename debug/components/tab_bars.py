@@ -1,3 +1,11 @@
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from PySide6.QtCore import Signal
 from PySide6.QtWidgets import QTabWidget, QWidget
 
 from aetd_modules import AnnotationsContainer
@@ -13,13 +21,33 @@ from .module_tabs import (
 )
 from .view_tabs import ImageViewerTab, VideoViewerTab
 
+# the number of outputs every tab remembers
+MEMO_SIZE: int = 8
+
 
 class ModuleTabBar(QTabWidget):
+    """
+    Runs the enabled module tabs on a frame. The output of every tab is remembered by
+    the frame, the state of the tab and the outputs it depends on, so toggling a tab
+    only recomputes that tab and the tabs depending on it. Tabs that don't depend on
+    each other run in parallel.
+
+    The check boxes are only read on the GUI thread: every toggle replaces the enabled
+    snapshot, process works with one snapshot from start to end.
+    """
+
+    # a tab was enabled or disabled
+    changed = Signal()
+    # the new enabled snapshot, for the workers on other threads, emitted before changed
+    enabled_changed = Signal(object)
+
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent=parent)
 
         # save all tabs
         self.tabs: list[ModulTab] = []
+        # the image and the video viewer process on different threads, the models are shared
+        self.lock = threading.Lock()
 
         # hook tabs
         tab = DirectionsTab()
@@ -46,13 +74,118 @@ class ModuleTabBar(QTabWidget):
         self.addTab(tab, "Path Planner")
         self.tabs.append(tab)
 
-    def process(self, annotations_container: AnnotationsContainer) -> AnnotationsContainer:
+        # the tabs are in dependency order, every tab finds the tabs it depends on before it
+        self.providers: dict[type[ModulTab], ModulTab] = {type(tab): tab for tab in self.tabs}
+        self.memo: dict[ModulTab, OrderedDict[tuple[Any, ...], Any]] = {tab: OrderedDict() for tab in self.tabs}
+        self.executor = ThreadPoolExecutor(max_workers=len(self.tabs), thread_name_prefix="module-tab")
+        # how often a tab was computed and how often its output was reused
+        self.computed: int = 0
+        self.reused: int = 0
+
+        # the enabled state of every tab, a new dict on every toggle, never changed in place
+        self.enabled: dict[ModulTab, bool] = {tab: tab.check_box.isChecked() for tab in self.tabs}
         for tab in self.tabs:
-            annotations_container = tab.process(
-                annotations_container=annotations_container, to_none=not tab.check_box.isChecked()
-            )
+            tab.check_box.toggled.connect(lambda _: self.toggled())
+
+    def toggled(self) -> None:
+        """
+        Take the snapshot of the check boxes, on the GUI thread.
+        """
+
+        self.enabled = {tab: tab.check_box.isChecked() for tab in self.tabs}
+        self.enabled_changed.emit(self.enabled)
+        self.changed.emit()
+
+    @staticmethod
+    def frame_key(annotations_container: AnnotationsContainer) -> tuple[Any, ...]:
+        """
+        Identify the frame by its name and its pixels, a reloaded image is the same frame.
+        """
+
+        digest: str = hashlib.blake2b(
+            memoryview(annotations_container.original_img).cast("B"), digest_size=16
+        ).hexdigest()
+        return (annotations_container.original_img_name, annotations_container.original_img.shape, digest)
+
+    def process(
+        self, annotations_container: AnnotationsContainer, enabled: dict[ModulTab, bool] | None = None
+    ) -> AnnotationsContainer:
+        """
+        Run the tabs on the frame.
+
+        Args:
+            annotations_container (AnnotationsContainer): The frame.
+            enabled (dict[ModulTab, bool] | None): The enabled state of every tab, the newest snapshot if None.
+        """
+
+        frame_key: tuple[Any, ...] = self.frame_key(annotations_container=annotations_container)
+        # read once, the keys and the computed outputs belong to the same state
+        enabled = enabled if enabled is not None else self.enabled
+
+        with self.lock:
+            keys: dict[ModulTab, tuple[Any, ...]] = {}
+            outputs: dict[ModulTab, Future[Any]] = {}
+
+            for tab in self.tabs:
+                dependencies: list[ModulTab] = [self.providers[dependency] for dependency in tab.depends_on]
+                key: tuple[Any, ...] = (
+                    frame_key,
+                    enabled[tab],
+                    tuple(keys[dependency] for dependency in dependencies),
+                )
+                keys[tab] = key
+
+                if key in self.memo[tab]:
+                    self.memo[tab].move_to_end(key)
+                    self.reused += 1
+                    output: Future[Any] = Future()
+                    output.set_result(self.memo[tab][key])
+                else:
+                    self.computed += 1
+                    output = self.executor.submit(
+                        self.run_tab,
+                        tab,
+                        annotations_container,
+                        key,
+                        [(dependency, outputs[dependency]) for dependency in dependencies],
+                    )
+                outputs[tab] = output
+
+            # the later tabs overwrite the earlier ones, like the classification the detection
+            for tab in self.tabs:
+                setattr(annotations_container, tab.field, outputs[tab].result())
+
         return annotations_container
 
+    def run_tab(
+        self,
+        tab: ModulTab,
+        annotations_container: AnnotationsContainer,
+        key: tuple[Any, ...],
+        dependencies: list[tuple[ModulTab, Future[Any]]],
+    ) -> Any:
+        """
+        Run one tab on a shallow copy of the container, that only holds the outputs the tab depends on.
+        The enabled state is the one in the key.
+        """
+
+        container: AnnotationsContainer = copy.copy(annotations_container)
+        for other in self.tabs:
+            setattr(container, other.field, None)
+        for dependency, output in dependencies:
+            # the remembered output must not be changed by the tab
+            value: Any = output.result()
+            setattr(container, dependency.field, copy.deepcopy(value) if tab.mutates_input else value)
+
+        result: Any = getattr(tab.process(annotations_container=container, to_none=not key[1]), tab.field)
+
+        memo: OrderedDict[tuple[Any, ...], Any] = self.memo[tab]
+        memo[key] = result
+        if len(memo) > MEMO_SIZE:
+            memo.popitem(last=False)
+
+        return result
+
 
 class ViewTabBar(QTabWidget):
     def __init__(self, module_tab_bar: ModuleTabBar, parent: QWidget | None = None) -> None:
@@ -1,73 +1,224 @@
 from __future__ import annotations
 
+import math
 import os
+import time
+from collections import deque
 from functools import partial
 from typing import TYPE_CHECKING
 
 import cv2
+import numpy as np
 from cv2.typing import MatLike, NumPyArrayNumeric
-from PySide6.QtCore import Qt, QTimerEvent
+from numpy.typing import NDArray
+from PySide6.QtCore import QCoreApplication, QObject, Qt, QThread, QTimer, Signal, Slot
 from PySide6.QtGui import QImage, QPixmap, QResizeEvent
 from PySide6.QtWidgets import QHBoxLayout, QLabel, QPushButton, QSizePolicy, QSlider, QVBoxLayout, QWidget
 
-from aetd_modules import AnnotationsContainer, Draw
+from aetd_modules import AnnotationsContainer, Compositor
 from configs import globals
+from models import IndexedVideoReader
+
+from .frame_cache import FrameCache, FramePrefetcher
 
 if TYPE_CHECKING:
+    from debug.components.module_tabs import ModulTab
     from debug.components.tab_bars import ModuleTabBar
 
 
+class RenderRequest:
+    """
+    A frame the View wants to be rendered at the given size.
+
+    Args:
+        annotations (AnnotationsContainer): The annotations of the frame.
+        generation (int): Counts the frames of the View, a new frame means the annotations have to be drawn again.
+        width (int): The width of the View.
+        height (int): The height of the View.
+    """
+
+    def __init__(self, annotations: AnnotationsContainer, generation: int, width: int, height: int) -> None:
+        self.annotations: AnnotationsContainer = annotations
+        self.generation: int = generation
+        self.width: int = width
+        self.height: int = height
+
+
+class RenderResult:
+    """
+    The rendered frame of a RenderRequest.
+
+    Args:
+        generation (int): The generation of the request.
+        width (int): The width of the request.
+        height (int): The height of the request.
+        image (QImage): The image, it points into buffer.
+        buffer (NDArray[np.uint8]): The scaled BGR pixels, kept alive as long as the image is used.
+    """
+
+    def __init__(self, generation: int, width: int, height: int, image: QImage, buffer: NDArray[np.uint8]) -> None:
+        self.generation: int = generation
+        self.width: int = width
+        self.height: int = height
+        self.image: QImage = image
+        self.buffer: NDArray[np.uint8] = buffer
+
+
+class RenderWorker(QObject):
+    """
+    Draws the annotations and scales the frame to the size of the View, on its own thread.
+    The annotations are only drawn again for a new frame, a resize only scales again.
+    """
+
+    rendered = Signal(object)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.compositor = Compositor()
+        self.generation: int = -1
+
+    @Slot(object)
+    def render(self, request: RenderRequest) -> None:
+        if request.generation != self.generation:
+            self.compositor.draw(annotations=request.annotations)
+            self.generation = request.generation
+        img: MatLike = request.annotations.annotated_img
+
+        # keep the aspect ratio, scale before anything else is done with the pixels
+        scale: float = min(request.width / img.shape[1], request.height / img.shape[0])
+        size: tuple[int, int] = (max(1, round(img.shape[1] * scale)), max(1, round(img.shape[0] * scale)))
+        scaled: NDArray[np.uint8] = cv2.resize(
+            src=img, dsize=size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        )
+
+        # the QImage uses the BGR pixels directly, no conversion and no copy
+        image = QImage(scaled.data, size[0], size[1], scaled.strides[0], QImage.Format.Format_BGR888)
+        self.rendered.emit(
+            RenderResult(
+                generation=request.generation, width=request.width, height=request.height, image=image, buffer=scaled
+            )
+        )
+
+
 class View(QLabel):
+    request_render = Signal(object)
+
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
 
         self.annotations_container: AnnotationsContainer | None = None
+        self.generation: int = 0
+
+        # (generation, width, height) of the shown pixmap
+        self.shown: tuple[int, int, int] | None = None
+        # only one request is rendered at a time, a newer one replaces the waiting one
+        self.busy: bool = False
+        self.pending: RenderRequest | None = None
+
+        # drawing and scaling happen on the render thread
+        self.render_thread = QThread(self)
+        self.worker = RenderWorker()
+        self.worker.moveToThread(self.render_thread)
+        self.request_render.connect(self.worker.render)
+        self.worker.rendered.connect(self.show_rendered)
+        self.render_thread.start()
+
+        app: QCoreApplication | None = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop_render_thread)
 
     def container(self, annotations_container: AnnotationsContainer) -> None:
         self.annotations_container = annotations_container
+        self.generation += 1
         self.redraw()
 
     def redraw(self) -> None:
-        if self.annotations_container is not None:
-            Draw.draw(annotations=self.annotations_container)
-
-            rgb_image: MatLike = cv2.cvtColor(src=self.annotations_container.annotated_img, code=cv2.COLOR_BGR2RGB)
-
-            h: int = rgb_image.shape[0]
-            w: int = rgb_image.shape[1]
-            ch: int = rgb_image.shape[2]
-            bytes_per_line: int = ch * w
-
-            q_img = QImage(
-                rgb_image.tobytes(),
-                w,
-                h,
-                bytes_per_line,
-                QImage.Format.Format_RGB888,
-            )
-
-            self.setPixmap(
-                QPixmap.fromImage(q_img).scaled(
-                    self.size(),
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation,
-                )
-            )
+        if self.annotations_container is None:
+            return
+
+        # the pixmap for this frame and size is already shown
+        if self.shown == (self.generation, self.width(), self.height()):
+            self.pending = None
+            return
+
+        request = RenderRequest(
+            annotations=self.annotations_container,
+            generation=self.generation,
+            width=self.width(),
+            height=self.height(),
+        )
+        if self.busy:
+            self.pending = request
+        else:
+            self.busy = True
+            self.request_render.emit(request)
+
+    @Slot(object)
+    def show_rendered(self, result: RenderResult) -> None:
+        self.busy = False
+        # QPixmap.fromImage copies the pixels, the buffer of the result can go after this
+        self.setPixmap(QPixmap.fromImage(result.image))
+        self.shown = (result.generation, result.width, result.height)
+
+        if self.pending is not None:
+            request: RenderRequest = self.pending
+            self.pending = None
+            if self.shown != (request.generation, request.width, request.height):
+                self.busy = True
+                self.request_render.emit(request)
+
+    def stop_render_thread(self) -> None:
+        self.render_thread.quit()
+        self.render_thread.wait()
 
     def resizeEvent(self, event: QResizeEvent) -> None:
         self.redraw()
         super().resizeEvent(event)
 
 
+class ImageWorker(QObject):
+    """
+    Processes the image of the image viewer on its own thread. The models are shared
+    with the video, the GUI must not wait for a frame that is processed right now.
+
+    Args:
+        module_tab_bar (ModuleTabBar): The modules the image is processed with.
+    """
+
+    processed = Signal(object)
+
+    def __init__(self, module_tab_bar: "ModuleTabBar") -> None:
+        super().__init__()
+        self.module_tab_bar: "ModuleTabBar" = module_tab_bar
+
+    @Slot(object, object)
+    def process(self, annotations_container: AnnotationsContainer, enabled: dict["ModulTab", bool]) -> None:
+        self.processed.emit(self.module_tab_bar.process(annotations_container=annotations_container, enabled=enabled))
+
+
 class ImageViewerTab(QWidget):
+    request_process = Signal(object, object)
+
     def __init__(self, module_tab_bar: "ModuleTabBar", parent: QWidget | None = None) -> None:
         super().__init__(parent)
 
         self.module_tab_bar = module_tab_bar
         self.view = View(self)
 
+        # the processing happens on the image thread
+        self.image_thread = QThread(self)
+        self.worker = ImageWorker(module_tab_bar=module_tab_bar)
+        self.worker.moveToThread(self.image_thread)
+        self.request_process.connect(self.worker.process)
+        self.worker.processed.connect(self.view.container)
+        self.image_thread.start()
+
+        app: QCoreApplication | None = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop_image_thread)
+
         # Create reload button
         self.reload_btn = QPushButton("⟳")
         self.reload_btn.setFixedSize(30, 30)
@@ -84,42 +235,224 @@ class ImageViewerTab(QWidget):
         layout.addWidget(self.view, 1)
         self.setLayout(layout)
 
+        self.img: cv2.Mat | NumPyArrayNumeric | None = None
+        self.basename: str = ""
+
         # load the given global image path if the image path is not none
         self.reload_image()
+        # process the image again when a module is enabled or disabled
+        self.module_tab_bar.changed.connect(self.process_image)
 
     def reload_image(self) -> None:
         if globals.DEFAULT_IMG != "":
-            img: cv2.Mat | NumPyArrayNumeric | None = cv2.imread(filename=globals.DEFAULT_IMG, flags=cv2.IMREAD_COLOR)
-            if img is not None:
-                basename: str = os.path.basename(globals.DEFAULT_IMG)
-                self.view.container(
-                    annotations_container=self.module_tab_bar.process(
-                        annotations_container=AnnotationsContainer(img=img, img_name=basename)
-                    )
-                )
+            self.img = cv2.imread(filename=globals.DEFAULT_IMG, flags=cv2.IMREAD_COLOR)
+            if self.img is not None:
+                self.basename = os.path.basename(globals.DEFAULT_IMG)
+                self.process_image()
             else:
                 self.view.setText("Failed to load image.")
         else:
             self.view.setText("No image loaded.")
 
+    def process_image(self) -> None:
+        # the snapshot is taken here, on the GUI thread
+        if self.img is not None:
+            self.request_process.emit(
+                AnnotationsContainer(img=self.img, img_name=self.basename), self.module_tab_bar.enabled
+            )
+
+    def stop_image_thread(self) -> None:
+        self.image_thread.quit()
+        self.image_thread.wait()
+
+
+class FrameResult:
+    """
+    A processed frame of the video.
+
+    Args:
+        annotations (AnnotationsContainer): The annotations of the frame.
+        frame (int): The index of the frame in the video.
+        dropped (int): The frames that were skipped before this one to keep up with the video.
+    """
+
+    def __init__(self, annotations: AnnotationsContainer, frame: int, dropped: int) -> None:
+        self.annotations: AnnotationsContainer = annotations
+        self.frame: int = frame
+        self.dropped: int = dropped
+
+
+class VideoWorker(QObject):
+    """
+    Decodes and processes the video on its own thread. While playing, the frame to
+    show is taken from a clock that runs at the fps of the video. If the processing
+    takes longer than a frame, the frames that are already over when the worker is
+    free again are skipped (latest frame wins), so the playback keeps the real speed.
+    Processed frames are taken from the cache if they are there, the prefetcher
+    fills it ahead of the shown frame. The worker never reads the widgets, the enabled
+    state of the modules comes in through set_enabled.
+
+    Args:
+        reader (IndexedVideoReader): The opened video, only used by the worker from now on.
+        module_tab_bar (ModuleTabBar): The modules the frames are processed with.
+        cache (FrameCache): The processed frames.
+        prefetcher (FramePrefetcher | None): Processes the frames ahead of the shown one.
+    """
+
+    processed = Signal(object)
+    finished = Signal()
+
+    def __init__(
+        self,
+        reader: IndexedVideoReader,
+        module_tab_bar: "ModuleTabBar",
+        cache: FrameCache,
+        prefetcher: FramePrefetcher | None = None,
+    ) -> None:
+        super().__init__()
+        self.reader: IndexedVideoReader = reader
+        self.module_tab_bar: "ModuleTabBar" = module_tab_bar
+        self.cache: FrameCache = cache
+        self.prefetcher: FramePrefetcher | None = prefetcher
+        # the enabled state of the modules, taken on the GUI thread
+        self.enabled: dict["ModulTab", bool] = module_tab_bar.enabled
+
+        self.fps: float = reader.fps
+        self.frame_count: int = reader.frame_count
+
+        # the next frame to show, the capture is only moved when a frame is not cached
+        self.next: int = 0
+
+        # the playback clock: clock_frame is shown at clock_start
+        self.playing: bool = False
+        self.clock_start: float = 0.0
+        self.clock_frame: int = 0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.tick)
+
+    @Slot(object)
+    def set_enabled(self, enabled: dict["ModulTab", bool]) -> None:
+        self.enabled = enabled
+
+    @Slot(int)
+    def seek(self, frame: int) -> None:
+        """
+        Show the given frame, playing continues from there.
+        """
+
+        frame = max(0, min(frame, self.frame_count - 1)) if self.frame_count > 0 else max(0, frame)
+        # the prefetcher follows the direction of the skips
+        if self.prefetcher is not None and not self.playing and frame != self.next - 1:
+            self.prefetcher.move(frame=frame, direction=1 if frame > self.next - 1 else -1)
+
+        self.next = frame
+        self.show_next(dropped=0)
+        if self.playing:
+            # restart the clock, the next frame is due one frame after the shown one
+            self.clock_start = time.perf_counter() + 1 / self.fps
+            self.clock_frame = self.next
+            self.tick()
+
+    @Slot()
+    def play(self) -> None:
+        self.playing = True
+        self.clock_start = time.perf_counter()
+        self.clock_frame = self.next
+        if self.prefetcher is not None:
+            self.prefetcher.move(frame=self.next, direction=1)
+        self.tick()
+
+    @Slot()
+    def pause(self) -> None:
+        self.playing = False
+        self.timer.stop()
+
+    def tick(self) -> None:
+        if not self.playing:
+            return
+
+        # the frame the clock is at
+        target: int = self.clock_frame + math.floor((time.perf_counter() - self.clock_start) * self.fps)
+        if self.frame_count > 0 and target >= self.frame_count:
+            self.pause()
+            self.finished.emit()
+            return
+
+        if target >= self.next:
+            dropped: int = target - self.next
+            self.next = target
+            if not self.show_next(dropped=dropped):
+                self.pause()
+                self.finished.emit()
+                return
+
+        # wait until the clock reaches the next frame
+        next_time: float = self.clock_start + (self.next - self.clock_frame) / self.fps
+        self.timer.start(max(0, int((next_time - time.perf_counter()) * 1000)))
+
+    def show_next(self, dropped: int) -> bool:
+        """
+        Hand over the next frame, from the cache or processed now.
+        """
+
+        frame: int = self.next
+        annotations: AnnotationsContainer | None = self.cache.get(frame=frame)
+        if annotations is None:
+            generation: int = self.cache.generation
+            processed: tuple[int, AnnotationsContainer] | None = self.process(frame=frame)
+            if processed is None:
+                return False
+            frame, annotations = processed
+            self.cache.put(frame=frame, annotations=annotations, generation=generation)
+
+        self.next = frame + 1
+        if self.prefetcher is not None:
+            self.prefetcher.move(frame=frame)
+        self.processed.emit(FrameResult(annotations=annotations, frame=frame, dropped=dropped))
+        return True
+
+    def process(self, frame: int) -> tuple[int, AnnotationsContainer] | None:
+        """
+        Read and process the frame with the given index.
+
+        Returns:
+            tuple[int, AnnotationsContainer] | None: The index of the read frame and its annotations.
+        """
+
+        # the frames in between are decoded from the keyframe before, but not converted or processed
+        read: tuple[int, MatLike] | None = self.reader.read(frame=frame)
+        if read is None:
+            return None
+
+        # the precalculated results are stored under the key of the frame
+        frame, img = read
+        return frame, self.module_tab_bar.process(
+            annotations_container=AnnotationsContainer(img=img, img_name=IndexedVideoReader.key(frame=frame)),
+            enabled=self.enabled,
+        )
+
 
 class VideoViewerTab(QWidget):
+    request_seek = Signal(int)
+    request_play = Signal()
+    request_pause = Signal()
+
     def __init__(self, module_tab_bar: "ModuleTabBar", parent: QWidget | None = None) -> None:
         super().__init__(parent)
 
         self.view = View(self)
         self.module_tab_bar: "ModuleTabBar" = module_tab_bar
 
-        # ----------------- LOAD VIDEO ----------------------
-        # load the given global video path
-        if globals.DEFAULT_VIDEO:
-            self.cap = cv2.VideoCapture(globals.DEFAULT_VIDEO)
-            if self.cap.isOpened():
-                self.next_frame()
-            else:
-                raise ValueError("Failed to load video.")
-        else:
-            self.view.setText("No video loaded.")
+        self.frame: int = 0
+        self.dropped: int = 0
+        # arrival of the last processed frames, for the effective fps
+        self.arrivals: deque[float] = deque(maxlen=30)
+
+        # the processed frames, filled by the video worker and the prefetcher
+        self.cache = FrameCache(max_bytes=globals.FRAME_CACHE_MB * 1024 * 1024)
+        self.prefetcher: FramePrefetcher | None = None
 
         # ------------------- LAYOUT ------------------------
         layout = QVBoxLayout()
@@ -129,6 +462,7 @@ class VideoViewerTab(QWidget):
         self.slider = QSlider(Qt.Orientation.Horizontal)
         self.slider.setRange(0, 100)
         self.slider.setValue(0)
+        self.slider.sliderReleased.connect(self.seek_slider)
         layout.addWidget(self.slider, 0)
 
         # ---------------- BUTTON LAYOUT --------------------
@@ -152,34 +486,126 @@ class VideoViewerTab(QWidget):
             btn.clicked.connect(partial(self.skip, skip))
             controlls.addWidget(btn)
 
+        # video and processing fps
+        self.fps_label = QLabel()
+        controlls.addWidget(self.fps_label)
+
+        # hit rate and memory of the cache
+        self.cache_label = QLabel()
+        controlls.addWidget(self.cache_label)
+
         # center the row
         controlls.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         layout.addLayout(controlls, 0)
         self.setLayout(layout)
 
-    def next_frame(self) -> None:
-        frame_num = str(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
-        ret, self.frame = self.cap.read()
-        if ret:
-            self.view.container(
-                annotations_container=self.module_tab_bar.process(
-                    annotations_container=AnnotationsContainer(img=self.frame, img_name=frame_num)
+        # ----------------- LOAD VIDEO ----------------------
+        # load the given global video path
+        self.worker: VideoWorker | None = None
+        if globals.DEFAULT_VIDEO:
+            # the keyframe index is built on the first load of the video
+            reader = IndexedVideoReader(video_path=globals.DEFAULT_VIDEO)
+
+            if globals.PREFETCH_FRAMES > 0:
+                self.prefetcher = FramePrefetcher(
+                    video_path=globals.DEFAULT_VIDEO,
+                    index=reader.index,
+                    module_tab_bar=module_tab_bar,
+                    cache=self.cache,
+                    ahead=globals.PREFETCH_FRAMES,
+                    frame_count=reader.frame_count,
                 )
+                self.prefetcher.start()
+
+            # decoding and processing happen on the video thread
+            self.video_thread = QThread(self)
+            self.worker = VideoWorker(
+                reader=reader, module_tab_bar=module_tab_bar, cache=self.cache, prefetcher=self.prefetcher
             )
+            self.worker.moveToThread(self.video_thread)
+            self.request_seek.connect(self.worker.seek)
+            self.request_play.connect(self.worker.play)
+            self.request_pause.connect(self.worker.pause)
+            # queued, the worker gets the new state before the request to process the frame again
+            self.module_tab_bar.enabled_changed.connect(self.worker.set_enabled)
+            self.worker.processed.connect(self.show_frame)
+            self.worker.finished.connect(self.finished)
+            self.video_thread.start()
+
+            app: QCoreApplication | None = QCoreApplication.instance()
+            if app is not None:
+                app.aboutToQuit.connect(self.stop_video_thread)
+
+            self.slider.setRange(0, max(0, self.worker.frame_count - 1))
+            self.update_fps_label()
+            self.request_seek.emit(0)
+
+            # process the shown frame again when a module is enabled or disabled
+            self.module_tab_bar.changed.connect(self.reprocess)
+        else:
+            self.view.setText("No video loaded.")
+
+    @Slot(object)
+    def show_frame(self, result: FrameResult) -> None:
+        self.frame = result.frame
+        self.dropped += result.dropped
+        self.arrivals.append(time.perf_counter())
+
+        self.view.container(annotations_container=result.annotations)
+        if not self.slider.isSliderDown():
+            self.slider.setValue(result.frame)
+        self.update_fps_label()
+
+    def update_fps_label(self) -> None:
+        if self.worker is None:
+            return
+
+        processing: float = 0.0
+        if len(self.arrivals) > 1 and self.arrivals[-1] > self.arrivals[0]:
+            processing = (len(self.arrivals) - 1) / (self.arrivals[-1] - self.arrivals[0])
+        self.fps_label.setText(
+            f"Video: {self.worker.fps:.1f} fps | Processing: {processing:.1f} fps | Dropped: {self.dropped}"
+        )
+        self.cache_label.setText(
+            f"Cache: {self.cache.hit_rate() * 100:.0f}% hits | {len(self.cache)} frames | "
+            f"{self.cache.bytes / 1024 / 1024:.0f}/{self.cache.max_bytes / 1024 / 1024:.0f} MB"
+        )
 
     def play(self) -> None:
+        if self.worker is None:
+            return
+
         if self.play_btn.text() == "Play":
             self.play_btn.setText("Pause")
-            self.timer: int = self.startTimer(30)  # 30 ms for ~33 FPS
+            self.arrivals.clear()
+            self.request_play.emit()
         else:
             self.play_btn.setText("Play")
-            self.killTimer(self.timer)
+            self.request_pause.emit()
+
+    @Slot()
+    def finished(self) -> None:
+        self.play_btn.setText("Play")
 
     def skip(self, delta: int) -> None:
-        self.cap.set(propId=cv2.CAP_PROP_POS_FRAMES, value=self.slider.value() + delta)
-        self.next_frame()
+        self.request_seek.emit(self.frame + delta)
+
+    def reprocess(self) -> None:
+        # the cached frames were processed with the old modules
+        self.cache.clear()
+        if self.prefetcher is not None:
+            self.prefetcher.wake()
+        # while playing the next frame already uses the new modules
+        if self.play_btn.text() == "Play":
+            self.request_seek.emit(self.frame)
+
+    def seek_slider(self) -> None:
+        self.request_seek.emit(self.slider.value())
 
-    def timerEvent(self, event: QTimerEvent) -> None:
-        event.accept()
-        self.next_frame()
+    def stop_video_thread(self) -> None:
+        self.request_pause.emit()
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+        self.video_thread.quit()
+        self.video_thread.wait()
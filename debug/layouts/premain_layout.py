@@ -48,9 +48,9 @@ class PreloadLayout(QWidget):
         # Create buttons and labels
         self.add_file_selector("Select Image", "image", "Images (*.jpg *.jpeg)", with_checkbox=True)
         self.add_file_selector("Select Video", "video", "Videos (*.mp4 *.avi)", with_checkbox=True)
-        self.add_file_selector("Select Segmentation Model", "seg_model", "PyTorch Models (*.pt)")
-        self.add_file_selector("Select Detection Model", "det_model", "PyTorch Models (*.pt)")
-        self.add_file_selector("Select Classification Model", "cls_model", "PyTorch Models (*.pt)")
+        self.add_file_selector("Select Segmentation Model", "seg_model", "Models (*.pt *.onnx)")
+        self.add_file_selector("Select Detection Model", "det_model", "Models (*.pt *.onnx)")
+        self.add_file_selector("Select Classification Model", "cls_model", "Models (*.pt *.onnx)")
         self.add_file_selector("Select Segmentation Result", "seg_result", "Pickle Files (*.pkl)", with_checkbox=True)
         self.add_file_selector("Select Detection Result", "det_result", "Pickle Files (*.pkl)", with_checkbox=True)
         self.add_file_selector("Select Classification Result", "cls_result", "Pickle Files (*.pkl)", with_checkbox=True)
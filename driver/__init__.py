@@ -1,5 +1,42 @@
-from .capture import VideoCaptureHandler
-from .controller import Controller
-from .recorder import Recorder
+from .annotation_log import AnnotationLog, AnnotationLogReader
+from .capture import (
+    CaptureBackend,
+    Frame,
+    ScreenCaptureBackend,
+    SyntheticBackend,
+    VideoCaptureHandler,
+    VideoFileBackend,
+    create_capture_backend,
+)
+from .controller import ControlCommand, Controller, ControlSnapshot, OutputSink, VirtualInputSink, create_output_sink
+from .latency import LatencyCompensator, LatencyEstimator
+from .recorder import Recorder, annotations_to_dict
+from .runtime import Runtime, run_single
+from .wire import PerceptionResult, pack_annotations, unpack_annotations
 
-__all__ = ["VideoCaptureHandler", "Controller", "Recorder"]
+__all__ = [
+    "VideoCaptureHandler",
+    "CaptureBackend",
+    "ScreenCaptureBackend",
+    "VideoFileBackend",
+    "SyntheticBackend",
+    "Frame",
+    "create_capture_backend",
+    "Controller",
+    "ControlCommand",
+    "ControlSnapshot",
+    "OutputSink",
+    "VirtualInputSink",
+    "create_output_sink",
+    "LatencyEstimator",
+    "LatencyCompensator",
+    "Recorder",
+    "annotations_to_dict",
+    "AnnotationLog",
+    "AnnotationLogReader",
+    "Runtime",
+    "PerceptionResult",
+    "pack_annotations",
+    "unpack_annotations",
+    "run_single",
+]
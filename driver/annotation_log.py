@@ -0,0 +1,357 @@
+#
+# The AnnotationLog keeps what the pipeline saw and decided over a drive: an append-only data file of the encoded
+# annotations (wire format) and an index file of fixed-size records. The index holds the values queries filter on
+# (speed, direction, the kinds of road objects), so a scan over a drive is a NumPy operation on the memory-mapped
+# index and only the selected frames are decoded. Frames are written in chunks, data first, then the index, so a
+# crash loses at most the unfinished chunk.
+#
+
+import mmap
+import os
+import threading
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from aetd_modules import AnnotationsContainer
+from configs import globals
+
+from .wire import ALIGNMENT, PerceptionResult, pack_annotations, unpack_annotations
+
+INDEX_MAGIC: bytes = b"AETDLOG\0"
+INDEX_VERSION: int = 1
+# magic, version, record size
+INDEX_HEADER_SIZE: int = 16
+
+# one record per frame
+RECORD = np.dtype(
+    [
+        ("frame_id", "<i8"),
+        ("timestamp", "<f8"),
+        ("offset", "<u8"),
+        ("size", "<u4"),
+        ("speed", "<i2"),
+        ("direction", "i1"),
+        # bit i is set if there is a road object of kind i (0: Sign, 1: Traffic-Light, 2: Vehicle)
+        ("kinds", "u1"),
+        ("objects", "<u2"),
+        ("segments", "<u2"),
+        ("paths", "<u2"),
+        ("reserved", "V2"),
+    ]
+)
+
+# the values of the index for a missing speed or direction
+NO_SPEED: int = -1
+NO_DIRECTION: int = -128
+
+
+def log_files(path: str) -> tuple[str, str]:
+    """
+    Return the index and the data file of the log in the folder.
+    """
+
+    return os.path.join(path, "annotations.index"), os.path.join(path, "annotations.data")
+
+
+def index_header() -> bytes:
+    return INDEX_MAGIC + INDEX_VERSION.to_bytes(4, "little") + RECORD.itemsize.to_bytes(4, "little")
+
+
+def read_header(index_file: str) -> None:
+    """
+    Check the header of the index file.
+    """
+
+    with open(index_file, "rb") as f:
+        header: bytes = f.read(INDEX_HEADER_SIZE)
+    if len(header) < INDEX_HEADER_SIZE or header[:8] != INDEX_MAGIC:
+        raise ValueError(f"Not an annotation log index: {index_file}")
+    version: int = int.from_bytes(header[8:12], "little")
+    record_size: int = int.from_bytes(header[12:16], "little")
+    if version != INDEX_VERSION or record_size != RECORD.itemsize:
+        raise ValueError(f"Unsupported annotation log version {version} with records of {record_size} bytes")
+
+
+def valid_records(index_file: str, data_file: str) -> tuple[int, int]:
+    """
+    Return the number of complete records and the end of their data. Everything behind
+    them is the rest of a chunk that was not finished.
+    """
+
+    records: int = max(0, os.path.getsize(index_file) - INDEX_HEADER_SIZE) // RECORD.itemsize
+    data_size: int = os.path.getsize(data_file) if os.path.exists(data_file) else 0
+
+    if records == 0:
+        return 0, 0
+
+    index: NDArray = np.memmap(index_file, dtype=RECORD, mode="r", offset=INDEX_HEADER_SIZE, shape=(records,))
+    ends: NDArray[np.uint64] = index["offset"] + index["size"]
+    # the data is written before the index, the check only fails for a damaged log
+    complete: int = int(np.count_nonzero(ends <= data_size))
+    end: int = int(ends[complete - 1]) if complete > 0 else 0
+    del index
+    return complete, end
+
+
+def index_record(annotations: AnnotationsContainer, frame_id: int, timestamp: float, offset: int, size: int) -> tuple:
+    """
+    Return the index record of the annotations.
+    """
+
+    kinds: int = 0
+    objects: int = 0
+    if annotations.road_objects is not None:
+        objects = len(annotations.road_objects)
+        for kind in np.unique(annotations.road_objects.kind).tolist():
+            kinds |= 1 << kind
+
+    return (
+        frame_id,
+        timestamp,
+        offset,
+        size,
+        NO_SPEED if annotations.speed is None else int(annotations.speed),
+        NO_DIRECTION if annotations.direction is None else int(annotations.direction),
+        kinds,
+        objects,
+        0 if annotations.road_segments is None else len(annotations.road_segments),
+        0 if annotations.paths is None else len(annotations.paths),
+        b"",
+    )
+
+
+class AnnotationLog:
+    """
+    Appends the annotations of every frame to the log. append only encodes the
+    annotations and queues them, a full chunk is written on a background thread.
+    An existing log is continued, the rest of an unfinished chunk is cut off first.
+
+    Args:
+        path (str): The folder of the log, empty uses the config.
+        chunk_frames (int): The number of frames written at once, 0 uses the config.
+    """
+
+    def __init__(self, path: str = "", chunk_frames: int = 0) -> None:
+        self.path: str = path or globals.ANNOTATION_LOG_DIR
+        self.chunk_frames: int = chunk_frames or globals.ANNOTATION_LOG_CHUNK_FRAMES
+        self.index_file, self.data_file = log_files(path=self.path)
+
+        # the chunk that is filled by append
+        self.records: list[tuple] = []
+        self.blobs: list[bytes] = []
+        # the chunks waiting for the writer
+        self.chunks: list[tuple[list[tuple], list[bytes]]] = []
+        self.condition = threading.Condition()
+
+        self.thread: threading.Thread | None = None
+        self.running: bool = False
+
+        # the offset of the next frame in the data file
+        self.end: int = 0
+
+        # counters
+        self.appended: int = 0
+        self.written: int = 0
+
+    def start(self) -> None:
+        """
+        Open the log and start the writer thread.
+        """
+
+        os.makedirs(self.path, exist_ok=True)
+        if not os.path.exists(self.index_file) or os.path.getsize(self.index_file) < INDEX_HEADER_SIZE:
+            with open(self.index_file, "wb") as f:
+                f.write(index_header())
+            open(self.data_file, "wb").close()
+        read_header(index_file=self.index_file)
+
+        # continue behind the last complete chunk
+        records, self.end = valid_records(index_file=self.index_file, data_file=self.data_file)
+        os.truncate(self.index_file, INDEX_HEADER_SIZE + records * RECORD.itemsize)
+        os.truncate(self.data_file, self.end)
+
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="annotation-log", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Write the unfinished chunk, then stop the writer thread.
+        """
+
+        with self.condition:
+            if self.records:
+                self.chunks.append((self.records, self.blobs))
+                self.records, self.blobs = [], []
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def append(
+        self, annotations: AnnotationsContainer, frame_id: int, timestamp: float, data: bytes | None = None
+    ) -> None:
+        """
+        Queue the annotations of a frame.
+
+        Args:
+            annotations (AnnotationsContainer): The annotations of the frame.
+            frame_id (int): The running number of the frame.
+            timestamp (float): The capture time of the frame.
+            data (bytes | None): The annotations already encoded with pack_annotations, they are encoded if None.
+        """
+
+        if data is None:
+            data = pack_annotations(annotations=annotations, frame_id=frame_id, timestamp=timestamp)
+
+        with self.condition:
+            if not self.running:
+                return
+
+            # every frame starts aligned, so its arrays can be used in place of the mapped file
+            padding: int = -len(data) % ALIGNMENT
+            self.records.append(
+                index_record(
+                    annotations=annotations, frame_id=frame_id, timestamp=timestamp, offset=self.end, size=len(data)
+                )
+            )
+            self.blobs.append(data + bytes(padding) if padding else data)
+            self.end += len(data) + padding
+            self.appended += 1
+
+            if len(self.records) >= self.chunk_frames:
+                self.chunks.append((self.records, self.blobs))
+                self.records, self.blobs = [], []
+                self.condition.notify()
+
+    def run(self) -> None:
+        """
+        The writer loop.
+        """
+
+        with open(self.data_file, "ab") as data, open(self.index_file, "ab") as index:
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: bool(self.chunks) or not self.running)
+                    if not self.chunks:
+                        return
+                    records, blobs = self.chunks.pop(0)
+
+                try:
+                    self.write(data=data, index=index, records=records, blobs=blobs)
+                except Exception as e:
+                    print(f"Error: could not write {len(records)} frames to the annotation log: {e}")
+
+    def write(self, data: Any, index: Any, records: list[tuple], blobs: list[bytes]) -> None:
+        """
+        Write one chunk. The index is only written after the data is on disk, so a
+        record never points to data that is missing after a crash.
+        """
+
+        data.write(b"".join(blobs))
+        data.flush()
+        os.fsync(data.fileno())
+
+        index.write(np.array(records, dtype=RECORD).tobytes())
+        index.flush()
+        os.fsync(index.fileno())
+
+        self.written += len(records)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the counters of the log.
+        """
+
+        return {
+            "annotation_log_appended": self.appended,
+            "annotation_log_written": self.written,
+            "annotation_log_pending": self.appended - self.written,
+        }
+
+
+class AnnotationLogReader:
+    """
+    Reads an annotation log through memory maps. A frame is decoded from its position
+    in constant time, its arrays are views of the mapped data file. The index is a
+    structured array, so queries are NumPy expressions on its fields:
+
+        log = AnnotationLogReader(path="recordings/annotation_log")
+        fast = (log.index["speed"] > 80) & log.has_kind(kind=TrafficLight.KIND)
+        for result in log.scan(selection=fast):
+            ...
+
+    Args:
+        path (str): The folder of the log.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.index_file, self.data_file = log_files(path=path)
+        read_header(index_file=self.index_file)
+
+        # only the complete chunks, a writer could be appending right now
+        records, end = valid_records(index_file=self.index_file, data_file=self.data_file)
+        self.index: NDArray = (
+            np.memmap(self.index_file, dtype=RECORD, mode="r", offset=INDEX_HEADER_SIZE, shape=(records,))
+            if records > 0
+            else np.zeros(0, dtype=RECORD)
+        )
+
+        self.file = open(self.data_file, "rb")
+        self.data: mmap.mmap | None = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if end > 0 else None
+
+    def close(self) -> None:
+        self.index = np.zeros(0, dtype=RECORD)
+        if self.data is not None:
+            try:
+                self.data.close()
+            except BufferError:
+                # decoded frames still use the mapping, it is unmapped when they are gone
+                pass
+            self.data = None
+        self.file.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, position: int) -> PerceptionResult:
+        """
+        Decode the frame at the position, its arrays are views of the mapped data file.
+        """
+
+        record: Any = self.index[position]
+        assert self.data is not None
+        start: int = int(record["offset"])
+        return unpack_annotations(data=memoryview(self.data)[start : start + int(record["size"])])
+
+    def position(self, frame_id: int) -> int | None:
+        """
+        Return the position of the last frame with the frame ID.
+        """
+
+        positions: NDArray[np.intp] = np.flatnonzero(self.index["frame_id"] == frame_id)
+        return int(positions[-1]) if positions.size > 0 else None
+
+    def has_kind(self, kind: int) -> NDArray[np.bool_]:
+        """
+        Return for every frame if it has a road object of the kind.
+        """
+
+        return (self.index["kinds"] & (1 << kind)) != 0
+
+    def scan(self, selection: NDArray[np.bool_] | NDArray[np.intp] | slice = slice(None)) -> Iterator[PerceptionResult]:
+        """
+        Decode the selected frames in the order of the log.
+
+        Args:
+            selection (NDArray[np.bool_] | NDArray[np.intp] | slice): A mask, positions or a range of the frames.
+        """
+
+        positions: NDArray[np.intp] = np.arange(len(self.index))[selection]
+        for position in positions.tolist():
+            yield self[position]
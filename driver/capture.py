@@ -1,3 +1,590 @@
-class VideoCaptureHandler:
-    def __init__(self):
+#
+# The capture subsystem grabs the frames of the game (or a video) on its own thread and writes them
+# into a preallocated ring buffer. Consumers always get the newest frame, old frames are dropped.
+#
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+from configs import globals
+
+
+class CaptureBackend(ABC):
+    """
+    Base class for the frame sources of the VideoCaptureHandler.
+
+    A backend writes every frame straight into the buffer slot it gets, so
+    there is no allocation per frame. The backend also paces itself, grab
+    blocks until the next frame is due.
+    """
+
+    @abstractmethod
+    def open(self) -> tuple[int, int]:
+        """
+        Open the source.
+
+        Returns:
+            tuple[int, int]: The (h, w) of the frames.
+        """
+        pass
+
+    @abstractmethod
+    def grab(self, dst: NDArray[np.uint8]) -> bool:
+        """
+        Write the next frame into dst (h, w, 3) in BGR.
+
+        Returns:
+            bool: False if the source has no more frames.
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        Release the source.
+        """
         pass
+
+
+class ScreenCaptureBackend(CaptureBackend):
+    """
+    Grabs the screen (X11) with mss.
+
+    Args:
+        monitor (int): The monitor to grab, 1 is the primary monitor.
+        region (tuple[int, int, int, int]): (left, top, width, height) relative to the monitor, a width or height of 0 grabs the full monitor.
+        max_fps (float): Upper limit of the grab rate, 0 grabs as fast as possible.
+    """
+
+    def __init__(self, monitor: int = 1, region: tuple[int, int, int, int] = (0, 0, 0, 0), max_fps: float = 0) -> None:
+        self.monitor: int = monitor
+        self.region: tuple[int, int, int, int] = region
+        self.max_fps: float = max_fps
+
+        self.sct = None
+        self.area: dict[str, int] = {}
+        self.next_time: float = 0.0
+
+    def open(self) -> tuple[int, int]:
+        import mss  # pyright: ignore[reportMissingTypeStubs]
+
+        self.sct = mss.mss()
+        monitor: dict[str, int] = self.sct.monitors[self.monitor]  # pyright: ignore[reportUnknownMemberType]
+
+        left, top, width, height = self.region
+        self.area = {
+            "left": monitor["left"] + left,
+            "top": monitor["top"] + top,
+            "width": width if width > 0 else monitor["width"] - left,
+            "height": height if height > 0 else monitor["height"] - top,
+        }
+        self.next_time = time.perf_counter()
+
+        return self.area["height"], self.area["width"]
+
+    def grab(self, dst: NDArray[np.uint8]) -> bool:
+        if self.sct is None:
+            raise ValueError("The screen capture is not opened.")
+
+        if self.max_fps > 0:
+            # don't catch up on grabs that are already late, just keep the distance
+            self.next_time = wait_until(max(self.next_time + 1 / self.max_fps, time.perf_counter()))
+
+        # mss returns BGRA, drop the alpha channel while copying into the slot
+        shot = self.sct.grab(self.area)  # pyright: ignore[reportUnknownMemberType]
+        np.copyto(dst, np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)[:, :, :3])
+
+        return True
+
+    def close(self) -> None:
+        if self.sct is not None:
+            self.sct.close()
+            self.sct = None
+
+
+class VideoFileBackend(CaptureBackend):
+    """
+    Replays a video file at its native fps. If the consumer of the frames is slower the
+    video still runs in real time, the frames that are already late are skipped without decoding.
+
+    Args:
+        video_path (str): Path to the video file.
+        loop (bool): Start over at the end of the video.
+    """
+
+    def __init__(self, video_path: str, loop: bool = False) -> None:
+        self.video_path: str = video_path
+        self.loop: bool = loop
+
+        self.cap: cv2.VideoCapture | None = None
+        self.fps: float = 0.0
+        self.start_time: float = 0.0
+        self.frame_num: int = 0
+
+    def open(self) -> tuple[int, int]:
+        self.cap = cv2.VideoCapture(self.video_path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video: {self.video_path}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.start_time = time.perf_counter()
+        self.frame_num = 0
+
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+
+    def grab(self, dst: NDArray[np.uint8]) -> bool:
+        if self.cap is None:
+            raise ValueError("The video is not opened.")
+
+        if self.read(dst=dst):
+            return True
+        # at the end the video is rewound once, if the rewound video yields no frame either it ends
+        return self.restart() and self.read(dst=dst)
+
+    def read(self, dst: NDArray[np.uint8]) -> bool:
+        """
+        Read the frame that is due into dst, wait for it if it is early.
+
+        Returns:
+            bool: False at the end of the video.
+        """
+
+        if self.cap is None:
+            raise ValueError("The video is not opened.")
+
+        # skip the frames that should have been shown already
+        due: int = int((time.perf_counter() - self.start_time) * self.fps)
+        while self.frame_num < due:
+            if not self.cap.grab():
+                return False
+            self.frame_num += 1
+
+        wait_until(self.start_time + self.frame_num / self.fps)
+
+        ret, _ = self.cap.read(dst)
+        if not ret:
+            return False
+        self.frame_num += 1
+
+        return True
+
+    def restart(self) -> bool:
+        """
+        Rewind the video if it should loop.
+
+        Returns:
+            bool: True if the video was rewound.
+        """
+
+        if not self.loop or self.cap is None:
+            return False
+
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.start_time = time.perf_counter()
+        self.frame_num = 0
+
+        return True
+
+    def close(self) -> None:
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class SyntheticBackend(CaptureBackend):
+    """
+    Generates frames at a fixed rate, useful to test the capture and everything
+    after it without a game or a video. Every frame shows a bar moving from left
+    to right and the number of the frame.
+
+    Args:
+        height (int): The height of the frames.
+        width (int): The width of the frames.
+        fps (float): The frame rate.
+    """
+
+    def __init__(self, height: int = 1080, width: int = 1920, fps: float = 60) -> None:
+        self.height: int = height
+        self.width: int = width
+        self.fps: float = fps
+
+        self.next_time: float = 0.0
+        self.frame_num: int = 0
+
+    def open(self) -> tuple[int, int]:
+        self.next_time = time.perf_counter()
+        self.frame_num = 0
+
+        return self.height, self.width
+
+    def grab(self, dst: NDArray[np.uint8]) -> bool:
+        # keep the distance between the frames like a real source would
+        self.next_time = wait_until(max(self.next_time + 1 / self.fps, time.perf_counter()))
+
+        dst.fill(40)
+        bar: int = int(self.frame_num * 8 % self.width)
+        dst[:, bar : bar + 40] = (0, 200, 255)
+        cv2.putText(dst, str(self.frame_num), (40, 80), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        self.frame_num += 1
+
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class Frame:
+    """
+    A captured frame in the ring buffer. The image is a read-only view into the
+    buffer slot, the slot is not overwritten until the frame is released.
+
+    Args:
+        img (NDArray[np.uint8]): The view of the slot.
+        frame_id (int): The running number of the frame.
+        timestamp (float): The capture time (time.perf_counter).
+        slot (int): The index of the slot.
+        ring (RingBuffer): The ring buffer holding the slot.
+    """
+
+    def __init__(self, img: NDArray[np.uint8], frame_id: int, timestamp: float, slot: int, ring: "RingBuffer") -> None:
+        self.img: NDArray[np.uint8] = img
+        self.frame_id: int = frame_id
+        self.timestamp: float = timestamp
+        self.slot: int = slot
+        self.ring: RingBuffer | None = ring
+
+    def age(self) -> float:
+        """
+        Return the time since the frame was captured in seconds.
+        """
+
+        return time.perf_counter() - self.timestamp
+
+    def release(self) -> None:
+        """
+        Give the slot back to the capture thread.
+        """
+
+        if self.ring is not None:
+            self.ring.release(slot=self.slot)
+            self.ring = None
+
+    def __enter__(self) -> "Frame":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.release()
+
+    def __str__(self) -> str:
+        return f"Frame({self.frame_id}, age={self.age() * 1000:.1f}ms)"
+
+
+class RingBuffer:
+    """
+    Preallocated frames with their capture timestamps and ids. There is one writer
+    (the capture thread) and any number of readers. The writer never touches the
+    newest frame or a slot that a reader still holds, so the readers never see a
+    half written frame. With slots >= readers + 2 the writer always finds a free slot.
+
+    Args:
+        slots (int): The number of slots.
+        shape (tuple[int, int]): The (h, w) of the frames.
+        frames (NDArray[np.uint8] | None): Storage for the frames (slots, h, w, 3), allocated if None.
+    """
+
+    def __init__(self, slots: int, shape: tuple[int, int], frames: NDArray[np.uint8] | None = None) -> None:
+        if slots < 2:
+            raise ValueError(f"The ring buffer needs at least 2 slots, got {slots}")
+
+        self.frames: NDArray[np.uint8] = (
+            frames if frames is not None else np.zeros((slots, shape[0], shape[1], 3), dtype=np.uint8)
+        )
+        self.timestamps: NDArray[np.float64] = np.zeros(slots, dtype=np.float64)
+        self.frame_ids: NDArray[np.int64] = np.full(slots, -1, dtype=np.int64)
+        self.pins: list[int] = [0] * slots
+
+        # slot of the newest frame, -1 until the first frame is written
+        self.newest: int = -1
+        self.next_id: int = 0
+        self.condition = threading.Condition()
+
+    def acquire_write(self) -> int | None:
+        """
+        Return a slot the writer can fill, None if all slots are held by readers.
+        """
+
+        with self.condition:
+            for offset in range(1, len(self.pins) + 1):
+                slot: int = (self.newest + offset) % len(self.pins)
+                if slot != self.newest and self.pins[slot] == 0:
+                    return slot
+        return None
+
+    def commit(self, slot: int, timestamp: float) -> None:
+        """
+        Publish the filled slot as the newest frame and wake up the readers.
+        """
+
+        with self.condition:
+            self.timestamps[slot] = timestamp
+            self.frame_ids[slot] = self.next_id
+            self.next_id += 1
+            self.newest = slot
+            self.condition.notify_all()
+
+    def acquire_newest(self, after: int = -1, timeout: float | None = None) -> Frame | None:
+        """
+        Hold the newest frame for reading.
+
+        Args:
+            after (int): Only return a frame with a higher id, waits for it otherwise.
+            timeout (float | None): Maximal wait in seconds, None waits forever.
+
+        Returns:
+            Frame | None: The newest frame, None if none arrived in time.
+        """
+
+        with self.condition:
+            if not self.condition.wait_for(
+                lambda: self.newest >= 0 and self.frame_ids[self.newest] > after, timeout=timeout
+            ):
+                return None
+
+            slot: int = self.newest
+            self.pins[slot] += 1
+            img: NDArray[np.uint8] = self.frames[slot].view()
+            img.flags.writeable = False
+
+            return Frame(
+                img=img,
+                frame_id=int(self.frame_ids[slot]),
+                timestamp=float(self.timestamps[slot]),
+                slot=slot,
+                ring=self,
+            )
+
+    def release(self, slot: int) -> None:
+        with self.condition:
+            self.pins[slot] -= 1
+
+
+class VideoCaptureHandler:
+    """
+    Runs a capture backend on its own thread and keeps the newest frames in a ring buffer.
+
+    Frames are never queued. A consumer that is slower than the capture only gets the
+    newest frame, everything in between is dropped and counted.
+
+    Args:
+        backend (CaptureBackend | None): The frame source, created from the config if None.
+        slots (int): The number of slots in the ring buffer, 0 uses the config.
+    """
+
+    def __init__(self, backend: CaptureBackend | None = None, slots: int = 0) -> None:
+        self.backend: CaptureBackend = backend if backend is not None else create_capture_backend()
+        self.slots: int = slots if slots > 0 else globals.CAPTURE_BUFFER_SLOTS
+
+        self.ring: RingBuffer | None = None
+        self.thread: threading.Thread | None = None
+        self.running = threading.Event()
+        self.error: Exception | None = None
+
+        # statistics
+        self.captured: int = 0
+        self.dropped: int = 0
+        self.capture_times: NDArray[np.float64] = np.zeros(64, dtype=np.float64)
+
+    def start(self, frames: NDArray[np.uint8] | None = None) -> tuple[int, int]:
+        """
+        Open the backend and start the capture thread.
+
+        Args:
+            frames (NDArray[np.uint8] | None): Storage for the ring buffer (slots, h, w, 3), e.g. in shared memory.
+
+        Returns:
+            tuple[int, int]: The (h, w) of the frames.
+        """
+
+        shape: tuple[int, int] = self.backend.open()
+        self.ring = RingBuffer(slots=self.slots, shape=shape, frames=frames)
+
+        self.running.set()
+        self.thread = threading.Thread(target=self.run, name="capture", daemon=True)
+        self.thread.start()
+
+        return shape
+
+    def stop(self) -> None:
+        """
+        Stop the capture thread and release the backend.
+        """
+
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.backend.close()
+
+        # wake up readers waiting for a new frame
+        if self.ring is not None:
+            with self.ring.condition:
+                self.ring.condition.notify_all()
+
+    def run(self) -> None:
+        """
+        The capture loop.
+        """
+
+        assert self.ring is not None
+
+        try:
+            while self.running.is_set():
+                slot: int | None = self.ring.acquire_write()
+                if slot is None:
+                    # all slots are held by the readers, wait for one to be released
+                    time.sleep(0.001)
+                    continue
+
+                if not self.backend.grab(dst=self.ring.frames[slot]):
+                    break
+
+                timestamp: float = time.perf_counter()
+                self.capture_times[self.captured % len(self.capture_times)] = timestamp
+                self.captured += 1
+                self.ring.commit(slot=slot, timestamp=timestamp)
+        except Exception as e:
+            print(f"Error: capture stopped: {e}")
+            self.error = e
+        finally:
+            self.running.clear()
+            with self.ring.condition:
+                self.ring.condition.notify_all()
+
+    def is_running(self) -> bool:
+        return self.running.is_set()
+
+    def latest(self, timeout: float | None = 1.0) -> Frame | None:
+        """
+        Return the newest frame. It has to be released after use (or used with "with").
+
+        Args:
+            timeout (float | None): Maximal wait for the first frame in seconds.
+
+        Returns:
+            Frame | None: The newest frame, None if there is none.
+        """
+
+        if self.ring is None:
+            return None
+        return self.ring.acquire_newest(timeout=timeout)
+
+    def __iter__(self) -> Iterator[Frame]:
+        """
+        Yield the newest frame that was not yielded before, waits for the next one otherwise.
+        The previous frame is released when the next one is requested.
+        """
+
+        if self.ring is None:
+            return
+
+        last_id: int = -1
+        frame: Frame | None = None
+        try:
+            while self.running.is_set():
+                next_frame: Frame | None = self.ring.acquire_newest(after=last_id, timeout=0.1)
+                if next_frame is None:
+                    continue
+
+                if frame is not None:
+                    frame.release()
+                if last_id >= 0:
+                    self.dropped += next_frame.frame_id - last_id - 1
+                last_id = next_frame.frame_id
+                frame = next_frame
+
+                yield frame
+        finally:
+            # also when the consumer stops iterating early
+            if frame is not None:
+                frame.release()
+
+    def fps(self) -> float:
+        """
+        Return the capture rate over the last frames.
+        """
+
+        count: int = min(self.captured, len(self.capture_times))
+        if count < 2:
+            return 0.0
+
+        newest: float = self.capture_times[(self.captured - 1) % len(self.capture_times)]
+        oldest: float = self.capture_times[(self.captured - count) % len(self.capture_times)]
+
+        return float((count - 1) / (newest - oldest)) if newest > oldest else 0.0
+
+    def frame_age(self) -> float:
+        """
+        Return the age of the newest frame in seconds.
+        """
+
+        if self.ring is None or self.ring.newest < 0:
+            return 0.0
+        return time.perf_counter() - float(self.ring.timestamps[self.ring.newest])
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the capture statistics.
+        """
+
+        return {
+            "fps": self.fps(),
+            "frame_age_ms": self.frame_age() * 1000,
+            "captured": self.captured,
+            "dropped": self.dropped,
+        }
+
+
+def wait_until(deadline: float) -> float:
+    """
+    Sleep until the deadline (time.perf_counter) and return it.
+    """
+
+    remaining: float = deadline - time.perf_counter()
+    if remaining > 0:
+        time.sleep(remaining)
+    return deadline
+
+
+def create_capture_backend(backend: str = "") -> CaptureBackend:
+    """
+    Create the capture backend with the given name from the config.
+
+    Args:
+        backend (str): The name of the backend ("screen", "video" or "synthetic"), empty uses the config.
+
+    Returns:
+        CaptureBackend: The created backend.
+    """
+
+    backend = backend or globals.CAPTURE_BACKEND
+
+    if backend == "screen":
+        return ScreenCaptureBackend(
+            monitor=globals.CAPTURE_MONITOR,
+            region=(globals.CAPTURE_LEFT, globals.CAPTURE_TOP, globals.CAPTURE_WIDTH, globals.CAPTURE_HEIGHT),
+            max_fps=globals.CAPTURE_FPS,
+        )
+    elif backend == "video":
+        return VideoFileBackend(video_path=globals.CAPTURE_VIDEO_PATH, loop=globals.CAPTURE_VIDEO_LOOP)
+    elif backend == "synthetic":
+        return SyntheticBackend(
+            height=globals.CAPTURE_HEIGHT or 1080, width=globals.CAPTURE_WIDTH or 1920, fps=globals.CAPTURE_FPS or 60
+        )
+    else:
+        raise ValueError(f"Unknown capture backend: {backend}")
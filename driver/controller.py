@@ -1,3 +1,349 @@
-class Controller:
-    def __init__(self):
+#
+# The Controller turns the newest annotations into steering and throttle commands. It runs on its own
+# thread at a fixed rate, independent of how fast the perception delivers new annotations.
+#
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+import numpy as np
+from numpy.typing import NDArray
+
+from aetd_modules import PathsBox, RoadObjectsBox, SpeedBox
+from configs import globals
+from safety import DegradedMode, SteeringProtector
+
+from .latency import LatencyCompensator, LatencyEstimator
+
+
+class ControlCommand:
+    """
+    One command for the truck.
+
+    Args:
+        steering (float): The steering in [-1, 1], negative steers left.
+        throttle (float): The throttle in [0, 1].
+        timestamp (float): The time the command was made (time.perf_counter).
+    """
+
+    def __init__(self, steering: float, throttle: float, timestamp: float) -> None:
+        self.steering: float = steering
+        self.throttle: float = throttle
+        self.timestamp: float = timestamp
+
+    def __str__(self) -> str:
+        return f"ControlCommand(steering={self.steering:.3f}, throttle={self.throttle:.3f})"
+
+
+class OutputSink(ABC):
+    """
+    Base class for the outputs the commands are sent to.
+    """
+
+    @abstractmethod
+    def send(self, command: ControlCommand) -> None:
+        pass
+
+    def close(self) -> None:
         pass
+
+
+class VirtualInputSink(OutputSink):
+    """
+    Stand-in for a real input device. Keeps the newest commands so they can be checked.
+
+    Args:
+        maxlen (int): The number of commands to keep.
+    """
+
+    def __init__(self, maxlen: int = 1000) -> None:
+        self.commands: deque[ControlCommand] = deque(maxlen=maxlen)
+
+    def send(self, command: ControlCommand) -> None:
+        self.commands.append(command)
+
+    def latest(self) -> ControlCommand | None:
+        return self.commands[-1] if self.commands else None
+
+
+class ControlSnapshot:
+    """
+    The input of the control loop from one perception update. It is never changed
+    after creation, the perception side replaces it as a whole, so the control thread
+    can read it without a lock.
+
+    Args:
+        coeffs (NDArray[np.float64] | None): The coefficients x = f(y) of the target path, None if there is none.
+        previous_coeffs (NDArray[np.float64] | None): The target path the control loop was following at the update.
+        speed (SpeedBox | None): The speed of the truck.
+        arrival (float): The time the update arrived (time.perf_counter).
+        interval (float): The time since the update before.
+        timestamp (float): The capture time of the frame the update belongs to.
+        velocity (NDArray[np.float64] | None): The change of the coefficients per second between the last two frames.
+    """
+
+    __slots__ = ("coeffs", "previous_coeffs", "speed", "arrival", "interval", "timestamp", "velocity")
+
+    def __init__(
+        self,
+        coeffs: NDArray[np.float64] | None,
+        previous_coeffs: NDArray[np.float64] | None,
+        speed: SpeedBox | None,
+        arrival: float,
+        interval: float,
+        timestamp: float,
+        velocity: NDArray[np.float64] | None = None,
+    ) -> None:
+        self.coeffs: NDArray[np.float64] | None = coeffs
+        self.previous_coeffs: NDArray[np.float64] | None = previous_coeffs
+        self.speed: SpeedBox | None = speed
+        self.arrival: float = arrival
+        self.interval: float = interval
+        self.timestamp: float = timestamp
+        self.velocity: NDArray[np.float64] | None = velocity
+
+    def target(self, now: float) -> NDArray[np.float64] | None:
+        """
+        Return the target path at the given time. The path moves linearly from the
+        previous one to the new one over one perception interval, so the steering
+        doesn't jump when an update arrives.
+        """
+
+        if self.coeffs is None or self.previous_coeffs is None or self.interval <= 0:
+            return self.coeffs
+
+        alpha: float = min(1.0, max(0.0, (now - self.arrival) / self.interval))
+        return self.previous_coeffs + alpha * (self.coeffs - self.previous_coeffs)
+
+
+class Controller:
+    """
+    Fixed-rate control loop. The perception hands its annotations over with update,
+    the loop reads the newest snapshot on every tick and sends a command to the sink.
+    The target path is moved from the capture time of its frame to the time of the tick
+    by the LatencyCompensator. The SteeringProtector limits the command when the annotations
+    get too old. The timing of the loop (jitter and missed deadlines) is recorded.
+
+    Args:
+        frame_shape (tuple[int, int]): The (h, w) of the frames the paths were found in.
+        sink (OutputSink | None): Where the commands go, a VirtualInputSink if None.
+        rate (float): The loop rate in Hz, 0 uses the config.
+        compensator (LatencyCompensator | None): Moves the path to the present, created from the config if None.
+        protector (SteeringProtector | None): Watches the age of the annotations, created from the config if None.
+    """
+
+    def __init__(
+        self,
+        frame_shape: tuple[int, int],
+        sink: OutputSink | None = None,
+        rate: float = 0,
+        compensator: LatencyCompensator | None = None,
+        protector: SteeringProtector | None = None,
+    ) -> None:
+        self.height, self.width = frame_shape
+        self.sink: OutputSink = sink if sink is not None else VirtualInputSink()
+        self.period: float = 1 / (rate if rate > 0 else globals.CONTROL_RATE_HZ)
+        self.compensator: LatencyCompensator = compensator if compensator is not None else LatencyCompensator()
+        self.protector: SteeringProtector = protector if protector is not None else SteeringProtector()
+        self.latency = LatencyEstimator()
+
+        self.snapshot: ControlSnapshot | None = None
+        self.steering: float = 0.0
+
+        self.thread: threading.Thread | None = None
+        self.running = threading.Event()
+
+        # timing of the loop
+        self.ticks: int = 0
+        self.missed: int = 0
+        self.jitter: deque[float] = deque(maxlen=1000)
+
+    def update(
+        self,
+        paths: PathsBox | None,
+        speed: SpeedBox | None,
+        timestamp: float,
+        road_objects: RoadObjectsBox | None = None,
+        timings: dict[str, float] | None = None,
+    ) -> None:
+        """
+        Hand over the newest annotations. Safe to call from any thread.
+
+        Args:
+            paths (PathsBox | None): The planned paths.
+            speed (SpeedBox | None): The speed of the truck.
+            timestamp (float): The capture time of the frame (time.perf_counter).
+            road_objects (RoadObjectsBox | None): The road objects.
+            timings (dict[str, float] | None): The runtime of each pipeline stage in seconds.
+        """
+
+        now: float = time.perf_counter()
+        previous: ControlSnapshot | None = self.snapshot
+        self.latency.add(latency=now - timestamp)
+        self.protector.observe(
+            timestamp=timestamp, has_paths=bool(paths), has_road_objects=road_objects is not None, timings=timings
+        )
+
+        # keep the old values if the perception found nothing this time
+        coeffs: NDArray[np.float64] | None = self.select_path(paths=paths)
+        velocity: NDArray[np.float64] | None = None
+        if previous is not None:
+            velocity = self.compensator.velocity(
+                coeffs=coeffs,
+                timestamp=timestamp,
+                previous_coeffs=previous.coeffs,
+                previous_timestamp=previous.timestamp,
+            )
+            if coeffs is None:
+                coeffs = previous.coeffs
+            if speed is None:
+                speed = previous.speed
+
+        self.snapshot = ControlSnapshot(
+            coeffs=coeffs,
+            previous_coeffs=None if previous is None else previous.target(now=now),
+            speed=speed,
+            arrival=now,
+            interval=0.0 if previous is None else now - previous.arrival,
+            timestamp=timestamp,
+            velocity=velocity,
+        )
+
+    def select_path(self, paths: PathsBox | None) -> NDArray[np.float64] | None:
+        """
+        Return the coefficients of the path that is closest to the center at the bottom of the frame.
+        """
+
+        if not paths:
+            return None
+
+        path = min(paths, key=lambda path: abs(path.f(self.height) - self.width / 2))
+        coeffs: NDArray[np.float64] = np.zeros(3, dtype=np.float64)
+        # always three coefficients, so the paths can be interpolated
+        coeffs[3 - len(path.f.coeffs) :] = path.f.coeffs
+
+        return coeffs
+
+    def command(self, snapshot: ControlSnapshot | None, now: float) -> ControlCommand:
+        """
+        Compute the command from the snapshot.
+        """
+
+        mode: DegradedMode = self.protector.check(now=now)
+        if snapshot is None or mode == DegradedMode.STOP_STEERING:
+            self.steering = 0.0
+            return ControlCommand(steering=0.0, throttle=0.0, timestamp=now)
+
+        # steer towards the target path at the lookahead row, with stale paths the last steering is held
+        coeffs: NDArray[np.float64] | None = snapshot.target(now=now)
+        if coeffs is not None and mode == DegradedMode.NORMAL:
+            coeffs = self.compensator.compensate(
+                coeffs=coeffs, age=now - snapshot.timestamp, speed=snapshot.speed, velocity=snapshot.velocity
+            )
+            x: float = float(np.polyval(coeffs, self.height * globals.CONTROL_LOOKAHEAD))
+            offset: float = (x - self.width / 2) / (self.width / 2)
+            self.steering = float(np.clip(globals.CONTROL_STEERING_GAIN * offset, -1.0, 1.0))
+
+        throttle: float = 0.0
+        if snapshot.speed is not None and mode < DegradedMode.EASE_THROTTLE:
+            error: float = (globals.CONTROL_TARGET_SPEED - snapshot.speed) / globals.CONTROL_TARGET_SPEED
+            throttle = float(np.clip(globals.CONTROL_THROTTLE_GAIN * error, 0.0, 1.0))
+
+        return ControlCommand(steering=self.steering, throttle=throttle, timestamp=now)
+
+    def start(self) -> None:
+        """
+        Start the control loop.
+        """
+
+        self.running.set()
+        self.thread = threading.Thread(target=self.run, name="controller", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the control loop and close the sink.
+        """
+
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.sink.close()
+
+    def run(self) -> None:
+        """
+        The control loop. Every tick has a fixed deadline, ticks that are already over
+        when the loop gets to them are skipped and counted as missed.
+        """
+
+        deadline: float = time.perf_counter()
+        while self.running.is_set():
+            now: float = time.perf_counter()
+            if now < deadline:
+                time.sleep(deadline - now)
+                now = time.perf_counter()
+
+            self.jitter.append(now - deadline)
+            self.ticks += 1
+
+            self.sink.send(command=self.command(snapshot=self.snapshot, now=now))
+
+            deadline += self.period
+            # a late tick still runs, but don't try to catch up on the ticks that are completely over
+            late: int = int((time.perf_counter() - deadline) // self.period)
+            if late > 0:
+                self.missed += late
+                deadline += late * self.period
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the timing of the control loop and the latency of the annotations.
+        """
+
+        if not self.jitter:
+            return (
+                {
+                    "control_ticks": 0,
+                    "control_missed": 0,
+                    "jitter_p50_ms": 0.0,
+                    "jitter_p95_ms": 0.0,
+                    "jitter_max_ms": 0.0,
+                }
+                | self.latency.stats()
+                | self.protector.stats()
+            )
+
+        jitter: NDArray[np.float64] = np.asarray(self.jitter) * 1000
+        return (
+            {
+                "control_ticks": self.ticks,
+                "control_missed": self.missed,
+                "jitter_p50_ms": float(np.percentile(jitter, 50)),
+                "jitter_p95_ms": float(np.percentile(jitter, 95)),
+                "jitter_max_ms": float(np.max(jitter)),
+            }
+            | self.latency.stats()
+            | self.protector.stats()
+        )
+
+
+def create_output_sink(sink: str = "") -> OutputSink:
+    """
+    Create the output sink with the given name.
+
+    Args:
+        sink (str): The name of the sink ("virtual"), empty uses the config.
+
+    Returns:
+        OutputSink: The created sink.
+    """
+
+    sink = sink or globals.CONTROL_SINK
+
+    if sink == "virtual":
+        return VirtualInputSink()
+    else:
+        raise ValueError(f"Unknown output sink: {sink}")
@@ -0,0 +1,136 @@
+#
+# The annotations are already old when they reach the control loop. The LatencyEstimator keeps track of
+# how old they are, the LatencyCompensator moves the target path forward to the present.
+#
+
+from collections import deque
+
+import numpy as np
+from numpy.typing import NDArray
+
+from configs import globals
+
+
+class LatencyEstimator:
+    """
+    Rolling estimate of the latency between the capture of a frame and the arrival of
+    its annotations.
+
+    Args:
+        window (int): The number of latencies to keep, 0 uses the config.
+    """
+
+    def __init__(self, window: int = 0) -> None:
+        self.latencies: deque[float] = deque(maxlen=window if window > 0 else globals.LATENCY_WINDOW)
+
+    def add(self, latency: float) -> None:
+        """
+        Add a measured latency in seconds.
+        """
+
+        self.latencies.append(latency)
+
+    def percentile(self, q: float) -> float:
+        """
+        Return the q-th percentile of the latencies in seconds, 0 if there are none.
+        """
+
+        if not self.latencies:
+            return 0.0
+        return float(np.percentile(np.asarray(self.latencies), q))
+
+    def mean(self) -> float:
+        """
+        Return the mean of the latencies in seconds, 0 if there are none.
+        """
+
+        if not self.latencies:
+            return 0.0
+        return float(np.mean(np.asarray(self.latencies)))
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the latency distribution in ms.
+        """
+
+        return {
+            "perception_latency_mean_ms": self.mean() * 1000,
+            "perception_latency_p50_ms": self.percentile(q=50) * 1000,
+            "perception_latency_p95_ms": self.percentile(q=95) * 1000,
+        }
+
+
+class LatencyCompensator:
+    """
+    Moves the target path from the capture time of its frame to the present.
+
+    There are two modes:
+        - shift: The truck moved forward by speed * age, the road in the image moves down
+          by that distance, so the path is shifted down by the same amount of rows.
+        - extrapolate: The coefficients keep changing at the rate they changed between
+          the last two frames.
+
+    Args:
+        mode (str): "shift", "extrapolate" or "off", empty uses the config.
+        pixels_per_meter (float): Rows per meter of travel at the lookahead row, 0 uses the config.
+        max_age (float): Paths older than this (seconds) are only moved this far, 0 uses the config.
+    """
+
+    def __init__(self, mode: str = "", pixels_per_meter: float = 0, max_age: float = 0) -> None:
+        self.mode: str = mode or globals.LATENCY_COMPENSATION
+        self.pixels_per_meter: float = pixels_per_meter or globals.LATENCY_PIXELS_PER_METER
+        self.max_age: float = max_age or globals.LATENCY_MAX_COMPENSATION
+
+        if self.mode not in ["shift", "extrapolate", "off"]:
+            raise ValueError(f"Unknown latency compensation: {self.mode}")
+
+    def velocity(
+        self,
+        coeffs: NDArray[np.float64] | None,
+        timestamp: float,
+        previous_coeffs: NDArray[np.float64] | None,
+        previous_timestamp: float,
+    ) -> NDArray[np.float64] | None:
+        """
+        Return the change of the coefficients per second between two frames.
+        """
+
+        if coeffs is None or previous_coeffs is None or timestamp <= previous_timestamp:
+            return None
+        return (coeffs - previous_coeffs) / (timestamp - previous_timestamp)
+
+    def compensate(
+        self,
+        coeffs: NDArray[np.float64],
+        age: float,
+        speed: float | None,
+        velocity: NDArray[np.float64] | None = None,
+    ) -> NDArray[np.float64]:
+        """
+        Move the path coefficients (x = f(y)) forward by age.
+
+        Args:
+            coeffs (NDArray[np.float64]): The coefficients of the path.
+            age (float): The time since the capture of the frame in seconds.
+            speed (float | None): The speed of the truck in km/h.
+            velocity (NDArray[np.float64] | None): The change of the coefficients per second.
+
+        Returns:
+            NDArray[np.float64]: The compensated coefficients.
+        """
+
+        age = min(max(age, 0.0), self.max_age)
+
+        if self.mode == "shift" and speed is not None:
+            # rows the road moved down, f'(y) = f(y - dy)
+            dy: float = speed / 3.6 * age * self.pixels_per_meter
+            shifted: NDArray[np.float64] = np.poly1d(coeffs)(np.poly1d([1.0, -dy])).coeffs
+            # poly1d drops leading zeros, keep the number of coefficients
+            compensated: NDArray[np.float64] = np.zeros_like(coeffs)
+            compensated[len(coeffs) - len(shifted) :] = shifted
+            return compensated
+
+        if self.mode == "extrapolate" and velocity is not None:
+            return coeffs + velocity * age
+
+        return coeffs
@@ -1,3 +1,309 @@
+#
+# The Recorder writes the raw and the annotated frames of a live run to disk. The caller only copies the
+# frame into a preallocated buffer, drawing and encoding happen on a background thread.
+#
+
+import json
+import os
+import threading
+from collections import deque
+from typing import Any
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+from numpy.typing import NDArray
+
+from aetd_modules import AnnotationsContainer, Compositor
+from configs import globals
+
+DROP_POLICIES: list[str] = ["drop_newest", "drop_oldest"]
+
+
+class RecordItem:
+    """
+    A frame waiting for the encoder.
+
+    Args:
+        buffer (NDArray[np.uint8]): The buffer holding the copy of the frame.
+        frame_id (int): The running number of the frame.
+        timestamp (float): The capture time of the frame.
+        annotations (AnnotationsContainer | None): The annotations of the frame.
+    """
+
+    def __init__(
+        self, buffer: NDArray[np.uint8], frame_id: int, timestamp: float, annotations: AnnotationsContainer | None
+    ) -> None:
+        self.buffer: NDArray[np.uint8] = buffer
+        self.frame_id: int = frame_id
+        self.timestamp: float = timestamp
+        self.annotations: AnnotationsContainer | None = annotations
+
+
 class Recorder:
-    def __init__(self):
-        pass
+    """
+    Records the raw frames, the annotated frames (Compositor) and the annotations as
+    JSON lines next to them. record never blocks: if the queue is full, a frame is
+    dropped according to the drop policy and counted.
+
+    Args:
+        output_dir (str): The folder for the recording, empty uses the config.
+        queue_size (int): The number of frames that can wait for the encoder, 0 uses the config.
+        drop_policy (str): "drop_newest" or "drop_oldest", empty uses the config.
+        scale (float): The scale of the recorded frames, 0 uses the config.
+        frame_stride (int): Only every n-th frame is recorded, 0 uses the config.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = "",
+        queue_size: int = 0,
+        drop_policy: str = "",
+        scale: float = 0,
+        frame_stride: int = 0,
+    ) -> None:
+        self.output_dir: str = output_dir or globals.RECORDER_OUTPUT_DIR
+        self.queue_size: int = queue_size or globals.RECORDER_QUEUE_SIZE
+        self.drop_policy: str = drop_policy or globals.RECORDER_DROP_POLICY
+        self.scale: float = scale or globals.RECORDER_SCALE
+        self.frame_stride: int = frame_stride or globals.RECORDER_FRAME_STRIDE
+        self.raw: bool = globals.RECORDER_RAW
+        self.annotated: bool = globals.RECORDER_ANNOTATED
+
+        if self.drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {self.drop_policy}")
+
+        # the buffers are allocated with the first frame
+        self.free: list[NDArray[np.uint8]] = []
+        self.frame_shape: tuple[int, int] | None = None
+        self.queue: deque[RecordItem] = deque()
+        self.condition = threading.Condition()
+
+        self.thread: threading.Thread | None = None
+        self.running: bool = False
+
+        self.writers: dict[str, cv2.VideoWriter] = {}
+        # only used by the encoder thread
+        self.compositor = Compositor()
+        self.sidecar = None
+
+        # counters
+        self.recorded: int = 0
+        self.written: int = 0
+        self.dropped: int = 0
+
+    def start(self) -> None:
+        """
+        Start the encoder thread.
+        """
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.sidecar = open(os.path.join(self.output_dir, "annotations.jsonl"), "w", encoding="utf-8")
+
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="recorder", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Encode what is still queued, then close the files.
+        """
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        for writer in self.writers.values():
+            writer.release()
+        self.writers.clear()
+        if self.sidecar is not None:
+            self.sidecar.close()
+            self.sidecar = None
+
+    def allocate(self, shape: tuple[int, int]) -> None:
+        """
+        Allocate one buffer per queue entry plus the one the encoder is working on.
+        """
+
+        self.frame_shape = shape
+        # the annotations are drawn in full resolution, only the raw frames can be scaled right away
+        height, width = shape if self.annotated else self.scaled(shape=shape)
+        self.free = [np.zeros((height, width, 3), dtype=np.uint8) for _ in range(self.queue_size + 1)]
+
+    def scaled(self, shape: tuple[int, int]) -> tuple[int, int]:
+        return max(1, round(shape[0] * self.scale)), max(1, round(shape[1] * self.scale))
+
+    def record(
+        self, frame: MatLike, frame_id: int, timestamp: float, annotations: AnnotationsContainer | None = None
+    ) -> bool:
+        """
+        Queue a frame for recording. Only copies the frame, never waits for the encoder.
+
+        Args:
+            frame (MatLike): The raw frame.
+            frame_id (int): The running number of the frame.
+            timestamp (float): The capture time of the frame.
+            annotations (AnnotationsContainer | None): The annotations of the frame.
+
+        Returns:
+            bool: True if the frame was queued.
+        """
+
+        if frame_id % self.frame_stride != 0:
+            return False
+
+        with self.condition:
+            if not self.running:
+                return False
+
+            self.recorded += 1
+            if self.frame_shape is None:
+                self.allocate(shape=(frame.shape[0], frame.shape[1]))
+
+            if not self.free:
+                # all buffers can also be in use by the encoder and other callers
+                if self.drop_policy == "drop_newest" or not self.queue:
+                    self.dropped += 1
+                    return False
+                # reuse the buffer of the oldest frame in the queue
+                self.free.append(self.queue.popleft().buffer)
+                self.dropped += 1
+
+            buffer: NDArray[np.uint8] = self.free.pop()
+
+        # copy (or scale) outside of the lock, the buffer belongs to this call now
+        if buffer.shape[:2] == frame.shape[:2]:
+            np.copyto(buffer, frame)
+        else:
+            cv2.resize(src=frame, dsize=(buffer.shape[1], buffer.shape[0]), dst=buffer, interpolation=cv2.INTER_AREA)
+
+        with self.condition:
+            self.queue.append(
+                RecordItem(buffer=buffer, frame_id=frame_id, timestamp=timestamp, annotations=annotations)
+            )
+            self.condition.notify()
+
+        return True
+
+    def run(self) -> None:
+        """
+        The encoder loop.
+        """
+
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: bool(self.queue) or not self.running)
+                if not self.queue:
+                    return
+                item: RecordItem = self.queue.popleft()
+
+            try:
+                self.encode(item=item)
+            except Exception as e:
+                print(f"Error: could not record frame {item.frame_id}: {e}")
+            finally:
+                with self.condition:
+                    self.free.append(item.buffer)
+
+    def encode(self, item: RecordItem) -> None:
+        """
+        Write one frame to the videos and its annotations to the sidecar.
+        """
+
+        assert self.frame_shape is not None
+        height, width = self.scaled(shape=self.frame_shape)
+
+        if self.annotated and item.annotations is not None:
+            annotated: MatLike = self.draw(img=item.buffer, annotations=item.annotations)
+            self.write(name="annotated", img=annotated, size=(width, height))
+
+        if self.raw:
+            self.write(name="raw", img=item.buffer, size=(width, height))
+
+        if self.sidecar is not None:
+            record: dict[str, Any] = {"frame_id": item.frame_id, "timestamp": item.timestamp}
+            if item.annotations is not None:
+                record |= annotations_to_dict(annotations=item.annotations)
+            self.sidecar.write(json.dumps(record) + "\n")
+
+        self.written += 1
+
+    def draw(self, img: MatLike, annotations: AnnotationsContainer) -> MatLike:
+        """
+        Draw the annotations on the copy of the frame. The result is the buffer of the
+        compositor, valid until the next frame is drawn.
+        """
+
+        container = AnnotationsContainer(img=img, img_name=annotations.original_img_name)
+        container.speed = annotations.speed
+        container.direction = annotations.direction
+        container.road_objects = annotations.road_objects
+        container.road_segments = annotations.road_segments
+        container.paths = annotations.paths
+        container.config = annotations.config
+
+        return self.compositor.draw(annotations=container).annotated_img
+
+    def write(self, name: str, img: MatLike, size: tuple[int, int]) -> None:
+        """
+        Write the image to the video with the given name, scaled to size (w, h).
+        """
+
+        if name not in self.writers:
+            fps: float = globals.RECORDER_FPS / self.frame_stride
+            self.writers[name] = cv2.VideoWriter(
+                os.path.join(self.output_dir, f"{name}.mp4"),
+                cv2.VideoWriter_fourcc(*globals.RECORDER_CODEC),
+                fps,
+                size,
+            )
+
+        if (img.shape[1], img.shape[0]) != size:
+            img = cv2.resize(src=img, dsize=size, interpolation=cv2.INTER_AREA)
+        self.writers[name].write(img)
+
+    def queue_depth(self) -> int:
+        return len(self.queue)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the counters of the recorder.
+        """
+
+        return {
+            "recorder_queue_depth": self.queue_depth(),
+            "recorder_recorded": self.recorded,
+            "recorder_written": self.written,
+            "recorder_dropped": self.dropped,
+        }
+
+
+def annotations_to_dict(annotations: AnnotationsContainer) -> dict[str, Any]:
+    """
+    Convert the annotations into plain JSON types.
+    """
+
+    return {
+        "speed": None if annotations.speed is None else int(annotations.speed),
+        "direction": None if annotations.direction is None else int(annotations.direction),
+        "road_objects": None
+        if annotations.road_objects is None
+        else [
+            {"type": type(obj).__name__, "coords": [int(v) for v in obj.coords], "cls": int(obj.cls)}
+            for obj in annotations.road_objects
+        ],
+        "road_segments": None
+        if annotations.road_segments is None
+        else [
+            {
+                "type": type(segment).__name__,
+                "pts": segment.pts.reshape(-1, 2).tolist(),
+                "coeffs": segment.path.f.coeffs.tolist(),
+            }
+            for segment in annotations.road_segments
+        ],
+        "paths": None if annotations.paths is None else [path.f.coeffs.tolist() for path in annotations.paths],
+    }
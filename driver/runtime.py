@@ -0,0 +1,437 @@
+#
+# The Runtime runs capture, perception and control in separate processes, so the OCR, the
+# post-processing and the control loop don't compete for the GIL. The frames stay in shared
+# memory, only the slot indices go over the queues.
+#
+
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.synchronize import Event
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from aetd_modules import AnnotationsContainer
+from configs import ConfigWatcher, current, globals
+
+from .annotation_log import AnnotationLog
+from .capture import CaptureBackend, Frame, VideoCaptureHandler, create_capture_backend
+from .controller import Controller, create_output_sink
+from .recorder import Recorder
+from .wire import PerceptionResult, pack_annotations, unpack_annotations
+
+# the owner of a frame slot, a crashed worker gives its slots back
+SLOT_FREE: int = 0
+SLOT_CAPTURE: int = 1
+SLOT_QUEUED: int = 2
+SLOT_PERCEPTION: int = 3
+
+
+def summarize(latencies: list[float], duration: float) -> dict[str, float]:
+    """
+    Return the throughput and the end-to-end latency distribution (ms).
+    """
+
+    if not latencies or duration <= 0:
+        return {"frames": 0, "fps": 0.0, "latency_p50_ms": 0.0, "latency_p95_ms": 0.0, "latency_max_ms": 0.0}
+
+    values: NDArray[np.float64] = np.asarray(latencies) * 1000
+    return {
+        "frames": len(latencies),
+        "fps": len(latencies) / duration,
+        "latency_p50_ms": float(np.percentile(values, 50)),
+        "latency_p95_ms": float(np.percentile(values, 95)),
+        "latency_max_ms": float(np.max(values)),
+    }
+
+
+def put_latest(q: "mp.Queue[Any]", item: Any) -> Any | None:
+    """
+    Put the item into a queue of size 1. An item that is still waiting is taken out
+    and returned, so the consumer always gets the newest one.
+    """
+
+    replaced: Any | None = None
+    while True:
+        try:
+            q.put_nowait(item)
+            return replaced
+        except queue.Full:
+            try:
+                replaced = q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def capture_worker(
+    shm_name: str,
+    shape: tuple[int, int, int, int],
+    owners: Any,
+    frame_queue: "mp.Queue[tuple[int, int, float]]",
+    stop_event: Event,
+    backend: str,
+    next_frame_id: Any,
+) -> None:
+    """
+    The capture process. Grabs the frames into free slots of the shared memory and
+    publishes the newest one, a frame that was not picked up in time is dropped. The
+    running number of the frames is shared, a restarted worker continues it. At the
+    end of the stream the worker returns.
+    """
+
+    shm = SharedMemory(name=shm_name)
+    frames: NDArray[np.uint8] = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    capture_backend: CaptureBackend = create_capture_backend(backend=backend)
+    capture_backend.open()
+
+    try:
+        while not stop_event.is_set():
+            free: list[int] = [slot for slot in range(len(owners)) if owners[slot] == SLOT_FREE]
+            if not free:
+                time.sleep(0.001)
+                continue
+
+            slot: int = free[0]
+            owners[slot] = SLOT_CAPTURE
+            if not capture_backend.grab(dst=frames[slot]):
+                break
+            timestamp: float = time.perf_counter()
+            frame_id: int = next_frame_id.value
+
+            owners[slot] = SLOT_QUEUED
+            replaced: tuple[int, int, float] | None = put_latest(q=frame_queue, item=(slot, frame_id, timestamp))
+            if replaced is not None:
+                owners[replaced[0]] = SLOT_FREE
+            next_frame_id.value = frame_id + 1
+    finally:
+        capture_backend.close()
+        del frames
+        shm.close()
+
+
+def perception_worker(
+    shm_name: str,
+    shape: tuple[int, int, int, int],
+    owners: Any,
+    frame_queue: "mp.Queue[tuple[int, int, float]]",
+    result_queue: "mp.Queue[bytes]",
+    stop_event: Event,
+    conf_file: str,
+) -> None:
+    """
+    The perception process. Runs the Pipeline on the newest frame and sends the
+    serialized annotations to the control process, and to the annotation log if it
+    is enabled. Changes of the .conf file are taken over between two frames.
+    """
+
+    from aetd_modules import Pipeline
+
+    shm = SharedMemory(name=shm_name)
+    frames: NDArray[np.uint8] = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    pipeline = Pipeline(config_watcher=ConfigWatcher(conf_file=conf_file) if conf_file else None)
+
+    recorder: Recorder | None = None
+    if globals.RECORDER_ENABLED:
+        recorder = Recorder()
+        recorder.start()
+
+    annotation_log: AnnotationLog | None = None
+    if globals.ANNOTATION_LOG_ENABLED:
+        annotation_log = AnnotationLog()
+        annotation_log.start()
+
+    try:
+        while not stop_event.is_set():
+            try:
+                slot, frame_id, timestamp = frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            owners[slot] = SLOT_PERCEPTION
+            annotations: AnnotationsContainer = pipeline.process(img=frames[slot], img_name=str(frame_id))
+            # the recorder copies the frame before it returns
+            if recorder is not None:
+                recorder.record(frame=frames[slot], frame_id=frame_id, timestamp=timestamp, annotations=annotations)
+            # only the boxes of the annotations are used from here on, give the slot back right away
+            owners[slot] = SLOT_FREE
+
+            data: bytes = pack_annotations(annotations, frame_id=frame_id, timestamp=timestamp)
+            # the log stores the same encoding that is sent
+            if annotation_log is not None:
+                annotation_log.append(annotations=annotations, frame_id=frame_id, timestamp=timestamp, data=data)
+            put_latest(q=result_queue, item=data)
+    finally:
+        if recorder is not None:
+            recorder.stop()
+        if annotation_log is not None:
+            annotation_log.stop()
+        del frames
+        shm.close()
+
+
+def control_worker(
+    shape: tuple[int, int, int, int],
+    result_queue: "mp.Queue[bytes]",
+    stats_queue: "mp.Queue[dict[str, float]]",
+    stop_event: Event,
+) -> None:
+    """
+    The control process. Hands the annotations to the Controller, which runs at its own
+    fixed rate, and measures the end-to-end latency (capture to arrival) and the throughput.
+    The statistics are reported every second.
+    """
+
+    controller = Controller(frame_shape=(shape[1], shape[2]), sink=create_output_sink())
+    controller.start()
+
+    latencies: list[float] = []
+    start: float = time.perf_counter()
+    last_report: float = start
+
+    try:
+        while not stop_event.is_set():
+            try:
+                data: bytes = result_queue.get(timeout=0.1)
+            except queue.Empty:
+                data = b""
+
+            if data:
+                result: PerceptionResult = unpack_annotations(data=data)
+                controller.update(
+                    paths=result.paths,
+                    speed=result.speed,
+                    timestamp=result.timestamp,
+                    road_objects=result.road_objects,
+                    timings=result.timings,
+                )
+                latencies.append(time.perf_counter() - result.timestamp)
+
+            now: float = time.perf_counter()
+            if now - last_report >= 1.0:
+                put_latest(
+                    q=stats_queue,
+                    item=summarize(latencies=latencies, duration=now - start) | controller.stats(),
+                )
+                last_report = now
+    finally:
+        controller.stop()
+
+    put_latest(
+        q=stats_queue,
+        item=summarize(latencies=latencies, duration=time.perf_counter() - start) | controller.stats(),
+    )
+
+
+def run_single(backend: str = "", duration: float = 10.0) -> dict[str, float]:
+    """
+    Run capture and perception in this process for the duration, to compare
+    against the Runtime. The capture still has its own thread.
+
+    Args:
+        backend (str): The capture backend, empty uses the config.
+        duration (float): The runtime in seconds.
+
+    Returns:
+        dict[str, float]: The statistics, the same as the Runtime reports.
+    """
+
+    from aetd_modules import Pipeline
+
+    pipeline = Pipeline()
+    handler = VideoCaptureHandler(backend=create_capture_backend(backend=backend))
+    handler.start()
+
+    latencies: list[float] = []
+    start: float = time.perf_counter()
+    try:
+        frame: Frame
+        for frame in handler:
+            pipeline.process(img=frame.img, img_name=str(frame.frame_id))
+            latencies.append(time.perf_counter() - frame.timestamp)
+            if time.perf_counter() - start >= duration:
+                break
+    finally:
+        handler.stop()
+
+    return summarize(latencies=latencies, duration=time.perf_counter() - start)
+
+
+class Runtime:
+    """
+    Starts and supervises the capture, perception and control processes. A worker
+    that crashes is restarted and the frame slots it held are given back. A worker
+    that exits cleanly ended the stream (a video that doesn't loop), the runtime stops.
+
+    Args:
+        backend (str): The capture backend, empty uses the config.
+        slots (int): The number of frame slots in the shared memory, 0 uses the config.
+        conf_file (str): The .conf file the perception watches for changes, empty uses the loaded one.
+    """
+
+    def __init__(self, backend: str = "", slots: int = 0, conf_file: str = "") -> None:
+        self.backend: str = backend or globals.CAPTURE_BACKEND
+        self.conf_file: str = conf_file or current().source
+        self.slots: int = max(3, slots if slots > 0 else globals.CAPTURE_BUFFER_SLOTS)
+
+        # the models don't survive a fork, every worker starts a fresh interpreter
+        self.ctx = mp.get_context("spawn")
+        self.stop_event: Event = self.ctx.Event()
+        self.frame_queue: mp.Queue[tuple[int, int, float]] = self.ctx.Queue(maxsize=1)
+        self.result_queue: mp.Queue[bytes] = self.ctx.Queue(maxsize=1)
+        self.stats_queue: mp.Queue[dict[str, float]] = self.ctx.Queue(maxsize=1)
+        self.owners = self.ctx.Array("b", self.slots, lock=False)
+        # only the capture worker writes it, it survives a restart of the worker
+        self.next_frame_id = self.ctx.Value("q", 0, lock=False)
+
+        self.shm: SharedMemory | None = None
+        self.shape: tuple[int, int, int, int] = (0, 0, 0, 0)
+        self.processes: dict[str, Any] = {}
+        self.restarts: dict[str, int] = {"capture": 0, "perception": 0, "control": 0}
+        self.stats: dict[str, float] = {}
+
+    def start(self) -> None:
+        """
+        Allocate the shared memory and start the workers.
+        """
+
+        # open the source once to get the size of the frames
+        probe: CaptureBackend = create_capture_backend(backend=self.backend)
+        height, width = probe.open()
+        probe.close()
+
+        self.shape = (self.slots, height, width, 3)
+        self.shm = SharedMemory(create=True, size=int(np.prod(self.shape)))
+
+        for name in self.restarts:
+            self.spawn(name=name)
+
+    def spawn(self, name: str) -> None:
+        """
+        Start the worker with the given name.
+        """
+
+        assert self.shm is not None
+
+        if name == "capture":
+            target, args = (
+                capture_worker,
+                (
+                    self.shm.name,
+                    self.shape,
+                    self.owners,
+                    self.frame_queue,
+                    self.stop_event,
+                    self.backend,
+                    self.next_frame_id,
+                ),
+            )
+        elif name == "perception":
+            target, args = (
+                perception_worker,
+                (
+                    self.shm.name,
+                    self.shape,
+                    self.owners,
+                    self.frame_queue,
+                    self.result_queue,
+                    self.stop_event,
+                    self.conf_file,
+                ),
+            )
+        elif name == "control":
+            target, args = control_worker, (self.shape, self.result_queue, self.stats_queue, self.stop_event)
+        else:
+            raise ValueError(f"Unknown worker: {name}")
+
+        process = self.ctx.Process(target=target, args=args, name=name, daemon=True)
+        process.start()
+        self.processes[name] = process
+
+    def supervise(self) -> None:
+        """
+        Restart crashed workers and collect the newest statistics. A clean exit is the
+        end of the stream, it stops the runtime.
+        """
+
+        for name, process in self.processes.items():
+            if process.is_alive() or self.stop_event.is_set():
+                continue
+
+            if process.exitcode == 0:
+                print(f"The {name} worker finished, stopping.")
+                self.stop_event.set()
+                break
+
+            print(f"Warning: {name} worker exited with code {process.exitcode}, restarting.")
+            # give the slots of the crashed worker back
+            owned: int = SLOT_CAPTURE if name == "capture" else SLOT_PERCEPTION
+            for slot in range(self.slots):
+                if self.owners[slot] == owned:
+                    self.owners[slot] = SLOT_FREE
+
+            self.restarts[name] += 1
+            self.spawn(name=name)
+
+        try:
+            self.stats = self.stats_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def run(self, duration: float = 0) -> dict[str, float]:
+        """
+        Start the runtime and supervise it until the duration is over, the stream ends or
+        Ctrl+C is pressed.
+
+        Args:
+            duration (float): The runtime in seconds, 0 runs until interrupted.
+
+        Returns:
+            dict[str, float]: The final statistics.
+        """
+
+        self.start()
+        end: float = time.perf_counter() + duration
+        try:
+            while (duration <= 0 or time.perf_counter() < end) and not self.stop_event.is_set():
+                self.supervise()
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+        return self.stats
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stop the workers, wait for the final statistics and release the shared memory.
+        """
+
+        self.stop_event.set()
+
+        # the control worker reports once more before it exits
+        control = self.processes.get("control")
+        if control is not None:
+            control.join(timeout=timeout)
+            try:
+                self.stats = self.stats_queue.get(timeout=1.0)
+            except queue.Empty:
+                pass
+
+        for process in self.processes.values():
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.processes.clear()
+
+        for q in (self.frame_queue, self.result_queue, self.stats_queue):
+            q.cancel_join_thread()
+
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
@@ -0,0 +1,331 @@
+#
+# The wire format moves the annotations of a frame between processes, or to an external dashboard over a local
+# socket. It is a versioned binary encoding: a fixed header, a table of the arrays and the aligned array data.
+# Decoding maps the arrays onto the received buffer without copying. The images are only included on request.
+#
+
+import math
+import struct
+import time
+
+import numpy as np
+from numpy.typing import NDArray
+
+from aetd_modules import AnnotationsContainer, DirectionBox, Path, PathsBox, RoadObjectsBox, RoadSegmentsBox, SpeedBox
+
+MAGIC: bytes = b"AETD"
+WIRE_VERSION: int = 1
+
+# magic, version, flags, number of arrays, frame ID, capture time, processed time, speed, direction
+HEADER = struct.Struct("<4sHHIqddii4x")
+# field, dtype, number of dimensions, offset of the data, shape (up to three dimensions)
+ENTRY = struct.Struct("<BBB5xQ3Q")
+# the start of every array, so the arrays can be used in place
+ALIGNMENT: int = 16
+
+# what the annotations contain, the boxes can be empty but present
+HAS_SPEED: int = 1 << 0
+HAS_DIRECTION: int = 1 << 1
+HAS_OBJECTS: int = 1 << 2
+HAS_SEGMENTS: int = 1 << 3
+HAS_PATHS: int = 1 << 4
+
+# the ID of a field is its position, new fields are only ever appended
+FIELDS: tuple[str, ...] = (
+    "objects.xyxy",
+    "objects.kind",
+    "objects.cls",
+    "objects.conf",
+    "objects.track_id",
+    "segments.kind",
+    "segments.points",
+    "segments.offsets",
+    "segments.coeffs",
+    "segments.path_points",
+    "segments.path_offsets",
+    "segments.scope",
+    "segments.value_range",
+    "paths.coeffs",
+    "paths.points",
+    "paths.offsets",
+    "paths.scope",
+    "paths.value_range",
+    "timings.names",
+    "timings.values",
+    "img",
+    "annotated_img",
+)
+# the columns of a RoadSegmentsBox that are sent
+SEGMENT_COLUMNS: tuple[str, ...] = (
+    "kind",
+    "points",
+    "offsets",
+    "coeffs",
+    "path_points",
+    "path_offsets",
+    "scope",
+    "value_range",
+)
+DTYPES: tuple[np.dtype, ...] = tuple(
+    np.dtype(dtype).newbyteorder("<") for dtype in (np.uint8, np.int32, np.int64, np.float32, np.float64)
+)
+
+
+class PerceptionResult:
+    """
+    The annotations of one frame as they arrive in the control process. The arrays of
+    the boxes are read-only views of the received buffer.
+
+    Args:
+        frame_id (int): The running number of the frame.
+        timestamp (float): The capture time of the frame (time.perf_counter).
+        processed (float): The time the perception finished (time.perf_counter).
+    """
+
+    def __init__(self, frame_id: int, timestamp: float, processed: float) -> None:
+        self.frame_id: int = frame_id
+        self.timestamp: float = timestamp
+        self.processed: float = processed
+
+        self.speed: SpeedBox | None = None
+        self.direction: DirectionBox | None = None
+        self.road_objects: RoadObjectsBox | None = None
+        self.road_segments: RoadSegmentsBox | None = None
+        self.paths: PathsBox | None = None
+
+        self.timings: dict[str, float] = {}
+
+        # only set if the images were requested
+        self.img: NDArray[np.uint8] | None = None
+        self.annotated_img: NDArray[np.uint8] | None = None
+
+    def __str__(self) -> str:
+        return (
+            f"PerceptionResult({self.frame_id}):\n"
+            f"  Speed: {self.speed}\n"
+            f"  Direction: {self.direction}\n"
+            f"  Road Objects: {self.road_objects}\n"
+            f"  Road Segments: {self.road_segments}\n"
+            f"  Paths: {self.paths}"
+        )
+
+
+def paths_to_columns(paths: PathsBox) -> dict[str, NDArray]:
+    """
+    Return the paths as columns, like the paths of a RoadSegmentsBox.
+    """
+
+    coeffs: NDArray[np.float64] = np.zeros((len(paths), 3), dtype=np.float64)
+    for i, path in enumerate(paths):
+        coeffs[i, 3 - len(path.f.coeffs) :] = path.f.coeffs
+
+    lengths: list[int] = [len(path.approx_pts) for path in paths]
+    offsets: NDArray[np.int64] = np.zeros(len(paths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    return {
+        "paths.coeffs": coeffs,
+        "paths.points": np.concatenate([path.approx_pts for path in paths]).astype(np.int32, copy=False)
+        if paths
+        else np.zeros((0, 2), dtype=np.int32),
+        "paths.offsets": offsets,
+        "paths.scope": np.array([path.scope_definition for path in paths], dtype=np.float64).reshape(-1, 2),
+        "paths.value_range": np.array([path.value_range for path in paths], dtype=np.int32).reshape(-1, 2),
+    }
+
+
+def paths_from_columns(arrays: dict[str, NDArray]) -> PathsBox:
+    """
+    Return the paths of the columns, the points of every path are a view of the columns.
+    """
+
+    paths = PathsBox()
+    coeffs: NDArray[np.float64] = arrays["paths.coeffs"]
+    points: NDArray[np.int32] = arrays["paths.points"]
+    offsets: NDArray[np.int64] = arrays["paths.offsets"]
+    scope: NDArray[np.float64] = arrays["paths.scope"]
+    value_range: NDArray[np.int32] = arrays["paths.value_range"]
+    for i in range(len(coeffs)):
+        paths.add(
+            Path(
+                f=np.poly1d(coeffs[i]),
+                approx_pts=points[offsets[i] : offsets[i + 1]],
+                scope_definition=(scope[i, 0], scope[i, 1]),
+                value_range=(value_range[i, 0], value_range[i, 1]),
+            )
+        )
+    return paths
+
+
+def annotation_arrays(annotations: AnnotationsContainer, images: bool) -> tuple[int, dict[str, NDArray]]:
+    """
+    Return the flags and the arrays of the boxes, the timings and the images.
+    """
+
+    flags: int = 0
+    arrays: dict[str, NDArray] = {}
+
+    objects: RoadObjectsBox | None = annotations.road_objects
+    if objects is not None:
+        flags |= HAS_OBJECTS
+        for name in RoadObjectsBox.__slots__:
+            arrays[f"objects.{name}"] = getattr(objects, name)
+
+    segments: RoadSegmentsBox | None = annotations.road_segments
+    if segments is not None:
+        flags |= HAS_SEGMENTS
+        # the summary of the paths is computed again on the other side
+        for name in SEGMENT_COLUMNS:
+            arrays[f"segments.{name}"] = getattr(segments, name)
+
+    if annotations.paths is not None:
+        flags |= HAS_PATHS
+        arrays.update(paths_to_columns(paths=annotations.paths))
+
+    if annotations.timings:
+        arrays["timings.names"] = np.frombuffer("\n".join(annotations.timings).encode(), dtype=np.uint8)
+        arrays["timings.values"] = np.array(list(annotations.timings.values()), dtype=np.float64)
+
+    if images:
+        arrays["img"] = np.asarray(annotations.original_img)
+        if annotations.is_annotated():
+            arrays["annotated_img"] = np.asarray(annotations.annotated_img)
+
+    return flags, arrays
+
+
+def encode_arrays(arrays: dict[str, NDArray]) -> list[bytes | memoryview]:
+    """
+    Return the table of the arrays, followed by the data of every array at an aligned offset.
+    The data is not copied, the parts are views of the arrays.
+    """
+
+    parts: list[bytes | memoryview] = []
+    entries: list[bytes] = []
+    offset: int = HEADER.size + ENTRY.size * len(arrays)
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.ndim > 3:
+            raise ValueError(f"The array {name} has more than three dimensions: {array.shape}")
+        dtype: np.dtype = array.dtype.newbyteorder("<")
+        if dtype not in DTYPES:
+            raise ValueError(f"The array {name} has an unsupported dtype: {array.dtype}")
+
+        padding: int = -offset % ALIGNMENT
+        parts.append(bytes(padding))
+        offset += padding
+
+        shape: tuple[int, ...] = array.shape + (0,) * (3 - array.ndim)
+        entries.append(ENTRY.pack(FIELDS.index(name), DTYPES.index(dtype), array.ndim, offset, *shape))
+        parts.append(memoryview(array.astype(dtype, copy=False).reshape(-1).view(np.uint8)))
+        offset += array.nbytes
+
+    return [*entries, *parts]
+
+
+def decode_arrays(data: bytes | bytearray | memoryview, count: int) -> dict[str, NDArray]:
+    """
+    Return the arrays of the table as views of the buffer.
+    """
+
+    arrays: dict[str, NDArray] = {}
+    table: memoryview = memoryview(data)[HEADER.size : HEADER.size + count * ENTRY.size]
+    for field, dtype_id, ndim, offset, *shape in ENTRY.iter_unpack(table):
+        if field >= len(FIELDS) or dtype_id >= len(DTYPES):
+            # written by a newer version, which only appends fields
+            continue
+        dtype: np.dtype = DTYPES[dtype_id]
+        shape = shape[:ndim]
+        items: int = math.prod(shape)
+        if offset + items * dtype.itemsize > len(data):
+            raise ValueError(f"The array {FIELDS[field]} is outside of the buffer")
+        arrays[FIELDS[field]] = np.frombuffer(data, dtype=dtype, count=items, offset=offset).reshape(shape)
+    return arrays
+
+
+def pack_annotations(annotations: AnnotationsContainer, frame_id: int, timestamp: float, images: bool = False) -> bytes:
+    """
+    Encode the annotations of a frame into the wire format. The images of the
+    container are only included if requested, the control process doesn't need them.
+
+    Args:
+        annotations (AnnotationsContainer): The annotations of the frame.
+        frame_id (int): The running number of the frame.
+        timestamp (float): The capture time of the frame.
+        images (bool): Include the original and, if drawn, the annotated image.
+
+    Returns:
+        bytes: The encoded annotations.
+    """
+
+    flags, arrays = annotation_arrays(annotations=annotations, images=images)
+    if annotations.speed is not None:
+        flags |= HAS_SPEED
+    if annotations.direction is not None:
+        flags |= HAS_DIRECTION
+
+    header: bytes = HEADER.pack(
+        MAGIC,
+        WIRE_VERSION,
+        flags,
+        len(arrays),
+        frame_id,
+        timestamp,
+        time.perf_counter(),
+        0 if annotations.speed is None else int(annotations.speed),
+        0 if annotations.direction is None else int(annotations.direction),
+    )
+    # the only copy of the arrays
+    return b"".join([header, *encode_arrays(arrays=arrays)])
+
+
+def unpack_annotations(data: bytes | bytearray | memoryview) -> PerceptionResult:
+    """
+    Decode the annotations of a frame. The arrays are views of the buffer, nothing is
+    copied, the buffer must not be changed while the result is used.
+
+    Args:
+        data (bytes | bytearray | memoryview): The encoded annotations.
+
+    Returns:
+        PerceptionResult: The annotations of the frame.
+    """
+
+    if len(data) < HEADER.size:
+        raise ValueError(f"The annotations are too short: {len(data)} bytes")
+    magic, version, flags, count, frame_id, timestamp, processed, speed, direction = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"Not an annotations buffer: {magic!r}")
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported wire format version: {version}, expected {WIRE_VERSION}")
+
+    if len(data) < HEADER.size + count * ENTRY.size:
+        raise ValueError(f"The annotations are too short for {count} arrays: {len(data)} bytes")
+
+    arrays: dict[str, NDArray] = decode_arrays(data=data, count=count)
+
+    result = PerceptionResult(frame_id=frame_id, timestamp=timestamp, processed=processed)
+    result.speed = SpeedBox(speed) if flags & HAS_SPEED else None
+    result.direction = DirectionBox(direction) if flags & HAS_DIRECTION else None
+
+    if flags & HAS_OBJECTS:
+        result.road_objects = RoadObjectsBox(
+            **{name: arrays.get(f"objects.{name}") for name in RoadObjectsBox.__slots__}  # type: ignore[arg-type]
+        )
+
+    if flags & HAS_SEGMENTS:
+        result.road_segments = RoadSegmentsBox(
+            **{name: arrays.get(f"segments.{name}") for name in SEGMENT_COLUMNS}  # type: ignore[arg-type]
+        )
+
+    if flags & HAS_PATHS:
+        result.paths = paths_from_columns(arrays=arrays)
+
+    if "timings.names" in arrays:
+        names: list[str] = arrays["timings.names"].tobytes().decode().split("\n")
+        result.timings = dict(zip(names, arrays["timings.values"].tolist()))
+
+    result.img = arrays.get("img")
+    result.annotated_img = arrays.get("annotated_img")
+
+    return result
@@ -1,10 +1,15 @@
-from .loaders import ImageLoader, PreCalculatedLoader
-from .model import ClassificationModel, DetectionModel, SegmentationModel
+from .loaders import ImageLoader, IndexedVideoReader, KeyframeIndex, PreCalculatedLoader
+from .model import ClassificationModel, DetectionModel, ModelBackend, OnnxBackend, SegmentationModel, TorchBackend
 
 __all__: list[str] = [
     "SegmentationModel",
     "DetectionModel",
     "ClassificationModel",
+    "ModelBackend",
+    "TorchBackend",
+    "OnnxBackend",
     "ImageLoader",
     "PreCalculatedLoader",
+    "KeyframeIndex",
+    "IndexedVideoReader",
 ]
@@ -1,4 +1,5 @@
+from .keyframe_index import IndexedVideoReader, KeyframeIndex
 from .loader import ImageLoader
 from .precalculated_loader import PreCalculatedLoader
 
-__all__: list[str] = ["ImageLoader", "PreCalculatedLoader"]
+__all__: list[str] = ["ImageLoader", "PreCalculatedLoader", "KeyframeIndex", "IndexedVideoReader"]
@@ -0,0 +1,284 @@
+#
+# The KeyframeIndex stores the keyframes and the frame timestamps of a video in a sidecar file. The
+# IndexedVideoReader uses it to jump to the keyframe before a frame and decode only the frames after it.
+#
+
+import bisect
+import json
+import os
+
+import cv2
+from cv2.typing import MatLike
+
+
+class KeyframeIndex:
+    """
+    The keyframes and the timestamps of all frames of a video. Built once by scanning the
+    encoded packets (nothing is decoded) and stored next to the video as
+    <video>.keyframes.json. The sidecar is rebuilt if the video changed.
+
+    Args:
+        video_path (str): The video.
+        keyframes (list[int]): The indices of the keyframes, ascending.
+        timestamps (list[float]): The timestamp (ms) of every frame, in presentation order.
+        fps (float): The fps of the video.
+        size (int): The size of the video file, to detect changes.
+        mtime (float): The modification time of the video file, to detect changes.
+    """
+
+    def __init__(
+        self, video_path: str, keyframes: list[int], timestamps: list[float], fps: float, size: int, mtime: float
+    ) -> None:
+        self.video_path: str = video_path
+        self.keyframes: list[int] = keyframes
+        self.timestamps: list[float] = timestamps
+        self.fps: float = fps
+        self.size: int = size
+        self.mtime: float = mtime
+
+        # the frames can only be found by their timestamp if every frame has its own
+        self.timestamps_valid: bool = all(a < b for a, b in zip(timestamps, timestamps[1:]))
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.timestamps)
+
+    @staticmethod
+    def sidecar_path(video_path: str) -> str:
+        return f"{video_path}.keyframes.json"
+
+    @classmethod
+    def build(cls, video_path: str) -> "KeyframeIndex":
+        """
+        Scan the video for its keyframes and frame timestamps.
+
+        Args:
+            video_path (str): The video.
+
+        Returns:
+            KeyframeIndex: The index, without keyframes if the backend can't report them.
+        """
+
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {video_path}")
+
+        fps: float = cap.get(cv2.CAP_PROP_FPS)
+        keyframes: list[int] = []
+        timestamps: list[float] = []
+
+        # in raw mode grab only reads the packets, the keyframe flag is known without decoding
+        raw: bool = cap.set(cv2.CAP_PROP_FORMAT, -1)
+        if not raw:
+            print(f"Warning: no raw packets for {video_path}, the index has no keyframes.")
+
+        while cap.grab():
+            if raw and cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(len(timestamps))
+            timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+        cap.release()
+
+        # the packets come in decoding order, the frames are shown in timestamp order
+        timestamps.sort()
+
+        stat: os.stat_result = os.stat(video_path)
+        return cls(
+            video_path=video_path,
+            keyframes=keyframes,
+            timestamps=timestamps,
+            fps=fps,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+        )
+
+    @classmethod
+    def load(cls, video_path: str) -> "KeyframeIndex | None":
+        """
+        Load the sidecar of the video, None if there is none or the video changed since.
+        """
+
+        path: str = cls.sidecar_path(video_path=video_path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        stat: os.stat_result = os.stat(video_path)
+        if data.get("size") != stat.st_size or data.get("mtime") != stat.st_mtime:
+            return None
+
+        return cls(
+            video_path=video_path,
+            keyframes=data["keyframes"],
+            timestamps=data["timestamps"],
+            fps=data["fps"],
+            size=data["size"],
+            mtime=data["mtime"],
+        )
+
+    @classmethod
+    def load_or_build(cls, video_path: str) -> "KeyframeIndex":
+        """
+        Load the sidecar of the video, build and save it if there is no valid one.
+        """
+
+        index: KeyframeIndex | None = cls.load(video_path=video_path)
+        if index is None:
+            index = cls.build(video_path=video_path)
+            index.save()
+        return index
+
+    def save(self) -> None:
+        try:
+            with open(self.sidecar_path(video_path=self.video_path), "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "size": self.size,
+                        "mtime": self.mtime,
+                        "fps": self.fps,
+                        "keyframes": self.keyframes,
+                        "timestamps": self.timestamps,
+                    },
+                    f,
+                )
+        except OSError as e:
+            print(f"Warning: could not save the keyframe index of {self.video_path}: {e}")
+
+    def keyframe(self, frame: int) -> int:
+        """
+        Return the last keyframe at or before the frame.
+        """
+
+        i: int = bisect.bisect_right(self.keyframes, frame) - 1
+        return self.keyframes[i] if i >= 0 else 0
+
+    def frame_at(self, timestamp: float) -> int:
+        """
+        Return the index of the frame with the timestamp (ms) closest to the given one.
+        """
+
+        i: int = bisect.bisect_left(self.timestamps, timestamp)
+        if i >= len(self.timestamps):
+            return len(self.timestamps) - 1
+        if i > 0 and timestamp - self.timestamps[i - 1] < self.timestamps[i] - timestamp:
+            return i - 1
+        return i
+
+    def ranges(self, parts: int) -> list[tuple[int, int]]:
+        """
+        Split the frames into about equal ranges [start, stop) that start at keyframes, so
+        every range can be decoded on its own without decoding the frames before it.
+        """
+
+        starts: list[int] = [0]
+        for part in range(1, parts):
+            start: int = self.keyframe(frame=part * self.frame_count // parts)
+            if start > starts[-1]:
+                starts.append(start)
+
+        return [(start, stop) for start, stop in zip(starts, starts[1:] + [self.frame_count])]
+
+
+class IndexedVideoReader:
+    """
+    Reads the frames of a video by index. To get to a frame it jumps to the keyframe
+    before it and decodes only the frames from there on, or just decodes on if there is
+    no keyframe between the current position and the frame. The index of a read frame
+    is taken from its timestamp, so the frame and its key always belong together.
+
+    Args:
+        video_path (str): The video.
+        index (KeyframeIndex | None): The index of the video, loaded or built if None.
+    """
+
+    def __init__(self, video_path: str, index: KeyframeIndex | None = None) -> None:
+        self.index: KeyframeIndex = index if index is not None else KeyframeIndex.load_or_build(video_path=video_path)
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video: {video_path}")
+
+        fps: float = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps: float = fps if fps > 0 else 30.0
+        self.frame_count: int = self.index.frame_count or int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        # the index of the frame the next read returns
+        self.position: int = 0
+
+    @staticmethod
+    def key(frame: int) -> str:
+        """
+        Return the name of the frame in the precalculated results, its 1-based number
+        (the frame position after reading it, like run_full_video.py stores it).
+        """
+
+        return str(frame + 1)
+
+    def seek(self, frame: int) -> None:
+        """
+        Move to the frame, the next read returns it.
+        """
+
+        if frame == self.position:
+            return
+
+        keyframe: int = self.index.keyframe(frame=frame)
+        if not self.index.keyframes:
+            # without keyframes, the backend has to find the frame on its own
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+            self.position = frame
+            return
+
+        # jump only if there is a keyframe between the position and the frame
+        if frame < self.position or keyframe > self.position:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self.position = keyframe
+
+        # the frames in between are decoded, but not converted
+        while self.position < frame and self.cap.grab():
+            self.position += 1
+
+    def read(self, frame: int | None = None) -> tuple[int, MatLike] | None:
+        """
+        Read the frame with the given index, or the next frame if None.
+
+        Returns:
+            tuple[int, MatLike] | None: The index of the frame and the frame, None at the end of the video.
+        """
+
+        if frame is not None:
+            self.seek(frame=frame)
+
+        ret, img = self.cap.read()
+        if not ret:
+            return None
+
+        actual: int = self.position
+        if self.index.timestamps_valid:
+            actual = self.index.frame_at(timestamp=self.cap.get(cv2.CAP_PROP_POS_MSEC))
+            if frame is not None and actual != frame:
+                # the backend landed somewhere else, read again from the keyframe before both
+                print(f"Warning: seeking to frame {frame} returned frame {actual}, decoding from the keyframe.")
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.index.keyframe(frame=min(frame, actual)))
+                self.position = -1
+                return self.read_from_timestamps(frame=frame)
+
+        self.position = actual + 1
+        return actual, img
+
+    def read_from_timestamps(self, frame: int) -> tuple[int, MatLike] | None:
+        """
+        Decode until the frame with the index is found by its timestamp.
+        """
+
+        while True:
+            ret, img = self.cap.read()
+            if not ret:
+                return None
+            actual: int = self.index.frame_at(timestamp=self.cap.get(cv2.CAP_PROP_POS_MSEC))
+            if actual >= frame:
+                self.position = actual + 1
+                return actual, img
+
+    def release(self) -> None:
+        self.cap.release()
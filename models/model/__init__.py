@@ -1,9 +1,23 @@
+from .backends import ModelBackend, OnnxBackend, TorchBackend, create_backend
 from .classification_model import ClassificationModel
 from .detection_model import DetectionModel
+from .evaluation import THRESHOLDS, box_iou, path_deviation
+from .input_buffer import InputBuffer
+from .quantization import quantize_model, quantized_model_path
 from .segmentation_model import SegmentationModel
 
 __all__: list[str] = [
     "ClassificationModel",
     "DetectionModel",
     "SegmentationModel",
+    "ModelBackend",
+    "TorchBackend",
+    "OnnxBackend",
+    "create_backend",
+    "THRESHOLDS",
+    "box_iou",
+    "path_deviation",
+    "InputBuffer",
+    "quantize_model",
+    "quantized_model_path",
 ]
@@ -0,0 +1,476 @@
+#
+# The backends run the actual inference for the model wrappers. The TorchBackend uses
+# ultralytics directly, the OnnxBackend runs an exported copy of the weights on ONNX Runtime.
+#
+
+import ast
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from typing import Any
+
+import cv2
+import numpy as np
+import torch
+from cv2.typing import MatLike
+from numpy.typing import NDArray
+from ultralytics import YOLO  # pyright: ignore[reportMissingTypeStubs]
+from ultralytics.data.augment import LetterBox  # pyright: ignore[reportMissingTypeStubs]
+from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
+from ultralytics.nn.autobackend import AutoBackend  # pyright: ignore[reportMissingTypeStubs]
+from ultralytics.utils import ops  # pyright: ignore[reportMissingTypeStubs]
+from ultralytics.utils.torch_utils import select_device  # pyright: ignore[reportMissingTypeStubs]
+
+from .input_buffer import InputBuffer
+
+
+class ModelBackend(ABC):
+    """
+    Base class for the inference backends of the model wrappers.
+
+    Every backend has two ways to make a prediction. The source path (predict_source)
+    hands the images to the regular preprocessing of the backend. The direct path
+    (predict_direct) letterboxes the image into a preallocated input tensor and calls
+    the network and the post-processing directly.
+
+    Args:
+        pretrained_model_path (str): Path to the pretrained model.
+        device (list[int] | str): The device to run the model on.
+        task (str): The task of the model ("detect", "segment" or "classify").
+        imgsz (int): The inference size, 0 uses the size the model was trained with.
+        direct_input (bool): Use the direct path for the predictions.
+    """
+
+    def __init__(
+        self, pretrained_model_path: str, device: list[int] | str, task: str, imgsz: int = 0, direct_input: bool = False
+    ) -> None:
+        self.pretrained_model_path: str = pretrained_model_path
+        self.device: list[int] | str = device
+        self.task: str = task
+        self.direct_input: bool = direct_input
+
+        # set by the backends once the model is loaded
+        self.names: dict[int, str] = {}
+        self.stride: int = 32
+        self.imgsz: tuple[int, int] = (imgsz, imgsz)
+        self.input_buffer: InputBuffer | None = None
+
+    def predict(self, imgs: list[MatLike], conf: float, iou: float = 0.7) -> list[Results]:
+        """
+        Make predictions on a list of input images.
+
+        Args:
+            imgs (list[MatLike]): The input images.
+            conf (float): The confidence threshold.
+            iou (float): The IoU threshold for the non-maximum suppression.
+
+        Returns:
+            list[Results]: One result per input image.
+        """
+
+        if self.direct_input:
+            return [self.predict_direct(img=img, conf=conf, iou=iou) for img in imgs]
+        return self.predict_source(imgs=imgs, conf=conf, iou=iou)
+
+    def predict_direct(self, img: MatLike, conf: float, iou: float = 0.7) -> Results:
+        """
+        Make a prediction through the preallocated input tensor. The time spent in each
+        step is stored in the speed (ms) of the result like ultralytics does.
+
+        Args:
+            img (MatLike): The input image.
+            conf (float): The confidence threshold.
+            iou (float): The IoU threshold for the non-maximum suppression.
+
+        Returns:
+            Results: The result for the image.
+        """
+
+        if self.input_buffer is None:
+            self.input_buffer = InputBuffer(imgsz=self.imgsz, stride=self.stride, auto=self.rect(), task=self.task)
+
+        start: float = time.perf_counter()
+        tensor: NDArray[np.float32] = self.input_buffer.fill(img=img)
+        preprocessed: float = time.perf_counter()
+        outputs: Any = self.forward(tensor=tensor)
+        inferred: float = time.perf_counter()
+        result: Results = postprocess(
+            outputs=outputs,
+            task=self.task,
+            input_shape=(tensor.shape[2], tensor.shape[3]),
+            orig_img=img,
+            names=self.names,
+            conf=conf,
+            iou=iou,
+        )
+        postprocessed: float = time.perf_counter()
+
+        result.speed = {
+            "preprocess": (preprocessed - start) * 1e3,
+            "inference": (inferred - preprocessed) * 1e3,
+            "postprocess": (postprocessed - inferred) * 1e3,
+        }
+
+        return result
+
+    def round_imgsz(self, imgsz: tuple[int, int]) -> tuple[int, int]:
+        """
+        Round the inference size up to a multiple of the stride, like ultralytics does
+        for the regular path (check_imgsz). The direct path then runs at the same size.
+        """
+
+        return (
+            math.ceil(imgsz[0] / self.stride) * self.stride,
+            math.ceil(imgsz[1] / self.stride) * self.stride,
+        )
+
+    @abstractmethod
+    def predict_source(self, imgs: list[MatLike], conf: float, iou: float = 0.7) -> list[Results]:
+        """
+        Make predictions through the regular preprocessing of the backend.
+        """
+        pass
+
+    @abstractmethod
+    def forward(self, tensor: NDArray[np.float32]) -> Any:
+        """
+        Run the network on an input tensor (1, 3, h, w) and return the raw outputs.
+        """
+        pass
+
+    @abstractmethod
+    def rect(self) -> bool:
+        """
+        Return True if the network accepts the minimal rectangle instead of the full imgsz.
+        """
+        pass
+
+
+class TorchBackend(ModelBackend):
+    """
+    Runs the model with PyTorch through ultralytics.
+    """
+
+    def __init__(
+        self, pretrained_model_path: str, device: list[int] | str, task: str, imgsz: int = 0, direct_input: bool = False
+    ) -> None:
+        super().__init__(
+            pretrained_model_path=pretrained_model_path,
+            device=device,
+            task=task,
+            imgsz=imgsz,
+            direct_input=direct_input,
+        )
+        self.model = YOLO(model=pretrained_model_path)
+        self.names = self.model.names  # pyright: ignore[reportAttributeAccessIssue]
+        # the stride the ultralytics predictors use, the same for both paths
+        self.stride = max(int(self.model.model.stride.max()), 32)  # pyright: ignore[reportAttributeAccessIssue, reportOptionalMemberAccess]
+
+        # the direct path calls the network the same way the ultralytics predictors do
+        self.network: AutoBackend | None = None
+        if direct_input:
+            self.network = AutoBackend(
+                self.model.model,  # pyright: ignore[reportArgumentType]
+                device=select_device(",".join(map(str, device)) if isinstance(device, list) else device, verbose=False),
+                fp16=False,
+                fuse=True,
+                verbose=False,
+            )
+            self.network.eval()
+
+        # the size the model was trained with if none is given, stored as an int or as [h, w]
+        if imgsz > 0:
+            self.imgsz = self.round_imgsz(imgsz=(imgsz, imgsz))
+        else:
+            trained: int | Sequence[int] = self.model.overrides.get("imgsz", 640)
+            self.imgsz = self.round_imgsz(
+                imgsz=(int(trained), int(trained)) if isinstance(trained, int) else (int(trained[0]), int(trained[1]))
+            )
+
+    def predict_source(self, imgs: list[MatLike], conf: float, iou: float = 0.7) -> list[Results]:
+        results: list[Results] = self.model.predict(  # pyright: ignore[reportUnknownMemberType]
+            source=imgs,
+            device=self.device,
+            batch=1,
+            verbose=False,
+            conf=conf,
+            iou=iou,
+            imgsz=list(self.imgsz),
+        )
+
+        return results
+
+    def forward(self, tensor: NDArray[np.float32]) -> Any:
+        if self.network is None:
+            raise ValueError("The direct input path is not enabled.")
+
+        with torch.inference_mode():
+            return self.network(torch.from_numpy(tensor).to(self.network.device))
+
+    def rect(self) -> bool:
+        return True
+
+
+class OnnxBackend(ModelBackend):
+    """
+    Runs the model on the CPU with ONNX Runtime. The .pt weights are exported once
+    and the exported model is cached next to them. The pre- and post-processing follows
+    the ultralytics predictors, so the results can be used the same way.
+
+    Args:
+        pretrained_model_path (str): Path to the pretrained .pt (or already exported .onnx) model.
+        device (list[int] | str): Unused, ONNX Runtime always runs on the CPU.
+        task (str): The task of the model ("detect", "segment" or "classify").
+        intra_op_threads (int): Threads used inside one operator, 0 picks half of the cores.
+        imgsz (int): The inference size, 0 uses the size the model was exported with.
+        direct_input (bool): Use the direct path for the predictions.
+    """
+
+    def __init__(
+        self,
+        pretrained_model_path: str,
+        device: list[int] | str,
+        task: str,
+        intra_op_threads: int = 0,
+        imgsz: int = 0,
+        direct_input: bool = False,
+    ) -> None:
+        import onnxruntime as ort  # pyright: ignore[reportMissingTypeStubs]
+
+        super().__init__(
+            pretrained_model_path=pretrained_model_path,
+            device=device,
+            task=task,
+            imgsz=imgsz,
+            direct_input=direct_input,
+        )
+
+        self.onnx_model_path: str = self.export(pretrained_model_path=pretrained_model_path)
+
+        # the detection and segmentation models run at the same time in the pipeline,
+        # so by default every session only gets half of the cores
+        if intra_op_threads <= 0:
+            intra_op_threads = max(1, (os.cpu_count() or 2) // 2)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # don't let idle worker threads spin, they would steal the cores of the other sessions
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+
+        self.session = ort.InferenceSession(
+            self.onnx_model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name: str = self.session.get_inputs()[0].name
+
+        # ultralytics stores everything needed for the post-processing in the metadata
+        metadata: dict[str, str] = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"])
+        self.stride = int(metadata.get("stride", 32))
+        # a dynamic model accepts the minimal rectangle like the PyTorch model does
+        self.dynamic: bool = ast.literal_eval(metadata.get("args", "{}")).get("dynamic", False)
+
+        # only a dynamic model can run at another size than it was exported with
+        exported_imgsz: list[int] = ast.literal_eval(metadata["imgsz"])
+        self.imgsz = self.round_imgsz(
+            imgsz=(imgsz, imgsz) if imgsz > 0 and self.dynamic else (exported_imgsz[0], exported_imgsz[1])
+        )
+
+    @staticmethod
+    def export(pretrained_model_path: str) -> str:
+        """
+        Export the .pt weights to ONNX if there is no up to date export next to them.
+
+        Args:
+            pretrained_model_path (str): Path to the .pt (or .onnx) model.
+
+        Returns:
+            str: Path to the exported .onnx model.
+        """
+
+        if pretrained_model_path.endswith(".onnx"):
+            return pretrained_model_path
+
+        onnx_model_path: str = os.path.splitext(pretrained_model_path)[0] + ".onnx"
+
+        # only export again if the weights changed since the last export
+        if not os.path.isfile(onnx_model_path) or os.path.getmtime(onnx_model_path) < os.path.getmtime(
+            pretrained_model_path
+        ):
+            exported: str = YOLO(model=pretrained_model_path).export(  # pyright: ignore[reportUnknownMemberType]
+                format="onnx", dynamic=True, simplify=True
+            )
+            if os.path.abspath(exported) != os.path.abspath(onnx_model_path):
+                os.replace(exported, onnx_model_path)
+
+        return onnx_model_path
+
+    def predict_source(self, imgs: list[MatLike], conf: float, iou: float = 0.7) -> list[Results]:
+        results: list[Results] = []
+
+        # batch=1 like the PyTorch backend
+        for img in imgs:
+            start: float = time.perf_counter()
+            tensor: NDArray[np.float32] = self.preprocess(img=img)
+            preprocessed: float = time.perf_counter()
+            outputs: Any = self.forward(tensor=tensor)
+            inferred: float = time.perf_counter()
+            result: Results = postprocess(
+                outputs=outputs,
+                task=self.task,
+                input_shape=(tensor.shape[2], tensor.shape[3]),
+                orig_img=img,
+                names=self.names,
+                conf=conf,
+                iou=iou,
+            )
+            result.speed = {
+                "preprocess": (preprocessed - start) * 1e3,
+                "inference": (inferred - preprocessed) * 1e3,
+                "postprocess": (time.perf_counter() - inferred) * 1e3,
+            }
+            results.append(result)
+
+        return results
+
+    def forward(self, tensor: NDArray[np.float32]) -> Any:
+        return self.session.run(None, {self.input_name: tensor})  # pyright: ignore[reportUnknownMemberType]
+
+    def rect(self) -> bool:
+        return self.dynamic
+
+    def preprocess(self, img: MatLike) -> NDArray[np.float32]:
+        """
+        Bring the image into the input format of the network the same way
+        the ultralytics predictors do.
+
+        Args:
+            img (MatLike): The input image.
+
+        Returns:
+            NDArray[np.float32]: The input tensor (1, 3, h, w).
+        """
+
+        if self.task == "classify":
+            # resize the shorter side and take the center crop
+            h, w = img.shape[:2]
+            size: int = self.imgsz[0]
+            scale: float = size / min(h, w)
+            resized: MatLike = cv2.resize(
+                src=img,
+                dsize=(max(size, round(w * scale)), max(size, round(h * scale))),
+                interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR,
+            )
+            top: int = (resized.shape[0] - size) // 2
+            left: int = (resized.shape[1] - size) // 2
+            img = resized[top : top + size, left : left + size]
+        else:
+            letterbox = LetterBox(new_shape=self.imgsz, auto=self.dynamic, stride=self.stride)
+            img = letterbox(image=img)
+
+        # BGR to RGB, HWC to CHW, add the batch dimension
+        tensor: NDArray[np.float32] = np.ascontiguousarray(img[..., ::-1].transpose(2, 0, 1)[None], dtype=np.float32)
+        tensor /= 255.0
+
+        return tensor
+
+
+def postprocess(
+    outputs: Any,
+    task: str,
+    input_shape: tuple[int, int],
+    orig_img: MatLike,
+    names: dict[int, str],
+    conf: float,
+    iou: float,
+) -> Results:
+    """
+    Turn the raw network outputs of one image into ultralytics Results.
+    Follows the post-processing of the ultralytics predictors (NMS, mask protos).
+
+    Args:
+        outputs (Any): The raw outputs of the network.
+        task (str): The task of the model ("detect", "segment" or "classify").
+        input_shape (tuple[int, int]): The (h, w) of the network input.
+        orig_img (MatLike): The image the input was made from.
+        names (dict[int, str]): The class names.
+        conf (float): The confidence threshold.
+        iou (float): The IoU threshold for the non-maximum suppression.
+
+    Returns:
+        Results: The results for the image.
+    """
+
+    preds: list[torch.Tensor] = [
+        torch.from_numpy(output) if isinstance(output, np.ndarray) else output  # pyright: ignore[reportUnknownArgumentType]
+        for output in (outputs if isinstance(outputs, (list, tuple)) else [outputs])  # pyright: ignore[reportUnknownVariableType]
+    ]
+
+    if task == "classify":
+        return Results(orig_img=orig_img, path="", names=names, probs=preds[0][0])
+
+    pred: torch.Tensor = ops.non_max_suppression(  # pyright: ignore[reportUnknownMemberType]
+        preds[0], conf_thres=conf, iou_thres=iou, max_det=300, nc=len(names) if task == "segment" else 0
+    )[0]
+
+    if task == "segment":
+        # the torch model returns the protos as the last element of a tuple
+        proto: torch.Tensor = preds[1][-1] if isinstance(preds[1], tuple) else preds[1]
+        masks: torch.Tensor | None = None
+        if len(pred):
+            masks = ops.process_mask(proto[0], pred[:, 6:], pred[:, :4], input_shape, upsample=True)  # pyright: ignore[reportUnknownMemberType]
+        pred[:, :4] = ops.scale_boxes(input_shape, pred[:, :4], orig_img.shape)  # pyright: ignore[reportUnknownMemberType]
+        return Results(orig_img=orig_img, path="", names=names, boxes=pred[:, :6], masks=masks)
+
+    pred[:, :4] = ops.scale_boxes(input_shape, pred[:, :4], orig_img.shape)  # pyright: ignore[reportUnknownMemberType]
+    return Results(orig_img=orig_img, path="", names=names, boxes=pred[:, :6])
+
+
+def create_backend(
+    backend: str,
+    pretrained_model_path: str,
+    device: list[int] | str,
+    task: str,
+    intra_op_threads: int = 0,
+    imgsz: int = 0,
+    direct_input: bool = False,
+) -> ModelBackend:
+    """
+    Create the backend with the given name.
+
+    Args:
+        backend (str): The name of the backend ("torch" or "onnx").
+        pretrained_model_path (str): Path to the pretrained model.
+        device (list[int] | str): The device to run the model on.
+        task (str): The task of the model ("detect", "segment" or "classify").
+        intra_op_threads (int): Threads used inside one operator (ONNX only).
+        imgsz (int): The inference size, 0 uses the size the model was trained with.
+        direct_input (bool): Use the direct path with the preallocated input tensor.
+
+    Returns:
+        ModelBackend: The created backend.
+    """
+
+    if backend == "torch":
+        return TorchBackend(
+            pretrained_model_path=pretrained_model_path,
+            device=device,
+            task=task,
+            imgsz=imgsz,
+            direct_input=direct_input,
+        )
+    elif backend == "onnx":
+        return OnnxBackend(
+            pretrained_model_path=pretrained_model_path,
+            device=device,
+            task=task,
+            intra_op_threads=intra_op_threads,
+            imgsz=imgsz,
+            direct_input=direct_input,
+        )
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
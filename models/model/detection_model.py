@@ -1,11 +1,28 @@
 from cv2.typing import MatLike
-from ultralytics import YOLO  # pyright: ignore[reportMissingTypeStubs]
 from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
 
+from .backends import ModelBackend, create_backend
+
 
 class DetectionModel:
-    def __init__(self, pretrained_model_path: str, device: list[int] | str) -> None:
-        self.detection_model = YOLO(model=pretrained_model_path)
+    def __init__(
+        self,
+        pretrained_model_path: str,
+        device: list[int] | str,
+        backend: str = "torch",
+        intra_op_threads: int = 0,
+        imgsz: int = 0,
+        direct_input: bool = False,
+    ) -> None:
+        self.detection_model: ModelBackend = create_backend(
+            backend=backend,
+            pretrained_model_path=pretrained_model_path,
+            device=device,
+            task="detect",
+            intra_op_threads=intra_op_threads,
+            imgsz=imgsz,
+            direct_input=direct_input,
+        )
         self.device: list[int] | str = device
 
     def predict(self, img: MatLike) -> Results:
@@ -19,11 +36,8 @@ class DetectionModel:
             Results: The segmentation results.
         """
 
-        results: list[Results] = self.detection_model.predict(  # pyright: ignore[reportUnknownMemberType]
-            source=img,
-            device=self.device,
-            batch=1,
-            verbose=False,
+        results: list[Results] = self.detection_model.predict(
+            imgs=[img],
             conf=0.5,
             iou=0.45,
         )
@@ -41,11 +55,8 @@ class DetectionModel:
             list[Results]: The list of segmentation results.
         """
 
-        results: list[Results] = self.detection_model.predict(  # pyright: ignore[reportUnknownMemberType]
-            source=imgs,
-            device=self.device,
-            batch=1,
-            verbose=False,
+        results: list[Results] = self.detection_model.predict(
+            imgs=imgs,
             conf=0.5,
             iou=0.45,
         )
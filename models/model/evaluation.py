@@ -0,0 +1,35 @@
+#
+# Shared helpers of the scripts that compare the outputs of models or backends.
+#
+
+import numpy as np
+from numpy.typing import NDArray
+
+# the same thresholds the model wrappers use
+THRESHOLDS: dict[str, tuple[float, float]] = {"detect": (0.5, 0.45), "segment": (0.6, 0.45), "classify": (0.5, 0.7)}
+
+
+def box_iou(a: NDArray[np.float32], b: NDArray[np.float32]) -> NDArray[np.float32]:
+    """
+    Pairwise IoU of two sets of xyxy boxes.
+    """
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def path_deviation(path_f: np.poly1d, golden_f: np.poly1d, value_range: tuple[int, int]) -> float:
+    """
+    Return the largest horizontal pixel deviation of two paths over the rows of the golden path.
+    """
+
+    y: NDArray[np.float64] = np.arange(int(value_range[0]), int(value_range[1]) + 1, dtype=np.float64)
+    if y.size == 0:
+        return 0.0
+    return float(np.max(np.abs(path_f(y) - golden_f(y))))
@@ -0,0 +1,114 @@
+#
+# The InputBuffer owns the preallocated input tensor of a model and brings the images
+# into it without the per call allocations of the ultralytics preprocessing.
+#
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+from numpy.typing import NDArray
+
+
+class InputBuffer:
+    """
+    Preallocated input tensor of a model. The image is letterboxed (or resized and center
+    cropped for the classification) straight into the buffer and the channel flip is folded
+    into the conversion to float. The geometry follows the ultralytics LetterBox and
+    classification transforms, so the network sees the same input.
+
+    The buffer is reused for every call and is therefore not thread-safe.
+
+    Args:
+        imgsz (tuple[int, int]): The (h, w) inference size.
+        stride (int): The stride of the model.
+        auto (bool): Pad only to the next multiple of the stride (minimal rectangle).
+        task (str): The task of the model ("detect", "segment" or "classify").
+    """
+
+    def __init__(self, imgsz: tuple[int, int], stride: int, auto: bool, task: str) -> None:
+        self.imgsz: tuple[int, int] = imgsz
+        self.stride: int = stride
+        self.auto: bool = auto
+        self.task: str = task
+
+        # everything below depends on the shape of the input image
+        self.src_shape: tuple[int, int] | None = None
+        self.canvas: NDArray[np.uint8] = np.zeros((0, 0, 3), dtype=np.uint8)
+        self.content: NDArray[np.uint8] = self.canvas
+        self.tensor: NDArray[np.float32] = np.zeros((1, 3, 0, 0), dtype=np.float32)
+        self.resize_to: tuple[int, int] = (0, 0)
+        self.crop_offset: tuple[int, int] = (0, 0)
+
+    def allocate(self, src_shape: tuple[int, int]) -> None:
+        """
+        Compute the geometry for the given image shape and allocate the buffers.
+
+        Args:
+            src_shape (tuple[int, int]): The (h, w) of the input images.
+        """
+
+        h, w = src_shape
+
+        if self.task == "classify":
+            # resize the shorter side and take the center crop
+            size: int = self.imgsz[0]
+            scale: float = size / min(h, w)
+            self.resize_to = (max(size, round(w * scale)), max(size, round(h * scale)))
+            self.crop_offset = ((self.resize_to[1] - size) // 2, (self.resize_to[0] - size) // 2)
+            self.canvas = np.zeros((size, size, 3), dtype=np.uint8)
+            self.content = self.canvas
+        else:
+            r: float = min(self.imgsz[0] / h, self.imgsz[1] / w)
+            self.resize_to = (int(round(w * r)), int(round(h * r)))
+            dw: float = self.imgsz[1] - self.resize_to[0]
+            dh: float = self.imgsz[0] - self.resize_to[1]
+            if self.auto:
+                dw, dh = float(np.mod(dw, self.stride)), float(np.mod(dh, self.stride))
+            dw, dh = dw / 2, dh / 2
+
+            top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+            left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+
+            # the padding is filled once, only the content gets written per call
+            self.canvas = np.full(
+                (self.resize_to[1] + top + bottom, self.resize_to[0] + left + right, 3), 114, dtype=np.uint8
+            )
+            self.content = self.canvas[top : top + self.resize_to[1], left : left + self.resize_to[0]]
+
+        self.tensor = np.zeros((1, 3, self.canvas.shape[0], self.canvas.shape[1]), dtype=np.float32)
+        self.src_shape = src_shape
+
+    def fill(self, img: MatLike) -> NDArray[np.float32]:
+        """
+        Write the image into the input tensor.
+
+        Args:
+            img (MatLike): The input image in the channel order the ultralytics predictors expect.
+
+        Returns:
+            NDArray[np.float32]: The filled input tensor (1, 3, h, w). It is overwritten by the next call.
+        """
+
+        src_shape: tuple[int, int] = (img.shape[0], img.shape[1])
+        if src_shape != self.src_shape:
+            self.allocate(src_shape=src_shape)
+
+        if self.task == "classify":
+            scale_down: bool = self.resize_to[1] < src_shape[0]
+            resized: MatLike = cv2.resize(
+                src=img,
+                dsize=self.resize_to,
+                interpolation=cv2.INTER_AREA if scale_down else cv2.INTER_LINEAR,
+            )
+            top, left = self.crop_offset
+            np.copyto(self.canvas, resized[top : top + self.canvas.shape[0], left : left + self.canvas.shape[1]])
+        elif self.resize_to == (src_shape[1], src_shape[0]):
+            np.copyto(self.content, img)
+        else:
+            # resize straight into the content region of the canvas
+            cv2.resize(src=img, dsize=self.resize_to, dst=self.content, interpolation=cv2.INTER_LINEAR)
+
+        # BGR to RGB, HWC to CHW and the normalization in one copy
+        np.divide(self.canvas[..., ::-1].transpose(2, 0, 1), np.float32(255.0), out=self.tensor[0], casting="unsafe")
+
+        return self.tensor
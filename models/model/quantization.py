@@ -0,0 +1,91 @@
+#
+# Post-training INT8 quantization of the exported ONNX models.
+#
+
+import os
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+from cv2.typing import MatLike
+from numpy.typing import NDArray
+
+from .backends import OnnxBackend
+
+
+def quantized_model_path(pretrained_model_path: str) -> str:
+    """
+    Return the path of the quantized model next to the given weights.
+    """
+
+    return os.path.splitext(pretrained_model_path)[0] + ".int8.onnx"
+
+
+def quantize_model(pretrained_model_path: str, task: str, frames: Iterable[MatLike]) -> str:
+    """
+    Quantize the model to INT8 with static post-training quantization.
+
+    Only the convolutions and matrix multiplications are quantized, the decoding of
+    the boxes and masks at the end of the network stays in float so the coordinates
+    don't lose precision.
+
+    Args:
+        pretrained_model_path (str): Path to the .pt model.
+        task (str): The task of the model ("detect", "segment" or "classify").
+        frames (Iterable[MatLike]): The calibration frames, prepared like the extractors do.
+
+    Returns:
+        str: Path to the quantized model.
+    """
+
+    import onnx  # pyright: ignore[reportMissingTypeStubs]
+    from onnxruntime.quantization import (  # pyright: ignore[reportMissingTypeStubs]
+        CalibrationDataReader,
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process  # pyright: ignore[reportMissingTypeStubs]
+
+    # the fp32 backend exports the model and brings the frames into the input format
+    backend = OnnxBackend(pretrained_model_path=pretrained_model_path, device="cpu", task=task)
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self) -> None:
+            self.frames: Iterator[MatLike] = iter(frames)
+
+        def get_next(self) -> dict[str, NDArray[np.float32]] | None:
+            frame: MatLike | None = next(self.frames, None)
+            if frame is None:
+                return None
+            return {backend.input_name: backend.preprocess(img=frame)}
+
+    output_path: str = quantized_model_path(pretrained_model_path=pretrained_model_path)
+    prepared_path: str = os.path.splitext(backend.onnx_model_path)[0] + ".prep.onnx"
+
+    # shape inference and graph cleanup makes the quantization much more reliable
+    quant_pre_process(backend.onnx_model_path, prepared_path)
+
+    try:
+        quantize_static(
+            model_input=prepared_path,
+            model_output=output_path,
+            calibration_data_reader=FrameReader(),
+            quant_format=QuantFormat.QDQ,
+            op_types_to_quantize=["Conv", "MatMul"],
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+    finally:
+        os.remove(prepared_path)
+
+    # keep the ultralytics metadata, the OnnxBackend needs it for the post-processing
+    fp32_model = onnx.load(backend.onnx_model_path)
+    int8_model = onnx.load(output_path)
+    if not int8_model.metadata_props:
+        int8_model.metadata_props.extend(fp32_model.metadata_props)
+        onnx.save(int8_model, output_path)
+
+    return output_path
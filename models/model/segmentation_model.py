@@ -1,11 +1,28 @@
 from cv2.typing import MatLike
-from ultralytics import YOLO  # pyright: ignore[reportMissingTypeStubs]
 from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
 
+from .backends import ModelBackend, create_backend
+
 
 class SegmentationModel:
-    def __init__(self, pretrained_model_path: str, device: list[int] | str) -> None:
-        self.segmentation_model = YOLO(model=pretrained_model_path)
+    def __init__(
+        self,
+        pretrained_model_path: str,
+        device: list[int] | str,
+        backend: str = "torch",
+        intra_op_threads: int = 0,
+        imgsz: int = 0,
+        direct_input: bool = False,
+    ) -> None:
+        self.segmentation_model: ModelBackend = create_backend(
+            backend=backend,
+            pretrained_model_path=pretrained_model_path,
+            device=device,
+            task="segment",
+            intra_op_threads=intra_op_threads,
+            imgsz=imgsz,
+            direct_input=direct_input,
+        )
         self.device: list[int] | str = device
 
     def predict(self, img: MatLike) -> Results:
@@ -19,11 +36,8 @@ class SegmentationModel:
             Results: The segmentation results.
         """
 
-        results: list[Results] = self.segmentation_model.predict(  # pyright: ignore[reportUnknownMemberType]
-            source=img,
-            device=self.device,
-            batch=1,
-            verbose=False,
+        results: list[Results] = self.segmentation_model.predict(
+            imgs=[img],
             iou=0.45,
             conf=0.6,
         )
@@ -41,11 +55,8 @@ class SegmentationModel:
             list[Results]: The list of segmentation results.
         """
 
-        results: list[Results] = self.segmentation_model.predict(  # pyright: ignore[reportUnknownMemberType]
-            source=imgs,
-            device=self.device,
-            batch=1,
-            verbose=False,
+        results: list[Results] = self.segmentation_model.predict(
+            imgs=imgs,
             iou=0.45,
             conf=0.6,
         )
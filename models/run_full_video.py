@@ -3,7 +3,7 @@ import os
 import pickle
 import sys
 
-import cv2
+from loaders import IndexedVideoReader
 from model import ClassificationModel, DetectionModel, SegmentationModel
 from tqdm import tqdm
 from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
@@ -30,7 +30,7 @@ def save_results(
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 8:
+    if len(sys.argv) not in [8, 10]:
         print(
             "Usage: python script.py\n"
             "\t<video_source: str>\n"
@@ -39,7 +39,8 @@ if __name__ == "__main__":
             "\t<top_crop: int>\n"
             "\t<segmentation_model_path: str>\n"
             "\t<detection_model_path: str>\n"
-            "\t<classification_model_path: str>"
+            "\t<classification_model_path: str>\n"
+            "\t[<start_frame: int> <stop_frame: int>]"
         )
         sys.exit(1)
 
@@ -51,6 +52,9 @@ if __name__ == "__main__":
     segmentation_model_path: str = sys.argv[5]
     detection_model_path: str = sys.argv[6]
     classification_model_path: str = sys.argv[7]
+    # optional range of frames [start, stop), to split the video into parts
+    start_frame: int = int(sys.argv[8]) if len(sys.argv) == 10 else 0
+    stop_frame: int = int(sys.argv[9]) if len(sys.argv) == 10 else -1
 
     # check if the provided device is a string type
     # and if not than make a list
@@ -69,12 +73,17 @@ if __name__ == "__main__":
     print(f"Classification model path: {classification_model_path}")
     print("Loading models and images...")
 
-    # get the images
-    cap = cv2.VideoCapture(video_src)
-    if not cap.isOpened():
+    # get the images, the keyframe index is built if there is none
+    try:
+        reader = IndexedVideoReader(video_path=video_src)
+    except ValueError:
         print("Error: Could not open video.")
         exit()
 
+    if stop_frame < 0 or stop_frame > reader.frame_count:
+        stop_frame = reader.frame_count
+    print(f"Frames: {start_frame} - {stop_frame}")
+
     # load the models
     classification_model = ClassificationModel(
         pretrained_model_path=classification_model_path,
@@ -95,15 +104,18 @@ if __name__ == "__main__":
 
     print("Everything loaded. Process images....")
 
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    # jump to the keyframe before the start, decode from there
+    reader.seek(frame=start_frame)
 
     # tqdm loop
-    for _ in tqdm(range(total_frames), desc="Processing video"):
-        ret, frame = cap.read()
-        if not ret:
+    for _ in tqdm(range(stop_frame - start_frame), desc="Processing video"):
+        read = reader.read()
+        if read is None:
             break
 
-        fram_num = str(int(cap.get(cv2.CAP_PROP_POS_FRAMES)))
+        # the 1-based number of the frame, the debug viewer looks the results up by it
+        index, frame = read
+        fram_num: str = IndexedVideoReader.key(frame=index)
 
         frame = frame[top_crop:, :, :]
 
@@ -112,6 +124,8 @@ if __name__ == "__main__":
         seg_results.append((fram_num, segmentation_model.predict(img=frame)))
 
     basename: str = os.path.splitext(os.path.basename(video_src))[0]
+    if len(sys.argv) == 10:
+        basename = f"{basename}_{start_frame}-{stop_frame}"
     save_results(
         basename=basename,
         cls_results=cls_results,
@@ -0,0 +1,59 @@
+import random
+import sys
+import time
+
+import cv2
+import numpy as np
+from loaders import IndexedVideoReader, KeyframeIndex
+
+# the number of random frames the seeking is compared on
+SEEKS: int = 50
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python script.py\n\t<video_source: str>")
+        sys.exit(1)
+
+    video_src: str = sys.argv[1]
+
+    # the recognized command line inputs
+    print(f"Video Source: {video_src}")
+    print("Building the keyframe index...")
+
+    start: float = time.perf_counter()
+    index: KeyframeIndex = KeyframeIndex.build(video_path=video_src)
+    index.save()
+    print(f"Index saved to {KeyframeIndex.sidecar_path(video_path=video_src)} in {time.perf_counter() - start:.2f}s")
+
+    gops: list[int] = np.diff(index.keyframes + [index.frame_count]).tolist()
+    print(f"Frames: {index.frame_count}")
+    print(f"Keyframes: {len(index.keyframes)}")
+    if gops:
+        print(f"GOP length: mean {np.mean(gops):.1f}, max {max(gops)}")
+
+    # compare the seeking of OpenCV with the indexed reader on the same random frames
+    frames: list[int] = random.Random(0).sample(range(index.frame_count), min(SEEKS, index.frame_count))
+
+    cap = cv2.VideoCapture(video_src)
+    start = time.perf_counter()
+    plain: list[np.ndarray] = []
+    for frame in frames:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        plain.append(cap.read()[1])
+    plain_time: float = time.perf_counter() - start
+    cap.release()
+
+    reader = IndexedVideoReader(video_path=video_src, index=index)
+    start = time.perf_counter()
+    indexed: list[tuple[int, np.ndarray] | None] = [reader.read(frame=frame) for frame in frames]
+    indexed_time: float = time.perf_counter() - start
+    reader.release()
+
+    misaligned: int = sum(1 for frame, read in zip(frames, indexed) if read is None or read[0] != frame)
+    different: int = sum(
+        1 for a, read in zip(plain, indexed) if a is None or read is None or not np.array_equal(a, read[1])
+    )
+    print(f"Random seeks: {len(frames)}")
+    print(f"OpenCV seek: {plain_time / len(frames) * 1000:.1f} ms per frame")
+    print(f"Indexed seek: {indexed_time / len(frames) * 1000:.1f} ms per frame")
+    print(f"Misaligned frames: {misaligned}, frames different from the OpenCV seek: {different}")
@@ -0,0 +1,88 @@
+import sys
+import time
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+from loaders import ImageLoader
+from model import THRESHOLDS, create_backend
+from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
+
+# calls that are not measured, the first calls allocate and warm up the network
+WARMUP_CALLS: int = 3
+
+
+def measure(imgs: list[MatLike], backend: str, task: str, model_path: str, imgsz: int, direct_input: bool) -> None:
+    """
+    Run the model on every image and print the mean time per call. The overhead is
+    everything outside the forward pass of the network (preprocessing, post-processing
+    and the call itself).
+    """
+
+    model = create_backend(
+        backend=backend,
+        pretrained_model_path=model_path,
+        device="cpu",
+        task=task,
+        imgsz=imgsz,
+        direct_input=direct_input,
+    )
+    conf, iou = THRESHOLDS[task]
+
+    for img in imgs[:WARMUP_CALLS]:
+        model.predict(imgs=[img], conf=conf, iou=iou)
+
+    wall: list[float] = []
+    inference: list[float] = []
+    for img in imgs:
+        start: float = time.perf_counter()
+        result: Results = model.predict(imgs=[img], conf=conf, iou=iou)[0]
+        wall.append((time.perf_counter() - start) * 1e3)
+        inference.append(result.speed["inference"])  # pyright: ignore[reportUnknownMemberType]
+
+    overhead: float = float(np.mean(wall) - np.mean(inference))
+    print(
+        f"{'direct' if direct_input else 'source':<8}"
+        f"wall {np.mean(wall):8.2f} ms   inference {np.mean(inference):8.2f} ms   overhead {overhead:8.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 7:
+        print(
+            "Usage: python script.py\n"
+            "\t<input_folder: str>\n"
+            "\t<top_crop: int>\n"
+            "\t<task: detect | segment | classify>\n"
+            "\t<model_path: str>\n"
+            "\t<backend: torch | onnx>\n"
+            "\t<imgsz: int (0 for the trained size)>"
+        )
+        sys.exit(1)
+
+    input_folder: str = sys.argv[1]
+    top_crop: int = int(sys.argv[2])
+    task: str = sys.argv[3]
+    model_path: str = sys.argv[4]
+    backend: str = sys.argv[5]
+    imgsz: int = int(sys.argv[6])
+
+    print(f"Input folder: {input_folder}")
+    print(f"Top crop: {top_crop}")
+    print(f"Task: {task}")
+    print(f"Model path: {model_path}")
+    print(f"Backend: {backend}")
+    print(f"Imgsz: {imgsz}")
+    print("Loading images...")
+
+    # prepared like the extractors do (cropped and converted to RGB)
+    imgs: list[MatLike] = [
+        cv2.cvtColor(img[top_crop:, :, :], cv2.COLOR_BGR2RGB) for _, img in ImageLoader(input_folder=input_folder)
+    ]
+    if not imgs:
+        print("Error: No images found.")
+        sys.exit(1)
+
+    # before: through the ultralytics preprocessing, after: through the preallocated input tensor
+    measure(imgs=imgs, backend=backend, task=task, model_path=model_path, imgsz=imgsz, direct_input=False)
+    measure(imgs=imgs, backend=backend, task=task, model_path=model_path, imgsz=imgsz, direct_input=True)
@@ -0,0 +1,112 @@
+import sys
+
+import numpy as np
+from loaders import ImageLoader
+from model import THRESHOLDS, OnnxBackend, TorchBackend, box_iou
+from numpy.typing import NDArray
+from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
+
+# minimal agreement between the backends to pass
+MIN_MATCH_RATIO: float = 0.95
+MIN_MASK_IOU: float = 0.9
+MAX_CONF_DIFF: float = 0.05
+
+
+def compare(reference: Results, candidate: Results, task: str) -> dict[str, list[float]]:
+    """
+    Compare the results of two backends for one image.
+
+    Returns:
+        dict[str, list[float]]: The collected metrics of the image.
+    """
+
+    metrics: dict[str, list[float]] = {"matched": [], "conf_diff": [], "mask_iou": []}
+
+    if task == "classify":
+        ref_probs: NDArray[np.float32] = reference.probs.data.cpu().numpy()  # type: ignore
+        cand_probs: NDArray[np.float32] = candidate.probs.data.cpu().numpy()  # type: ignore
+        metrics["matched"].append(float(np.argmax(ref_probs) == np.argmax(cand_probs)))
+        metrics["conf_diff"].append(float(np.max(np.abs(ref_probs - cand_probs))))
+        return metrics
+
+    ref_boxes: NDArray[np.float32] = reference.boxes.data.cpu().numpy()  # type: ignore
+    cand_boxes: NDArray[np.float32] = candidate.boxes.data.cpu().numpy()  # type: ignore
+
+    if len(ref_boxes) == 0 or len(cand_boxes) == 0:
+        metrics["matched"].extend([0.0] * max(len(ref_boxes), len(cand_boxes)))
+        return metrics
+
+    # greedy matching of the boxes with the same class
+    ious = box_iou(ref_boxes[:, :4], cand_boxes[:, :4])
+    ious[ref_boxes[:, None, 5] != cand_boxes[None, :, 5]] = 0
+    for i in range(len(ref_boxes)):
+        j = int(np.argmax(ious[i]))
+        if ious[i, j] >= 0.9:
+            metrics["matched"].append(1.0)
+            metrics["conf_diff"].append(float(abs(ref_boxes[i, 4] - cand_boxes[j, 4])))
+            if task == "segment":
+                ref_mask = reference.masks.data[i].cpu().numpy() > 0.5  # type: ignore
+                cand_mask = candidate.masks.data[j].cpu().numpy() > 0.5  # type: ignore
+                union = np.logical_or(ref_mask, cand_mask).sum()
+                metrics["mask_iou"].append(float(np.logical_and(ref_mask, cand_mask).sum() / union) if union else 1.0)
+            ious[:, j] = 0
+        else:
+            metrics["matched"].append(0.0)
+
+    # boxes only the candidate found count as mismatches as well
+    metrics["matched"].extend([0.0] * max(0, len(cand_boxes) - len(ref_boxes)))
+
+    return metrics
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print(
+            "Usage: python script.py\n"
+            "\t<input_folder: str>\n"
+            "\t<top_crop: int>\n"
+            "\t<task: detect | segment | classify>\n"
+            "\t<model_path: str>"
+        )
+        sys.exit(1)
+
+    input_folder: str = sys.argv[1]
+    top_crop: int = int(sys.argv[2])
+    task: str = sys.argv[3]
+    model_path: str = sys.argv[4]
+    conf, iou = THRESHOLDS[task]
+
+    print(f"Input folder: {input_folder}")
+    print(f"Top crop: {top_crop}")
+    print(f"Task: {task}")
+    print(f"Model path: {model_path}")
+    print("Loading models and images...")
+
+    torch_backend = TorchBackend(pretrained_model_path=model_path, device="cpu", task=task)
+    onnx_backend = OnnxBackend(pretrained_model_path=model_path, device="cpu", task=task)
+
+    collected: dict[str, list[float]] = {"matched": [], "conf_diff": [], "mask_iou": []}
+
+    for _, img in ImageLoader(input_folder=input_folder):
+        img = img[top_crop:, :, :]
+        for key, values in compare(
+            reference=torch_backend.predict(imgs=[img], conf=conf, iou=iou)[0],
+            candidate=onnx_backend.predict(imgs=[img], conf=conf, iou=iou)[0],
+            task=task,
+        ).items():
+            collected[key].extend(values)
+
+    match_ratio: float = float(np.mean(collected["matched"])) if collected["matched"] else 1.0
+    conf_diff: float = float(np.max(collected["conf_diff"])) if collected["conf_diff"] else 0.0
+    mask_iou: float = float(np.mean(collected["mask_iou"])) if collected["mask_iou"] else 1.0
+
+    print(f"Matched predictions: {match_ratio:.3f} (min {MIN_MATCH_RATIO})")
+    print(f"Max confidence difference: {conf_diff:.4f} (max {MAX_CONF_DIFF})")
+    if task == "segment":
+        print(f"Mean mask IoU: {mask_iou:.3f} (min {MIN_MASK_IOU})")
+
+    if match_ratio < MIN_MATCH_RATIO or conf_diff > MAX_CONF_DIFF or mask_iou < MIN_MASK_IOU:
+        print("FAILED: the ONNX backend does not match the PyTorch backend.")
+        sys.exit(1)
+
+    print("PASSED")
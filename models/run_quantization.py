@@ -0,0 +1,82 @@
+import os
+import sys
+from collections.abc import Iterator
+
+import cv2
+from cv2.typing import MatLike
+from loaders import ImageLoader
+from model import quantize_model
+
+
+def calibration_frames(source: str, top_crop: int, max_frames: int) -> Iterator[MatLike]:
+    """
+    Read the calibration frames from an image folder or from a video. The frames of
+    a video are taken evenly spaced over the whole recording.
+
+    Args:
+        source (str): Path to an image folder or a video file.
+        top_crop (int): Rows to remove from the top, like the extractors do.
+        max_frames (int): The maximal number of frames.
+
+    Yields:
+        MatLike: The cropped frames.
+    """
+
+    if os.path.isdir(source):
+        for i, (_, img) in enumerate(ImageLoader(input_folder=source)):
+            if i >= max_frames:
+                break
+            yield img[top_crop:, :, :]
+        return
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        print("Error: Could not open video.")
+        exit()
+
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step: int = max(1, total_frames // max_frames)
+
+    for frame_num in range(0, total_frames, step)[:max_frames]:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame[top_crop:, :, :]
+
+    cap.release()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 6:
+        print(
+            "Usage: python script.py\n"
+            "\t<calibration_source: str (image folder or video)>\n"
+            "\t<top_crop: int>\n"
+            "\t<task: detect | segment | classify>\n"
+            "\t<model_path: str>\n"
+            "\t<max_frames: int>"
+        )
+        sys.exit(1)
+
+    calibration_source: str = sys.argv[1]
+    top_crop: int = int(sys.argv[2])
+    task: str = sys.argv[3]
+    model_path: str = sys.argv[4]
+    max_frames: int = int(sys.argv[5])
+
+    # the recognized command line inputs
+    print(f"Calibration source: {calibration_source}")
+    print(f"Top crop: {top_crop}")
+    print(f"Task: {task}")
+    print(f"Model path: {model_path}")
+    print(f"Max frames: {max_frames}")
+    print("Calibrating and quantizing...")
+
+    output_path: str = quantize_model(
+        pretrained_model_path=model_path,
+        task=task,
+        frames=calibration_frames(source=calibration_source, top_crop=top_crop, max_frames=max_frames),
+    )
+
+    print(f"Quantized model saved to {output_path}")
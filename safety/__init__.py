@@ -1,4 +1,4 @@
-from .steering_protection import SteeringProtector
 from .awareness import Notificator
+from .steering_protection import DeadlineMiss, DegradedMode, SteeringProtector
 
-__all__ = ["SteeringProtector", "Notificator"]
+__all__ = ["SteeringProtector", "DegradedMode", "DeadlineMiss", "Notificator"]
@@ -1,3 +1,210 @@
+#
+# The SteeringProtector makes sure the truck is never steered on old data. It watches the age of the newest
+# paths and road objects and escalates through degraded modes when the perception falls behind.
+#
+
+import time
+from collections import deque
+from enum import IntEnum
+
+from configs import globals
+
+
+class DegradedMode(IntEnum):
+    """
+    The modes of the SteeringProtector, a higher mode is more restrictive.
+    """
+
+    # everything is fresh
+    NORMAL = 0
+    # keep the last steering, don't steer on the stale path
+    HOLD_LANE = 1
+    # additionally take the throttle back
+    EASE_THROTTLE = 2
+    # release the steering and the throttle
+    STOP_STEERING = 3
+
+
+class DeadlineMiss:
+    """
+    One deadline that was missed.
+
+    Args:
+        kind (str): What was too old ("paths" or "road_objects").
+        deadline (float): The deadline that was missed in seconds.
+        age (float): The age of the newest data at the miss in seconds.
+        stage (str): The pipeline stage that caused the miss.
+        mode (DegradedMode): The mode the miss escalated to.
+        timestamp (float): The time of the miss (time.perf_counter).
+    """
+
+    def __init__(
+        self, kind: str, deadline: float, age: float, stage: str, mode: DegradedMode, timestamp: float
+    ) -> None:
+        self.kind: str = kind
+        self.deadline: float = deadline
+        self.age: float = age
+        self.stage: str = stage
+        self.mode: DegradedMode = mode
+        self.timestamp: float = timestamp
+
+    def __str__(self) -> str:
+        return (
+            f"DeadlineMiss({self.kind}: {self.age * 1000:.0f}ms > {self.deadline * 1000:.0f}ms, "
+            f"stage={self.stage}, mode={self.mode.name})"
+        )
+
+
 class SteeringProtector:
-    def __init__(self):
-        pass
+    """
+    Watchdog for the age of the annotations the controller works with.
+
+    The paths have three deadlines, one for each degraded mode. The road objects have
+    one deadline, without fresh objects the truck can't see obstacles, so it eases off
+    the throttle. Every crossed deadline is logged once with the stage that caused it:
+    "stalled" if no new frame arrived at all, "none found" if new frames arrive but
+    without the data, otherwise the slowest stage of the newest frame.
+
+    Args:
+        paths_deadlines (tuple[float, float, float] | None): The deadlines (seconds) for
+            HOLD_LANE, EASE_THROTTLE and STOP_STEERING, None uses the config.
+        objects_deadline (float): The deadline (seconds) for the road objects, 0 uses the config.
+    """
+
+    def __init__(self, paths_deadlines: tuple[float, float, float] | None = None, objects_deadline: float = 0) -> None:
+        self.paths_deadlines: tuple[float, float, float] = paths_deadlines or (
+            globals.PROTECTION_HOLD_LANE_MS / 1000,
+            globals.PROTECTION_EASE_THROTTLE_MS / 1000,
+            globals.PROTECTION_STOP_STEERING_MS / 1000,
+        )
+        self.objects_deadline: float = objects_deadline or globals.PROTECTION_OBJECTS_MS / 1000
+
+        # capture time of the newest data, None until the first one arrived
+        self.paths_timestamp: float | None = None
+        self.objects_timestamp: float | None = None
+        # capture time, stage timings and arrival of the newest frame
+        self.frame_timestamp: float = 0.0
+        self.timings: dict[str, float] = {}
+        self.arrival: float = 0.0
+
+        self.mode: DegradedMode = DegradedMode.NORMAL
+        # the deadlines that are currently crossed, so every miss is logged once
+        self.crossed: set[tuple[str, int]] = set()
+        self.misses: deque[DeadlineMiss] = deque(maxlen=1000)
+        self.miss_count: int = 0
+
+    def observe(
+        self,
+        timestamp: float,
+        has_paths: bool,
+        has_road_objects: bool,
+        timings: dict[str, float] | None = None,
+    ) -> None:
+        """
+        Register the annotations of a new frame.
+
+        Args:
+            timestamp (float): The capture time of the frame (time.perf_counter).
+            has_paths (bool): True if the frame has paths.
+            has_road_objects (bool): True if the frame has road objects.
+            timings (dict[str, float] | None): The runtime of each pipeline stage in seconds.
+        """
+
+        if has_paths:
+            self.paths_timestamp = timestamp
+        if has_road_objects:
+            self.objects_timestamp = timestamp
+        self.frame_timestamp = timestamp
+        self.timings = timings or {}
+        self.arrival = time.perf_counter()
+
+    def check(self, now: float | None = None) -> DegradedMode:
+        """
+        Return the mode for the current age of the data, log the deadlines that were crossed.
+
+        Args:
+            now (float | None): The current time (time.perf_counter), None uses the clock.
+
+        Returns:
+            DegradedMode: The current mode.
+        """
+
+        now = time.perf_counter() if now is None else now
+        mode: DegradedMode = DegradedMode.NORMAL
+
+        # nothing arrived yet, there is nothing to steer on
+        if self.paths_timestamp is None:
+            self.mode = DegradedMode.STOP_STEERING
+            return self.mode
+
+        paths_age: float = now - self.paths_timestamp
+        for level, deadline in enumerate(self.paths_deadlines, start=1):
+            if paths_age > deadline:
+                mode = DegradedMode(level)
+                self.miss(kind="paths", level=level, deadline=deadline, age=paths_age, now=now)
+            else:
+                self.crossed.discard(("paths", level))
+
+        if self.objects_timestamp is not None:
+            objects_age: float = now - self.objects_timestamp
+            if objects_age > self.objects_deadline:
+                mode = max(mode, DegradedMode.EASE_THROTTLE)
+                self.miss(
+                    kind="road_objects",
+                    level=DegradedMode.EASE_THROTTLE,
+                    deadline=self.objects_deadline,
+                    age=objects_age,
+                    now=now,
+                )
+            else:
+                self.crossed.discard(("road_objects", DegradedMode.EASE_THROTTLE))
+
+        self.mode = mode
+        return mode
+
+    def miss(self, kind: str, level: int, deadline: float, age: float, now: float) -> None:
+        """
+        Log a crossed deadline, only the first time it is crossed.
+        """
+
+        if (kind, level) in self.crossed:
+            return
+        self.crossed.add((kind, level))
+
+        miss = DeadlineMiss(
+            kind=kind,
+            deadline=deadline,
+            age=age,
+            stage=self.cause(kind=kind, now=now),
+            mode=DegradedMode(level),
+            timestamp=now,
+        )
+        self.misses.append(miss)
+        self.miss_count += 1
+        print(f"Warning: {miss}")
+
+    def cause(self, kind: str, now: float) -> str:
+        """
+        Return the stage that is most likely responsible for the old data.
+        """
+
+        # no new frame in the time the deadline allows, the perception hangs somewhere
+        if now - self.arrival > self.paths_deadlines[0] or not self.timings:
+            return "stalled"
+
+        # new frames arrive, but the newest one has nothing of this kind
+        timestamp: float | None = self.paths_timestamp if kind == "paths" else self.objects_timestamp
+        if timestamp is not None and timestamp < self.frame_timestamp:
+            return f"{kind} (none found)"
+
+        stages: dict[str, float] = {stage: t for stage, t in self.timings.items() if stage != "total"}
+        if not stages:
+            return "stalled"
+        return max(stages, key=lambda stage: stages[stage])
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the current mode and the number of missed deadlines.
+        """
+
+        return {"protection_mode": int(self.mode), "protection_misses": self.miss_count}
@@ -0,0 +1,10 @@
+from configs import Config
+from driver import Runtime
+
+if __name__ == "__main__":
+    # load the config
+    Config(conf_file="configs/debug_default.conf")
+
+    # runs until Ctrl+C
+    stats: dict[str, float] = Runtime().run()
+    print(f"Runtime stopped: {stats}")
@@ -0,0 +1,173 @@
+#
+# Compare the post-processing of the direction and the road segments at a reduced analysis scale with the full
+# resolution on recorded footage: the bias, the on-lane ratio, the fitted and the planned paths, and the time.
+# Run from the project root: python -m tools.run_analysis_accuracy ...
+#
+
+import sys
+import time
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
+
+from aetd_modules import (
+    DirectionExtractor,
+    FrameContext,
+    Path,
+    PathPlanner,
+    PathsBox,
+    RoadSegmentsBox,
+    RoadSegmentsExtractor,
+)
+from configs import Config, ConfigSnapshot, current
+from models import IndexedVideoReader
+from models.model import path_deviation
+
+from .run_replay import load_results
+
+
+def snapshot(scale: float) -> ConfigSnapshot:
+    """
+    Return the loaded config with both analysis scales set to the scale.
+    """
+
+    values = dict(current().values)
+    values["DIRECTION_EXTRACTION_ANALYSIS_SCALE"] = scale
+    values["ROADSEGMENT_EXTRACTION_ANALYSIS_SCALE"] = scale
+    return ConfigSnapshot(values=values)
+
+
+def deviations(paths: list[Path], golden: list[Path]) -> list[float]:
+    """
+    Return the deviation of every path to the path at the same position of the full
+    resolution, in pixels.
+    """
+
+    return [
+        path_deviation(path_f=path.f, golden_f=golden_path.f, value_range=golden_path.value_range)
+        for path, golden_path in zip(paths, golden)
+    ]
+
+
+def summary(values: list[float], unit: str) -> str:
+    if not values:
+        return "no values"
+    array: NDArray[np.float64] = np.asarray(values, dtype=np.float64)
+    return f"mean {np.mean(array):.2f}{unit}, p95 {np.percentile(array, 95):.2f}{unit}, max {np.max(array):.2f}{unit}"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in [4, 5]:
+        print(
+            "Usage: python -m tools.run_analysis_accuracy\n"
+            "\t<video_source: str>\n"
+            "\t<results: str (folder and basename of the precalculated results, e.g. models/precalculated/drive)>\n"
+            "\t<scale: float (e.g. 0.5 or 0.25)>\n"
+            "\t[<frames: int>]"
+        )
+        sys.exit(1)
+
+    video_src: str = sys.argv[1]
+    results_path: str = sys.argv[2]
+    scale: float = float(sys.argv[3])
+    frames: int = int(sys.argv[4]) if len(sys.argv) == 5 else sys.maxsize
+
+    # the recognized command line inputs
+    print(f"Video Source: {video_src}")
+    print(f"Results: {results_path}")
+    print(f"Scale: {scale}")
+
+    Config(conf_file="configs/debug_default.conf")
+    results: dict[str, dict[str, Results]] = load_results(results=results_path)
+    configs: dict[str, ConfigSnapshot] = {"full": snapshot(scale=1.0), "scaled": snapshot(scale=scale)}
+    segments_extractor = RoadSegmentsExtractor(only_results=True)
+    path_planner = PathPlanner()
+
+    # time in seconds by step and config
+    times: dict[str, dict[str, float]] = {
+        "direction": {"full": 0.0, "scaled": 0.0},
+        "segments": {"full": 0.0, "scaled": 0.0},
+    }
+    bias: list[float] = []
+    on_lane: list[float] = []
+    directions_equal: int = 0
+    segment_counts_equal: int = 0
+    segment_deviations: list[float] = []
+    planned_equal: int = 0
+    planned_deviations: list[float] = []
+
+    cap = cv2.VideoCapture(video_src)
+    frame: int = 0
+    compared: int = 0
+
+    while compared < frames:
+        ret, img = cap.read()
+        if not ret:
+            break
+        key: str = IndexedVideoReader.key(frame=frame)
+        frame += 1
+        if key not in results["seg"]:
+            continue
+
+        measured: dict[str, tuple[int, float]] = {}
+        segments: dict[str, RoadSegmentsBox] = {}
+        planned: dict[str, PathsBox | None] = {}
+        for name, config in configs.items():
+            context = FrameContext(img=img, config=config)
+
+            start: float = time.perf_counter()
+            measured[name] = DirectionExtractor.analyze(frame=context)
+            times["direction"][name] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            box: RoadSegmentsBox | None = segments_extractor.process(img=img, result=results["seg"][key], frame=context)
+            times["segments"][name] += time.perf_counter() - start
+            segments[name] = box if box is not None else RoadSegmentsBox()
+            planned[name] = path_planner.process(
+                road_segment_box=segments[name], width=img.shape[1], height=img.shape[0]
+            )
+
+        (full_weight, full_on_lane), (weight, lane) = measured["full"], measured["scaled"]
+        bias.append(abs(weight - full_weight))
+        on_lane.append(abs(lane - full_on_lane))
+        directions_equal += DirectionExtractor.determineDirection(
+            weight=weight, on_lane=lane
+        ) == DirectionExtractor.determineDirection(weight=full_weight, on_lane=full_on_lane)
+
+        # the segments are compared by position, only if no segment was dropped or added
+        full_box, box = segments["full"], segments["scaled"]
+        if len(box) == len(full_box) and np.array_equal(box.kind, full_box.kind):
+            segment_counts_equal += 1
+            segment_deviations += deviations(
+                paths=[box.path(i) for i in range(len(box))], golden=[full_box.path(i) for i in range(len(full_box))]
+            )
+
+        full_paths, paths = planned["full"], planned["scaled"]
+        if (paths is None) == (full_paths is None) and len(paths or []) == len(full_paths or []):
+            planned_equal += 1
+            planned_deviations += deviations(paths=list(paths or []), golden=list(full_paths or []))
+
+        compared += 1
+    cap.release()
+
+    if compared == 0:
+        print("No frames with precalculated results.")
+        sys.exit(1)
+
+    # ---------------------------------- Report ------------------------------------
+    print(f"Frames: {compared}")
+    print(f"Direction bias deviation: {summary(bias, ' %')}")
+    print(f"On-lane ratio deviation: {summary(on_lane, '')}")
+    print(f"Same direction: {directions_equal} of {compared}")
+    print(f"Same road segments: {segment_counts_equal} of {compared}")
+    print(f"Segment path deviation: {summary(segment_deviations, ' px')}")
+    print(f"Same number of planned paths: {planned_equal} of {compared}")
+    print(f"Planned path deviation: {summary(planned_deviations, ' px')}")
+    for step, step_times in times.items():
+        print(
+            f"{step.capitalize()}: full {step_times['full'] / compared * 1000:.2f} ms, "
+            f"scaled {step_times['scaled'] / compared * 1000:.2f} ms, "
+            f"{step_times['full'] / max(step_times['scaled'], 1e-9):.1f}x"
+        )
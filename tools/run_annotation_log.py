@@ -0,0 +1,48 @@
+#
+# Query an annotation log: the frames above a speed with a traffic light in view, and the time the query takes.
+# Run from the project root: python -m tools.run_annotation_log ...
+#
+
+import sys
+import time
+
+import numpy as np
+from numpy.typing import NDArray
+
+from aetd_modules import TrafficLight
+from driver import AnnotationLogReader, PerceptionResult
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m tools.run_annotation_log\n\t<log_dir: str>\n\t<min_speed: int>")
+        sys.exit(1)
+
+    log_dir: str = sys.argv[1]
+    min_speed: int = int(sys.argv[2])
+
+    # the recognized command line inputs
+    print(f"Log: {log_dir}")
+    print(f"Minimum Speed: {min_speed}")
+
+    log = AnnotationLogReader(path=log_dir)
+    print(f"Frames: {len(log)}")
+    if len(log) == 0:
+        sys.exit(0)
+    print(f"Duration: {log.index['timestamp'][-1] - log.index['timestamp'][0]:.1f}s")
+
+    # the filter only reads the index
+    start: float = time.perf_counter()
+    selection: NDArray[np.bool_] = (log.index["speed"] > min_speed) & log.has_kind(kind=TrafficLight.KIND)
+    filter_time: float = time.perf_counter() - start
+
+    # only the selected frames are decoded
+    start = time.perf_counter()
+    results: list[PerceptionResult] = list(log.scan(selection=selection))
+    decode_time: float = time.perf_counter() - start
+
+    print(f"Frames with speed > {min_speed} and a traffic light: {len(results)}")
+    print(f"Filter: {filter_time * 1000:.2f} ms, decode: {decode_time * 1000:.2f} ms")
+    for result in results[:10]:
+        print(f"  frame {result.frame_id}: speed {result.speed}, {len(result.road_objects or [])} road objects")
+
+    log.close()
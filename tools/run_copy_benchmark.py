@@ -0,0 +1,114 @@
+#
+# Measure how many bytes of image data are copied per frame, in the Pipeline and in the drawing.
+# Run from the project root: python -m tools.run_copy_benchmark ...
+#
+
+import sys
+import threading
+from collections.abc import Callable
+from types import FrameType
+from typing import Any
+
+import cv2
+import numpy as np
+
+from aetd_modules import AnnotationsContainer, Compositor, Draw, Pipeline
+from configs import Config
+
+
+class CopyCounter:
+    """
+    Counts the bytes of every ndarray.copy call, in all threads, while it is active.
+    Copies made inside of OpenCV or by np.array are not seen.
+    """
+
+    def __init__(self) -> None:
+        self.bytes: int = 0
+        self.copies: int = 0
+        self.lock = threading.Lock()
+
+    def profile(self, frame: FrameType, event: str, arg: Any) -> None:
+        if event == "c_call" and getattr(arg, "__name__", "") == "copy":
+            owner: Any = getattr(arg, "__self__", None)
+            if isinstance(owner, np.ndarray):
+                with self.lock:
+                    self.bytes += owner.nbytes
+                    self.copies += 1
+
+    def measure(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> tuple[Any, int, int]:
+        """
+        Call fn and return its result, the copied bytes and the number of copies.
+        """
+
+        self.bytes = 0
+        self.copies = 0
+        threading.setprofile(self.profile)
+        sys.setprofile(self.profile)
+        try:
+            result: Any = fn(*args, **kwargs)
+        finally:
+            sys.setprofile(None)
+            threading.setprofile(None)  # pyright: ignore[reportArgumentType]
+        return result, self.bytes, self.copies
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m tools.run_copy_benchmark\n\t<video_source: str>\n\t<frames: int>")
+        sys.exit(1)
+
+    video_src: str = sys.argv[1]
+    frames: int = int(sys.argv[2])
+
+    # the recognized command line inputs
+    print(f"Video Source: {video_src}")
+    print(f"Frames: {frames}")
+
+    Config(conf_file="configs/debug_default.conf")
+    pipeline = Pipeline()
+    compositor = Compositor()
+    counter = CopyCounter()
+
+    cap = cv2.VideoCapture(video_src)
+    totals: dict[str, list[int]] = {"pipeline": [0, 0], "draw": [0, 0], "compositor": [0, 0]}
+    frame_bytes: int = 0
+    processed: int = 0
+
+    while processed < frames:
+        ret, img = cap.read()
+        if not ret:
+            break
+        frame_bytes = img.nbytes
+
+        annotations: AnnotationsContainer
+        annotations, copied, copies = counter.measure(pipeline.process, img=img, img_name=str(processed))
+        totals["pipeline"][0] += copied
+        totals["pipeline"][1] += copies
+
+        # the reference drawing and the compositor, each on a fresh container
+        for name, draw in (("draw", Draw.draw), ("compositor", compositor.draw)):
+            container = AnnotationsContainer(img=annotations.original_img, img_name=annotations.original_img_name)
+            container.speed = annotations.speed
+            container.direction = annotations.direction
+            container.road_objects = annotations.road_objects
+            container.road_segments = annotations.road_segments
+            container.paths = annotations.paths
+            container.config = annotations.config
+            _, copied, copies = counter.measure(draw, annotations=container)
+            totals[name][0] += copied
+            totals[name][1] += copies
+
+        processed += 1
+    cap.release()
+
+    if processed == 0:
+        print("No frames read.")
+        sys.exit(1)
+
+    print(f"Frame size: {frame_bytes / 1e6:.2f} MB")
+    print(f"{'stage':<12}{'MB/frame':>10}{'frames/frame':>14}{'copies/frame':>14}")
+    for name, (copied, copies) in totals.items():
+        print(
+            f"{name:<12}{copied / processed / 1e6:>10.2f}{copied / processed / frame_bytes:>14.2f}"
+            f"{copies / processed:>14.1f}"
+        )
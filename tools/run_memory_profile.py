@@ -0,0 +1,116 @@
+#
+# Profile the memory of the frame loop: the bytes every stage allocates and its peak per frame, the lines that
+# allocate the most and how the memory of the process develops over the replay. With precalculated results the
+# models are not run, the profile is the one of the post-processing.
+# Run from the project root: python -m tools.run_memory_profile ...
+#
+
+import sys
+
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
+
+from aetd_modules import AnnotationsContainer, Draw, MemoryProfiler, Pipeline
+from configs import Config
+from models import IndexedVideoReader
+
+from .run_replay import load_results
+
+# the number of allocation sites printed
+TOP_SITES: int = 15
+MB: float = 1024 * 1024
+
+
+def trend(values: list[int]) -> str:
+    """
+    Describe the development of a memory series: the mean of the first and the last
+    quarter of the frames and the slope of a line fit in KB per frame.
+    """
+
+    series: NDArray[np.float64] = np.asarray(values, dtype=np.float64)
+    quarter: int = max(1, len(series) // 4)
+    slope: float = float(np.polyfit(np.arange(len(series)), series, 1)[0]) if len(series) > 1 else 0.0
+    return (
+        f"first quarter {np.mean(series[:quarter]) / MB:.1f} MB, last quarter {np.mean(series[-quarter:]) / MB:.1f} MB, "
+        f"{slope / 1024:+.1f} KB/frame"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in [3, 4]:
+        print(
+            "Usage: python -m tools.run_memory_profile\n"
+            "\t<video_source: str>\n"
+            "\t<frames: int>\n"
+            "\t[<results: str (folder and basename of the precalculated results, e.g. models/precalculated/drive)>]"
+        )
+        sys.exit(1)
+
+    video_src: str = sys.argv[1]
+    frames: int = int(sys.argv[2])
+    results_path: str = sys.argv[3] if len(sys.argv) == 4 else ""
+
+    # the recognized command line inputs
+    print(f"Video Source: {video_src}")
+    print(f"Frames: {frames}")
+    print(f"Results: {results_path or 'models'}")
+
+    Config(conf_file="configs/debug_default.conf")
+    results: dict[str, dict[str, Results]] = load_results(results=results_path) if results_path else {}
+    profiler = MemoryProfiler()
+    pipeline = Pipeline(
+        only_cls_results=bool(results),
+        only_seg_results=bool(results),
+        only_det_results=bool(results),
+        memory_profiler=profiler,
+    )
+
+    cap = cv2.VideoCapture(video_src)
+    frame: int = 0
+    processed: int = 0
+
+    profiler.start()
+    while processed < frames:
+        ret, img = cap.read()
+        if not ret:
+            break
+        key: str = IndexedVideoReader.key(frame=frame)
+        frame += 1
+
+        if results and any(key not in results[task] for task in ["det", "seg", "cls"]):
+            continue
+
+        annotations: AnnotationsContainer = pipeline.process(
+            img=img,
+            img_name=key,
+            detect_result=results["det"][key] if results else None,
+            cls_result=results["cls"][key] if results else None,
+            seg_result=results["seg"][key] if results else None,
+        )
+        profiler.measure("draw", Draw.draw, annotations=annotations)
+        profiler.end_frame()
+        processed += 1
+    profiler.stop()
+    cap.release()
+
+    if processed == 0:
+        print("No frames profiled.")
+        sys.exit(1)
+
+    # ---------------------------------- Report ------------------------------------
+    print(f"Frames: {processed}")
+    print(f"{'stage':<16}{'allocated MB':>14}{'peak MB':>10}{'max peak MB':>13}{'retained MB':>13}")
+    for stage, memory in profiler.stages().items():
+        mean: NDArray[np.float64] = memory.mean(axis=0) / MB
+        print(f"{stage:<16}{mean[0]:>14.2f}{mean[1]:>10.2f}{memory[:, 1].max() / MB:>13.2f}{mean[2]:>13.3f}")
+
+    print(f"Top {TOP_SITES} allocation sites (MB over all frames):")
+    for stage, site, allocated in profiler.top_sites(limit=TOP_SITES):
+        print(f"  {allocated / MB:>10.1f}  {stage:<16}{site}")
+
+    # memory that grows over the replay is held on to between the frames
+    print(f"Traced memory: {trend(profiler.traced)}")
+    if profiler.rss[-1] > 0:
+        print(f"Peak RSS: {trend(profiler.rss)}")
@@ -0,0 +1,296 @@
+#
+# Compare the fp32 and the int8 model on a labeled or precalculated set of images.
+# Run from the project root: python -m tools.run_quantization_eval ...
+#
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+from numpy.typing import NDArray
+from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
+
+from aetd_modules import PathPlanner, PathsBox, RoadSegmentsExtractor
+from models import ImageLoader, OnnxBackend, PreCalculatedLoader
+from models.model import THRESHOLDS, box_iou, path_deviation
+
+RESULT_KEYS: dict[str, str] = {"detect": "det", "segment": "seg", "classify": "cls"}
+
+
+class Annotation:
+    """
+    The boxes, classes, scores and polygons of one image in a common format.
+    """
+
+    def __init__(
+        self,
+        xyxy: NDArray[np.float32],
+        cls: NDArray[np.int32],
+        conf: NDArray[np.float32],
+        polygons: list[NDArray[np.float32]],
+        top1: int | None = None,
+    ) -> None:
+        self.xyxy: NDArray[np.float32] = xyxy
+        self.cls: NDArray[np.int32] = cls
+        self.conf: NDArray[np.float32] = conf
+        self.polygons: list[NDArray[np.float32]] = polygons
+        self.top1: int | None = top1
+
+    @staticmethod
+    def from_result(result: Results) -> "Annotation":
+        if result.probs is not None:
+            return Annotation(
+                xyxy=np.zeros((0, 4), np.float32),
+                cls=np.zeros(0, np.int32),
+                conf=np.zeros(0, np.float32),
+                polygons=[],
+                top1=int(result.probs.top1),  # type: ignore
+            )
+        return Annotation(
+            xyxy=result.boxes.xyxy.cpu().numpy().astype(np.float32),  # type: ignore
+            cls=result.boxes.cls.cpu().numpy().astype(np.int32),  # type: ignore
+            conf=result.boxes.conf.cpu().numpy().astype(np.float32),  # type: ignore
+            polygons=list(result.masks.xy) if result.masks is not None else [],  # type: ignore
+        )
+
+    @staticmethod
+    def from_label(path: str, width: int, height: int, top_crop: int) -> "Annotation":
+        """
+        Read a label file in the YOLO format (boxes "cls cx cy w h" or polygons "cls x1 y1 x2 y2 ...").
+        The coordinates are normalized to the uncropped image.
+        """
+
+        xyxy: list[list[float]] = []
+        cls: list[int] = []
+        polygons: list[NDArray[np.float32]] = []
+        full_height: int = height + top_crop
+
+        with open(file=path, mode="r", encoding="utf-8") as f:
+            for line in f:
+                values: list[float] = [float(v) for v in line.split()]
+                if len(values) < 5:
+                    continue
+                coords = np.array(values[1:], dtype=np.float32)
+                if len(coords) == 4:
+                    cx, cy, w, h = coords
+                    pts = np.array([[cx - w / 2, cy - h / 2], [cx + w / 2, cy + h / 2]], dtype=np.float32)
+                else:
+                    pts = coords.reshape(-1, 2)
+                pts = pts * np.array([width, full_height], dtype=np.float32) - np.array([0, top_crop], np.float32)
+                xyxy.append([pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max()])
+                cls.append(int(values[0]))
+                if len(coords) > 4:
+                    polygons.append(pts)
+
+        return Annotation(
+            xyxy=np.array(xyxy, dtype=np.float32).reshape(-1, 4),
+            cls=np.array(cls, dtype=np.int32),
+            conf=np.ones(len(cls), dtype=np.float32),
+            polygons=polygons,
+        )
+
+
+def mean_average_precision(preds: list[Annotation], refs: list[Annotation], iou_thr: float = 0.5) -> float:
+    """
+    Box mAP over all classes of the reference (all-point interpolation).
+    """
+
+    aps: list[float] = []
+    for c in np.unique(np.concatenate([ref.cls for ref in refs] + [np.zeros(0, np.int32)])):
+        n_refs: int = sum(int(np.sum(ref.cls == c)) for ref in refs)
+
+        # collect (conf, is_true_positive) of all predictions of the class
+        scored: list[tuple[float, bool]] = []
+        for pred, ref in zip(preds, refs):
+            pred_idx = np.where(pred.cls == c)[0]
+            ref_idx = np.where(ref.cls == c)[0]
+            ious = box_iou(pred.xyxy[pred_idx], ref.xyxy[ref_idx])
+            for i in np.argsort(-pred.conf[pred_idx]):
+                j = int(np.argmax(ious[i])) if len(ref_idx) else -1
+                hit: bool = j >= 0 and bool(ious[i, j] >= iou_thr)
+                if hit:
+                    ious[:, j] = 0
+                scored.append((float(pred.conf[pred_idx][i]), hit))
+
+        scored.sort(key=lambda s: -s[0])
+        tp = np.cumsum([hit for _, hit in scored], dtype=np.float64)
+        recall = np.concatenate([[0.0], tp / max(n_refs, 1), [1.0]])
+        precision = np.concatenate([[1.0], tp / np.arange(1, len(scored) + 1), [0.0]])
+        precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+        aps.append(float(np.sum(np.diff(recall) * precision[1:])))
+
+    return float(np.mean(aps)) if aps else 0.0
+
+
+def mean_mask_iou(preds: list[Annotation], refs: list[Annotation], shape: tuple[int, int]) -> float:
+    """
+    Mean IoU of the masks of matching instances (box IoU >= 0.5 and same class).
+    """
+
+    ious: list[float] = []
+    for pred, ref in zip(preds, refs):
+        if not pred.polygons or not ref.polygons:
+            continue
+        box_ious = box_iou(pred.xyxy, ref.xyxy)
+        box_ious[pred.cls[:, None] != ref.cls[None, :]] = 0
+        for i in range(len(pred.polygons)):
+            j = int(np.argmax(box_ious[i]))
+            if box_ious[i, j] < 0.5 or j >= len(ref.polygons):
+                continue
+            pred_mask: MatLike = np.zeros(shape, dtype=np.uint8)
+            ref_mask: MatLike = np.zeros(shape, dtype=np.uint8)
+            cv2.fillPoly(img=pred_mask, pts=[pred.polygons[i].astype(np.int32)], color=1)
+            cv2.fillPoly(img=ref_mask, pts=[ref.polygons[j].astype(np.int32)], color=1)
+            union = np.logical_or(pred_mask, ref_mask).sum()
+            ious.append(float(np.logical_and(pred_mask, ref_mask).sum() / union) if union else 1.0)
+            box_ious[:, j] = 0
+
+    return float(np.mean(ious)) if ious else 0.0
+
+
+def plans_deviation(paths: PathsBox | None, ref_paths: PathsBox | None) -> float | None:
+    """
+    Mean over the reference paths of the largest deviation to the closest planned path, in pixels.
+    """
+
+    if not paths or not ref_paths:
+        return None
+
+    deviations: list[float] = []
+    for ref_path in ref_paths:
+        deviations.append(
+            min(path_deviation(path_f=path.f, golden_f=ref_path.f, value_range=ref_path.value_range) for path in paths)
+        )
+
+    return float(np.mean(deviations))
+
+
+def plan_paths(img: MatLike, result: Results) -> PathsBox | None:
+    """
+    Run the segments extractor and the path planner on a segmentation result.
+    """
+
+    road_segments = RoadSegmentsExtractor(only_results=True).process(img=img, result=result)
+    if road_segments is None:
+        return None
+    return PathPlanner().process(road_segment_box=road_segments, width=img.shape[1], height=img.shape[0])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in [6, 7]:
+        print(
+            "Usage: python -m tools.run_quantization_eval\n"
+            "\t<input_folder: str>\n"
+            "\t<top_crop: int>\n"
+            "\t<task: detect | segment | classify>\n"
+            "\t<fp32_model_path: str>\n"
+            "\t<int8_model_path: str>\n"
+            "\t[<reference: str (precalculated .pkl or YOLO labels folder), defaults to the fp32 outputs>]"
+        )
+        sys.exit(1)
+
+    input_folder: str = sys.argv[1]
+    top_crop: int = int(sys.argv[2])
+    task: str = sys.argv[3]
+    fp32_model_path: str = sys.argv[4]
+    int8_model_path: str = sys.argv[5]
+    reference: str | None = sys.argv[6] if len(sys.argv) == 7 else None
+    conf, iou = THRESHOLDS[task]
+
+    # the recognized command line inputs
+    print(f"Input folder: {input_folder}")
+    print(f"Top crop: {top_crop}")
+    print(f"Task: {task}")
+    print(f"FP32 model path: {fp32_model_path}")
+    print(f"INT8 model path: {int8_model_path}")
+    print(f"Reference: {reference or 'fp32 outputs'}")
+    print("Loading models and images...")
+
+    backends: dict[str, OnnxBackend] = {
+        "fp32": OnnxBackend(pretrained_model_path=fp32_model_path, device="cpu", task=task),
+        "int8": OnnxBackend(pretrained_model_path=int8_model_path, device="cpu", task=task),
+    }
+
+    precalculated: dict[str, Results] = {}
+    if reference is not None and reference.endswith(".pkl"):
+        key: str = RESULT_KEYS[task]
+        loaded = PreCalculatedLoader.load_results(
+            input_folder=os.path.dirname(reference), **{f"base_name_{key}": os.path.basename(reference)}
+        )[key]
+        precalculated = dict(loaded or [])
+
+    annotations: dict[str, list[Annotation]] = {"fp32": [], "int8": [], "reference": []}
+    durations: dict[str, float] = {"fp32": 0.0, "int8": 0.0}
+    deviations: dict[str, list[float]] = {"fp32": [], "int8": []}
+    shape: tuple[int, int] = (0, 0)
+
+    for basename, img in ImageLoader(input_folder=input_folder):
+        img = img[top_crop:, :, :]
+        shape = (img.shape[0], img.shape[1])
+        # pick the reference of the image, an image without one is skipped before it is timed
+        ref_result: Results | None = None
+        if reference is not None and reference.endswith(".pkl"):
+            ref_result = precalculated.get(basename)
+            if ref_result is None:
+                print(f"Warning: No reference for {basename}. Skipping.")
+                continue
+
+        results: dict[str, Results] = {}
+        for name, backend in backends.items():
+            start: float = time.perf_counter()
+            results[name] = backend.predict(imgs=[img], conf=conf, iou=iou)[0]
+            durations[name] += time.perf_counter() - start
+            annotations[name].append(Annotation.from_result(result=results[name]))
+
+        if reference is None:
+            ref_result = results["fp32"]
+        elif not reference.endswith(".pkl"):
+            label_path: str = os.path.join(reference, os.path.splitext(basename)[0] + ".txt")
+            annotations["reference"].append(
+                Annotation.from_label(path=label_path, width=shape[1], height=shape[0], top_crop=top_crop)
+                if os.path.isfile(label_path)
+                else Annotation(np.zeros((0, 4), np.float32), np.zeros(0, np.int32), np.zeros(0, np.float32), [])
+            )
+        if ref_result is not None:
+            annotations["reference"].append(Annotation.from_result(result=ref_result))
+
+        # the lane paths can only be compared with a segmentation result as reference
+        if task == "segment" and ref_result is not None:
+            ref_paths: PathsBox | None = plan_paths(img=img, result=ref_result)
+            for name in backends:
+                deviation: float | None = plans_deviation(
+                    paths=plan_paths(img=img, result=results[name]), ref_paths=ref_paths
+                )
+                if deviation is not None:
+                    deviations[name].append(deviation)
+
+    # every frame with a reference is timed, the throughput is over these frames
+    n_frames: int = len(annotations["reference"])
+    if n_frames == 0:
+        print("No frames to evaluate.")
+        sys.exit(1)
+
+    # ---------------------------------- Report ------------------------------------
+    report: dict[str, dict[str, float]] = {}
+    for name in backends:
+        metrics: dict[str, float] = {"throughput_fps": n_frames / max(durations[name], 1e-9)}
+        if task == "classify":
+            metrics["top1_agreement"] = float(
+                np.mean([pred.top1 == ref.top1 for pred, ref in zip(annotations[name], annotations["reference"])])
+            )
+        else:
+            metrics["box_map50"] = mean_average_precision(preds=annotations[name], refs=annotations["reference"])
+        if task == "segment":
+            metrics["mask_iou"] = mean_mask_iou(preds=annotations[name], refs=annotations["reference"], shape=shape)
+            metrics["path_deviation_px"] = float(np.mean(deviations[name])) if deviations[name] else float("nan")
+        report[name] = metrics
+
+    print(f"\nEvaluated {n_frames} frames")
+    print(f"{'metric':<22}{'fp32':>12}{'int8':>12}{'delta':>12}")
+    for metric in report["fp32"]:
+        fp32_value: float = report["fp32"][metric]
+        int8_value: float = report["int8"][metric]
+        print(f"{metric:<22}{fp32_value:>12.4f}{int8_value:>12.4f}{int8_value - fp32_value:>+12.4f}")
@@ -0,0 +1,270 @@
+#
+# Replay a video with its precalculated model results through the Pipeline and compare every frame with the
+# golden outputs, an annotation log of an earlier run. Without golden outputs they are recorded. The replay
+# runs as fast as possible (throughput) or paced at the fps of the video (deadline misses).
+# Run from the project root: python -m tools.run_replay ...
+#
+
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+from numpy.typing import NDArray
+from ultralytics.engine.results import Results  # pyright: ignore[reportMissingTypeStubs]
+
+from aetd_modules import AnnotationsContainer, PathsBox, Pipeline, RoadObjectsBox
+from configs import Config
+from driver import AnnotationLog, AnnotationLogReader, PerceptionResult
+from models import IndexedVideoReader, PreCalculatedLoader
+from models.model import path_deviation
+
+MODES: list[str] = ["max", "realtime"]
+# the number of differences printed per frame
+MAX_DIFFERENCES: int = 5
+# the number of frames decoded ahead
+PREFETCH: int = 8
+
+
+def decode(cap: cv2.VideoCapture, frames: "queue.Queue[tuple[int, MatLike] | None]") -> None:
+    """
+    Decode the video into the queue, None marks the end.
+    """
+
+    frame: int = 0
+    while True:
+        ret, img = cap.read()
+        if not ret:
+            break
+        frames.put((frame, img))
+        frame += 1
+    frames.put(None)
+
+
+def load_results(results: str) -> dict[str, dict[str, Results]]:
+    """
+    Load the precalculated results of run_full_video.py, by task and frame key.
+    """
+
+    basename: str = os.path.basename(results)
+    loaded = PreCalculatedLoader.load_results(
+        input_folder=os.path.dirname(results),
+        base_name_cls=f"{basename}_cls_results.pkl",
+        base_name_det=f"{basename}_det_results.pkl",
+        base_name_seg=f"{basename}_seg_results.pkl",
+    )
+    return {task: dict(task_results or []) for task, task_results in loaded.items()}
+
+
+def compare_objects(objects: RoadObjectsBox | None, golden: RoadObjectsBox | None, box_tolerance: int) -> list[str]:
+    if (objects is None) != (golden is None):
+        return [f"road objects {'missing' if objects is None else 'not expected'}"]
+    if objects is None or golden is None:
+        return []
+    if len(objects) != len(golden):
+        return [f"{len(objects)} road objects, expected {len(golden)}"]
+
+    differences: list[str] = []
+    if not np.array_equal(objects.kind, golden.kind) or not np.array_equal(objects.cls, golden.cls):
+        differences.append(f"road object classes {objects.cls.tolist()}, expected {golden.cls.tolist()}")
+    deviation: int = int(np.max(np.abs(objects.xyxy - golden.xyxy), initial=0))
+    if deviation > box_tolerance:
+        differences.append(f"road object boxes deviate {deviation} px > {box_tolerance} px")
+    return differences
+
+
+def compare_paths(paths: PathsBox | None, golden: PathsBox | None, path_tolerance: float) -> list[str]:
+    if (paths is None) != (golden is None):
+        return [f"paths {'missing' if paths is None else 'not expected'}"]
+    if paths is None or golden is None:
+        return []
+    if len(paths) != len(golden):
+        return [f"{len(paths)} paths, expected {len(golden)}"]
+
+    differences: list[str] = []
+    for i, (path, golden_path) in enumerate(zip(paths, golden)):
+        deviation: float = path_deviation(path_f=path.f, golden_f=golden_path.f, value_range=golden_path.value_range)
+        if deviation > path_tolerance:
+            differences.append(f"path {i} deviates {deviation:.2f} px > {path_tolerance} px")
+    return differences
+
+
+def compare(
+    annotations: AnnotationsContainer, golden: PerceptionResult, path_tolerance: float, box_tolerance: int
+) -> list[str]:
+    """
+    Return the differences of the annotations to the golden outputs. The speed, the
+    direction, the classes and the kinds have to be exact, the boxes and the paths
+    may deviate by the tolerances (pixels).
+    """
+
+    differences: list[str] = []
+    if annotations.speed != golden.speed:
+        differences.append(f"speed {annotations.speed}, expected {golden.speed}")
+    if annotations.direction != golden.direction:
+        differences.append(f"direction {annotations.direction}, expected {golden.direction}")
+
+    differences += compare_objects(
+        objects=annotations.road_objects, golden=golden.road_objects, box_tolerance=box_tolerance
+    )
+
+    segments, golden_segments = annotations.road_segments, golden.road_segments
+    if (segments is None) != (golden_segments is None):
+        differences.append(f"road segments {'missing' if segments is None else 'not expected'}")
+    elif segments is not None and golden_segments is not None:
+        if not np.array_equal(segments.kind, golden_segments.kind):
+            differences.append(f"road segments {segments.kind.tolist()}, expected {golden_segments.kind.tolist()}")
+
+    differences += compare_paths(paths=annotations.paths, golden=golden.paths, path_tolerance=path_tolerance)
+    return differences
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in [5, 7]:
+        print(
+            "Usage: python -m tools.run_replay\n"
+            "\t<video_source: str>\n"
+            "\t<results: str (folder and basename of the precalculated results, e.g. models/precalculated/drive)>\n"
+            "\t<golden: str (folder of the golden annotation log, recorded if empty)>\n"
+            "\t<mode: max | realtime>\n"
+            "\t[<path_tolerance_px: float> <box_tolerance_px: int>]"
+        )
+        sys.exit(1)
+
+    video_src: str = sys.argv[1]
+    results_path: str = sys.argv[2]
+    golden_dir: str = sys.argv[3]
+    mode: str = sys.argv[4]
+    path_tolerance: float = float(sys.argv[5]) if len(sys.argv) == 7 else 1.0
+    box_tolerance: int = int(sys.argv[6]) if len(sys.argv) == 7 else 0
+
+    if mode not in MODES:
+        print(f"Error: Unknown mode {mode}, use one of {MODES}.")
+        sys.exit(1)
+
+    # the recognized command line inputs
+    print(f"Video Source: {video_src}")
+    print(f"Results: {results_path}")
+    print(f"Golden: {golden_dir}")
+    print(f"Mode: {mode}")
+    print(f"Path tolerance: {path_tolerance} px")
+    print(f"Box tolerance: {box_tolerance} px")
+
+    Config(conf_file="configs/debug_default.conf")
+    results: dict[str, dict[str, Results]] = load_results(results=results_path)
+    pipeline = Pipeline(only_cls_results=True, only_seg_results=True, only_det_results=True)
+
+    # compare with the golden outputs, or record them
+    golden: AnnotationLogReader | None = None
+    recorder: AnnotationLog | None = None
+    golden_positions: dict[int, int] = {}
+    if os.path.exists(os.path.join(golden_dir, "annotations.index")):
+        golden = AnnotationLogReader(path=golden_dir)
+        golden_positions = {frame_id: i for i, frame_id in enumerate(golden.index["frame_id"].tolist())}
+        print(f"Comparing with {len(golden)} golden frames.")
+    else:
+        recorder = AnnotationLog(path=golden_dir)
+        recorder.start()
+        print("No golden outputs, recording them.")
+
+    cap = cv2.VideoCapture(video_src)
+    fps: float = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_time: float = 1.0 / fps
+
+    processing: list[float] = []
+    lateness: list[float] = []
+    compared: int = 0
+    different: int = 0
+    missing: int = 0
+    skipped: int = 0
+
+    # the frames are decoded ahead on their own thread, the decoding is not part of the replayed time
+    frames: queue.Queue[tuple[int, MatLike] | None] = queue.Queue(maxsize=PREFETCH)
+    threading.Thread(target=decode, args=(cap, frames), name="replay-decoder", daemon=True).start()
+
+    start: float = time.perf_counter()
+    while True:
+        item: tuple[int, MatLike] | None = frames.get()
+        if item is None:
+            break
+        frame, img = item
+        key: str = IndexedVideoReader.key(frame=frame)
+
+        # the frame is released at its time in the video, it is due one frame later
+        release: float = start + frame * frame_time
+        if mode == "realtime":
+            time.sleep(max(0.0, release - time.perf_counter()))
+
+        if key not in results["det"] or key not in results["seg"] or key not in results["cls"]:
+            skipped += 1
+            continue
+
+        frame_start: float = time.perf_counter()
+        annotations: AnnotationsContainer = pipeline.process(
+            img=img,
+            img_name=key,
+            detect_result=results["det"][key],
+            cls_result=results["cls"][key],
+            seg_result=results["seg"][key],
+        )
+        finished: float = time.perf_counter()
+        processing.append(finished - frame_start)
+        lateness.append(finished - (release + frame_time))
+
+        if recorder is not None:
+            recorder.append(annotations=annotations, frame_id=frame, timestamp=release - start)
+        elif golden is not None:
+            position: int | None = golden_positions.get(frame)
+            if position is None:
+                missing += 1
+            else:
+                compared += 1
+                differences: list[str] = compare(
+                    annotations=annotations,
+                    golden=golden[position],
+                    path_tolerance=path_tolerance,
+                    box_tolerance=box_tolerance,
+                )
+                if differences:
+                    different += 1
+                    print(f"Frame {key}: " + "; ".join(differences[:MAX_DIFFERENCES]))
+
+    duration: float = time.perf_counter() - start
+    cap.release()
+
+    if recorder is not None:
+        recorder.stop()
+    if golden is not None:
+        golden.close()
+
+    if not processing:
+        print("No frames replayed.")
+        sys.exit(1)
+
+    # ---------------------------------- Report ------------------------------------
+    times: NDArray[np.float64] = np.asarray(processing) * 1000
+    print(f"Frames: {len(processing)} replayed, {skipped} without precalculated results")
+    print(
+        f"Processing: mean {np.mean(times):.1f} ms, p95 {np.percentile(times, 95):.1f} ms, max {np.max(times):.1f} ms"
+    )
+    if mode == "max":
+        print(f"Throughput: {len(processing) / duration:.1f} fps")
+    else:
+        # a frame that is late delays the next ones, no frame is dropped
+        late: NDArray[np.float64] = np.asarray(lateness) * 1000
+        print(f"Source fps: {fps:.1f}, deadline {frame_time * 1000:.1f} ms")
+        print(f"Frames slower than the deadline: {int(np.sum(times > frame_time * 1000))} of {len(times)}")
+        print(
+            f"Deadline misses: {int(np.sum(late > 0))} of {len(late)}, worst by {max(0.0, float(np.max(late))):.1f} ms"
+        )
+
+    if recorder is not None:
+        print(f"Recorded {recorder.written} golden frames to {golden_dir}")
+    else:
+        print(f"Compared: {compared}, different: {different}, without golden output: {missing}")
+        if different > 0 or missing > 0:
+            sys.exit(2)
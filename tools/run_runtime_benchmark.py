@@ -0,0 +1,48 @@
+#
+# Compare the end-to-end latency and the throughput of the single-process mode and the multi-process Runtime.
+# Run from the project root: python -m tools.run_runtime_benchmark ...
+#
+
+import sys
+
+from configs import Config
+from driver import Runtime, run_single
+
+
+def print_row(mode: str, stats: dict[str, float]) -> None:
+    print(
+        f"{mode:<8}{stats.get('frames', 0):>8.0f}{stats.get('fps', 0.0):>10.2f}"
+        f"{stats.get('latency_p50_ms', 0.0):>12.1f}{stats.get('latency_p95_ms', 0.0):>12.1f}"
+        f"{stats.get('latency_max_ms', 0.0):>12.1f}"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(
+            "Usage: python -m tools.run_runtime_benchmark\n"
+            "\t<capture_backend: screen | video | synthetic>\n"
+            "\t<duration: float (seconds per mode)>"
+        )
+        sys.exit(1)
+
+    capture_backend: str = sys.argv[1]
+    duration: float = float(sys.argv[2])
+
+    # the recognized command line inputs
+    print(f"Capture backend: {capture_backend}")
+    print(f"Duration: {duration}s per mode")
+
+    Config(conf_file="configs/debug_default.conf")
+
+    print("Running the single-process mode...")
+    single: dict[str, float] = run_single(backend=capture_backend, duration=duration)
+    print("Running the multi-process runtime...")
+    runtime = Runtime(backend=capture_backend)
+    multi: dict[str, float] = runtime.run(duration=duration)
+
+    print(f"{'mode':<8}{'frames':>8}{'fps':>10}{'p50 ms':>12}{'p95 ms':>12}{'max ms':>12}")
+    print_row(mode="single", stats=single)
+    print_row(mode="multi", stats=multi)
+    if any(runtime.restarts.values()):
+        print(f"Worker restarts: {runtime.restarts}")
@@ -0,0 +1,95 @@
+#
+# Extract the speed of every frame of a video offline: the frames are OCRed in batches, one readtext_batched call
+# per batch, on several threads with a reader each. The speeds are written as a CSV (frame key, speed).
+# Run from the project root: python -m tools.run_speed_extraction ...
+#
+
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import cv2
+from cv2.typing import MatLike
+
+from aetd_modules import SpeedBox, SpeedDataExtractor
+from configs import Config
+from models import IndexedVideoReader
+
+
+def collect(pending: list[tuple[list[str], Future[list[SpeedBox | None]]]], speeds: dict[str, int | None]) -> None:
+    """
+    Store the speeds of the oldest batch.
+    """
+
+    keys, future = pending.pop(0)
+    for key, speed in zip(keys, future.result()):
+        speeds[key] = int(speed) if speed is not None else None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print(
+            "Usage: python -m tools.run_speed_extraction\n"
+            "\t<video_source: str>\n"
+            "\t<output_csv: str>\n"
+            "\t<batch_size: int>\n"
+            "\t<workers: int>"
+        )
+        sys.exit(1)
+
+    video_src: str = sys.argv[1]
+    output_csv: str = sys.argv[2]
+    batch_size: int = int(sys.argv[3])
+    workers: int = int(sys.argv[4])
+
+    # the recognized command line inputs
+    print(f"Video Source: {video_src}")
+    print(f"Output: {output_csv}")
+    print(f"Batch Size: {batch_size}")
+    print(f"Workers: {workers}")
+
+    Config(conf_file="configs/debug_default.conf")
+    extractor = SpeedDataExtractor(readers=workers)
+
+    cap = cv2.VideoCapture(video_src)
+    speeds: dict[str, int | None] = {}
+    # at most two batches per worker wait, the frames of a batch are held until it is done
+    pending: list[tuple[list[str], Future[list[SpeedBox | None]]]] = []
+    keys: list[str] = []
+    imgs: list[MatLike] = []
+    frame: int = 0
+
+    start: float = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            ret, img = cap.read()
+            if ret:
+                keys.append(IndexedVideoReader.key(frame=frame))
+                imgs.append(img)
+                frame += 1
+
+            if imgs and (len(imgs) == batch_size or not ret):
+                pending.append((keys, executor.submit(extractor.process_batch, imgs)))
+                keys, imgs = [], []
+            if len(pending) > 2 * workers:
+                collect(pending=pending, speeds=speeds)
+            if not ret:
+                break
+
+        while pending:
+            collect(pending=pending, speeds=speeds)
+    duration: float = time.perf_counter() - start
+    cap.release()
+
+    if frame == 0:
+        print("No frames read.")
+        sys.exit(1)
+
+    with open(output_csv, "w") as f:
+        f.write("frame,speed\n")
+        for key, speed in speeds.items():
+            f.write(f"{key},{'' if speed is None else speed}\n")
+
+    read: int = sum(speed is not None for speed in speeds.values())
+    print(f"Frames: {frame}, with a speed: {read}")
+    print(f"Time: {duration:.1f} s, {frame / duration:.1f} fps")
@@ -0,0 +1,118 @@
+#
+# Compare the wire format of the annotations with pickle: the encode and decode time and the payload size per frame.
+# Run from the project root: python -m tools.run_wire_benchmark ...
+#
+
+import pickle
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+import cv2
+import numpy as np
+
+from aetd_modules import AnnotationsContainer, Pipeline
+from configs import Config
+from driver import pack_annotations, unpack_annotations
+
+# every encode and decode is repeated, a single call is too short to time
+REPEATS: int = 20
+
+
+def pickle_annotations(
+    annotations: AnnotationsContainer, frame_id: int, timestamp: float, images: bool = False
+) -> bytes:
+    """
+    The annotations as they were sent before the wire format, the boxes pickled as they are.
+    """
+
+    return pickle.dumps(
+        (
+            frame_id,
+            timestamp,
+            time.perf_counter(),
+            annotations.speed,
+            annotations.direction,
+            annotations.road_objects,
+            annotations.road_segments,
+            annotations.paths,
+            annotations.timings,
+            annotations.original_img if images else None,
+        ),
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+
+
+def measure(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> tuple[Any, float]:
+    """
+    Return the result of fn and the mean time of a call in ms.
+    """
+
+    start: float = time.perf_counter()
+    for _ in range(REPEATS):
+        result: Any = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) / REPEATS * 1000
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m tools.run_wire_benchmark\n\t<video_source: str>\n\t<frames: int>")
+        sys.exit(1)
+
+    video_src: str = sys.argv[1]
+    frames: int = int(sys.argv[2])
+
+    # the recognized command line inputs
+    print(f"Video Source: {video_src}")
+    print(f"Frames: {frames}")
+
+    Config(conf_file="configs/debug_default.conf")
+    pipeline = Pipeline()
+
+    formats: dict[str, tuple[Callable[..., bytes], Callable[[bytes], Any], bool]] = {
+        "pickle": (pickle_annotations, pickle.loads, False),
+        "wire": (pack_annotations, unpack_annotations, False),
+        "pickle+img": (pickle_annotations, pickle.loads, True),
+        "wire+img": (pack_annotations, unpack_annotations, True),
+    }
+    # encode ms, decode ms, bytes
+    totals: dict[str, list[float]] = {name: [0.0, 0.0, 0.0] for name in formats}
+
+    cap = cv2.VideoCapture(video_src)
+    processed: int = 0
+
+    while processed < frames:
+        ret, img = cap.read()
+        if not ret:
+            break
+
+        annotations: AnnotationsContainer = pipeline.process(img=img, img_name=str(processed))
+        for name, (encode, decode, images) in formats.items():
+            data, encode_ms = measure(encode, annotations, frame_id=processed, timestamp=0.0, images=images)
+            _, decode_ms = measure(decode, data)
+            totals[name][0] += encode_ms
+            totals[name][1] += decode_ms
+            totals[name][2] += len(data)
+
+        processed += 1
+    cap.release()
+
+    if processed == 0:
+        print("No frames read.")
+        sys.exit(1)
+
+    print(f"{'format':<12}{'encode ms':>11}{'decode ms':>11}{'KB/frame':>11}")
+    for name, (encode_ms, decode_ms, size) in totals.items():
+        print(f"{name:<12}{encode_ms / processed:>11.3f}{decode_ms / processed:>11.3f}{size / processed / 1e3:>11.1f}")
+
+    # the decoded arrays of the wire format are views of the payload
+    data = pack_annotations(annotations, frame_id=0, timestamp=0.0)
+    result = unpack_annotations(data)
+    payload = np.frombuffer(data, dtype=np.uint8)
+    columns: list[np.ndarray] = []
+    if result.road_objects is not None:
+        columns.append(result.road_objects.xyxy)
+    if result.road_segments is not None:
+        columns.append(result.road_segments.points)
+    print(f"Decoded arrays share the payload: {all(np.shares_memory(column, payload) for column in columns)}")